@@ -0,0 +1,342 @@
+"""
+A single threaded server multiplexing any number of command clients with selectors.
+
+The server accepts clients on any listening stream socket, such as an RFCOMM Bluetooth socket,
+a TCP socket, or a Unix socket, so the same server can be run without Bluetooth hardware.
+Each client has its own receive decoder, message encoding, and send buffer. A client that stops reading what it is sent
+stops being read from until its send buffer drains, and is disconnected if its send buffer keeps growing.
+"""
+
+import logging
+import selectors
+import socket
+from threading import Thread, Lock
+
+from bluetooth_connection import framing, wire_codec
+
+# Log connections through the system logger once it has been configured
+system_logger = logging.getLogger("system")
+
+# Define the number of bytes read from a client at once
+RECEIVE_SIZE = 4096
+
+
+class ClientConnection(object):
+    """
+    The state of a single connected client
+    """
+
+    def __init__(self, client_socket, address):
+        self.socket = client_socket
+        self.address = address
+
+        self.decoder = framing.LineDecoder()
+        self.send_buffer = bytearray()
+
+        # Define the encoding of the messages sent to the client, json until the client selects another
+        self.wire = wire_codec.JsonWire()
+
+        # Define whether reading from the client is paused until its send buffer drains
+        self.paused = False
+        self.closed = False
+
+
+class CommandServer(object):
+    """
+    Serves frames from every connected client on one thread.
+    Each frame received is passed to the frame handler, and any response it returns is sent back to that client.
+    """
+
+    def __init__(self, listening_socket, frame_handler, max_clients: int = 8,
+                 send_buffer_limit: int = 64 * 1024, disconnect_handler=None):
+        """
+        :param listening_socket: A bound and listening stream socket to accept clients on
+        :param frame_handler: A function taking a frame and the ClientConnection it was received from,
+                              returning a response message or None
+        :param max_clients: The maximum number of clients connected at once
+        :param send_buffer_limit: The number of unsent bytes at which reading from a client is paused.
+                                  Clients with four times as many unsent bytes are disconnected.
+        :param disconnect_handler: An optional function called with each ClientConnection that disconnects
+        """
+        self.listening_socket = listening_socket
+        self.frame_handler = frame_handler
+        self.disconnect_handler = disconnect_handler
+        self.max_clients = max_clients
+        self.send_buffer_limit = send_buffer_limit
+
+        self.clients = []
+
+        self._selector = selectors.DefaultSelector()
+        self._lock = Lock()
+        self._stopping = False
+        self._thread = None
+
+        # Define a socket pair used to wake the selector when data is sent from another thread
+        self._wake_receiver, self._wake_sender = socket.socketpair()
+        self._wake_receiver.setblocking(False)
+        self._wake_sender.setblocking(False)
+
+        # Store clients with data added to their send buffer from another thread
+        self._dirty_clients = set()
+
+    def start(self) -> None:
+        """
+        Starts serving clients from a background thread
+
+        :return: None
+        """
+        self._thread = Thread(target=self.serve_forever, name="command-server", daemon=True)
+        self._thread.start()
+
+    def serve_forever(self) -> None:
+        """
+        Serves clients until the server is stopped
+
+        :return: None
+        """
+        self.listening_socket.setblocking(False)
+        self._selector.register(self.listening_socket, selectors.EVENT_READ)
+        self._selector.register(self._wake_receiver, selectors.EVENT_READ)
+
+        try:
+            while not self._stopping:
+                for key, events in self._selector.select():
+                    if key.fileobj is self.listening_socket:
+                        self._accept()
+                        continue
+                    if key.fileobj is self._wake_receiver:
+                        self._wake()
+                        continue
+
+                    client = key.data
+                    if (events & selectors.EVENT_WRITE) and not client.closed:
+                        self._write(client)
+                    if (events & selectors.EVENT_READ) and not client.closed:
+                        self._read(client)
+        finally:
+            for client in list(self.clients):
+                self._disconnect(client)
+            self._selector.close()
+            self._wake_receiver.close()
+            self._wake_sender.close()
+
+    def stop(self) -> None:
+        """
+        Stops the server and disconnects every client
+
+        :return: None
+        """
+        self._stopping = True
+        self._wake_up()
+
+        if self._thread is not None:
+            self._thread.join()
+
+    def send(self, client: ClientConnection, message) -> None:
+        """
+        Queues a message to be sent to a client in its encoding. May be called from any thread.
+
+        :param client: The client to send to
+        :param message: A TelemetryUpdate, or a message accepted by framing.encode_frame
+        :return: None
+        """
+        with self._lock:
+            if client.closed:
+                return
+            client.send_buffer += client.wire.encode(message)
+            self._dirty_clients.add(client)
+
+        self._wake_up()
+
+    def broadcast(self, message) -> None:
+        """
+        Queues a message to be sent to every connected client in its encoding. May be called from any thread.
+
+        :param message: A TelemetryUpdate, or a message accepted by framing.encode_frame
+        :return: None
+        """
+        with self._lock:
+            for client in self.clients:
+                client.send_buffer += client.wire.encode(message)
+                self._dirty_clients.add(client)
+
+        self._wake_up()
+
+    def set_wire(self, client: ClientConnection, wire) -> None:
+        """
+        Changes the encoding of every message sent to a client after this call
+
+        :param client: The client to change the encoding of
+        :param wire: The encoder of the new encoding
+        :return: None
+        """
+        with self._lock:
+            client.wire = wire
+
+    def _wake_up(self) -> None:
+        # A full wake socket already holds a pending wake signal, so a failed send can be ignored
+        try:
+            self._wake_sender.send(b"\0")
+        except OSError:
+            pass
+
+    def _accept(self) -> None:
+        try:
+            client_socket, address = self.listening_socket.accept()
+        except (BlockingIOError, InterruptedError):
+            return
+
+        if len(self.clients) >= self.max_clients:
+            system_logger.warning(f"Refused connection from {address}, {self.max_clients} clients are connected")
+            client_socket.close()
+            return
+
+        client_socket.setblocking(False)
+        client = ClientConnection(client_socket, address)
+
+        with self._lock:
+            self.clients.append(client)
+        self._selector.register(client_socket, selectors.EVENT_READ, client)
+
+        system_logger.info(f"Accepted connection from {address}")
+
+    def _wake(self) -> None:
+        # Clear the wake signals and update the clients with new data to send
+        try:
+            while self._wake_receiver.recv(1024):
+                pass
+        except (BlockingIOError, InterruptedError):
+            pass
+
+        with self._lock:
+            dirty_clients = self._dirty_clients
+            self._dirty_clients = set()
+
+        for client in dirty_clients:
+            if not client.closed:
+                self._update_registration(client)
+
+    def _read(self, client: ClientConnection) -> None:
+        try:
+            data = client.socket.recv(RECEIVE_SIZE)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError as e:
+            system_logger.warning(f"Connection to {client.address} lost: {e!r}")
+            self._disconnect(client)
+            return
+
+        if not data:
+            self._disconnect(client)
+            return
+
+        try:
+            frames = client.decoder.feed(data)
+        except framing.FrameTooLong as e:
+            system_logger.warning(f"{client.address}: {e}")
+            frames = e.frames
+
+        for frame in frames:
+            # An unexpected error handling one frame only drops that frame, the client and server keep running
+            try:
+                response = self.frame_handler(frame, client)
+            except Exception:
+                system_logger.exception(f"{client.address}: Unable to handle frame {frame!r}")
+                continue
+
+            if response is not None:
+                with self._lock:
+                    client.send_buffer += client.wire.encode(response)
+
+        self._update_registration(client)
+
+    def _write(self, client: ClientConnection) -> None:
+        with self._lock:
+            pending = bytes(client.send_buffer)
+
+        try:
+            sent = client.socket.send(pending)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError as e:
+            system_logger.warning(f"Connection to {client.address} lost: {e!r}")
+            self._disconnect(client)
+            return
+
+        with self._lock:
+            del client.send_buffer[:sent]
+
+        self._update_registration(client)
+
+    def _update_registration(self, client: ClientConnection) -> None:
+        """
+        Selects the events to wait for on a client based on its send buffer
+        """
+        with self._lock:
+            buffered = len(client.send_buffer)
+
+        # Disconnect clients that are not reading anything they are sent
+        if buffered > 4 * self.send_buffer_limit:
+            system_logger.warning(f"Disconnecting {client.address}, {buffered} bytes are waiting to be sent")
+            self._disconnect(client)
+            return
+
+        # Stop reading from a client while it has too much unsent data, and resume once half has been sent
+        if buffered >= self.send_buffer_limit:
+            client.paused = True
+        elif buffered <= self.send_buffer_limit // 2:
+            client.paused = False
+
+        events = 0 if client.paused else selectors.EVENT_READ
+        if buffered:
+            events |= selectors.EVENT_WRITE
+        self._selector.modify(client.socket, events, client)
+
+    def _disconnect(self, client: ClientConnection) -> None:
+        with self._lock:
+            if client.closed:
+                return
+            client.closed = True
+            self.clients.remove(client)
+            self._dirty_clients.discard(client)
+
+        try:
+            self._selector.unregister(client.socket)
+        except (KeyError, ValueError):
+            pass
+        client.socket.close()
+
+        system_logger.info(f"Client {client.address} disconnected")
+
+        if self.disconnect_handler is not None:
+            self.disconnect_handler(client)
+
+
+def create_tcp_listener(host: str = "127.0.0.1", port: int = 0, backlog: int = 8):
+    """
+    Creates a listening TCP socket, useful for serving clients without Bluetooth hardware
+
+    :param host: The address to bind to
+    :param port: The port to bind to, 0 picks a free port
+    :param backlog: The number of connections waiting to be accepted
+    :return: The listening socket
+    """
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listener.bind((host, port))
+    listener.listen(backlog)
+    return listener
+
+
+def create_unix_listener(path: str, backlog: int = 8):
+    """
+    Creates a listening Unix socket, useful for serving local clients without Bluetooth hardware
+
+    :param path: The path of the socket file
+    :param backlog: The number of connections waiting to be accepted
+    :return: The listening socket
+    """
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(path)
+    listener.listen(backlog)
+    return listener
@@ -0,0 +1,193 @@
+"""
+Framing of the command stream between the Pi and the tablet.
+
+Every message is a single line terminated by a newline, so a message split across reads
+or several messages in one read are reassembled the same way.
+Messages sent to a client that selected the binary encoding are framed by wire_codec instead.
+
+A line received from the client is either a plain text command, such as "room 1 set angle 45",
+or a json request carrying an id and a batch of commands:
+
+    {"id": 7, "commands": ["room 1 set temp 21", "room 2 set temp 22"]}
+
+Each command of a request is run in order and a single response correlated by the id is sent back:
+
+    {"id": 7, "results": [{"ok": true}, {"ok": false, "error": "Unexpected word: 22x"}]}
+
+Commands that respond with a message, such as "help" or "fan get status", add it to their result as "message":
+
+    {"id": 8, "results": [{"ok": true, "message": {"fan": true}}]}
+
+A plain text command responding with a message is answered with {"message": ...}.
+"""
+
+import json
+
+# Define the byte terminating each frame
+FRAME_TERMINATOR = b"\n"
+
+# Define the longest frame accepted in bytes
+MAX_FRAME_LENGTH = 64 * 1024
+
+
+class FrameTooLong(Exception):
+    def __init__(self, message: str, frames: list = None):
+        """
+        :param message: A description of the frame that was too long
+        :param frames: The complete frames received in the same chunk, which are still to be handled
+        """
+        super().__init__(message)
+        self.frames = [] if frames is None else frames
+
+
+class InvalidRequest(Exception):
+    pass
+
+
+class LineDecoder(object):
+    """
+    Reassembles newline terminated frames from a stream of received chunks
+    """
+
+    def __init__(self, max_frame_length: int = MAX_FRAME_LENGTH):
+        """
+        :param max_frame_length: The longest frame accepted in bytes
+        """
+        self.max_frame_length = max_frame_length
+        self._buffer = bytearray()
+
+        # Define whether the rest of a frame that was too long is being discarded
+        self._discarding = False
+
+    def feed(self, data: bytes) -> list:
+        """
+        Adds received data to the decoder
+
+        :param data: The chunk of data received
+        :return: A list of the complete frames received, without their terminators
+        :raises FrameTooLong: If a frame was too long, holding the complete frames received in its frames
+        """
+        self._buffer += data
+        frames = []
+        too_long = False
+
+        while True:
+            end = self._buffer.find(FRAME_TERMINATOR)
+            if end < 0:
+                break
+
+            frame = bytes(self._buffer[:end]).rstrip(b"\r")
+            del self._buffer[:end + 1]
+
+            # Drop the end of a frame that was too long
+            if self._discarding:
+                self._discarding = False
+                continue
+
+            # Drop a frame that was received whole in a single chunk but is too long
+            if len(frame) > self.max_frame_length:
+                too_long = True
+                continue
+
+            if frame:
+                frames.append(frame)
+
+        # Discard a frame that grows too long without a terminator so that memory use is bounded
+        if len(self._buffer) > self.max_frame_length:
+            self._buffer.clear()
+            self._discarding = True
+            too_long = True
+
+        # Report the long frame without losing the frames received along with it
+        if too_long:
+            raise FrameTooLong(f"A frame exceeded {self.max_frame_length} bytes", frames)
+
+        return frames
+
+
+def encode_frame(message) -> bytes:
+    """
+    Encodes a message sent to the client as a frame.
+    Messages that are not already json objects are wrapped as {"message": ...} so that they may span lines.
+
+    :param message: A dictionary, json object string, or other value to send
+    :return: The encoded frame
+    """
+    if isinstance(message, str) and message.startswith("{"):
+        try:
+            message = json.loads(message)
+        except ValueError:
+            pass
+
+    if not isinstance(message, dict):
+        message = {"message": str(message)}
+
+    return json.dumps(message).encode() + FRAME_TERMINATOR
+
+
+class Request(object):
+    def __init__(self, request_id, commands: list, is_batch: bool):
+        """
+        :param request_id: The id the response is correlated by, None for plain text commands
+        :param commands: The text commands to run in order
+        :param is_batch: Whether the request was a json request expecting a response
+        """
+        self.request_id = request_id
+        self.commands = commands
+        self.is_batch = is_batch
+
+
+def parse_request(frame: bytes) -> Request:
+    """
+    :param frame: A frame received from the client
+    :return: The Request of the frame
+    """
+    try:
+        text = frame.decode().strip()
+    except UnicodeDecodeError:
+        raise InvalidRequest("Frames must be UTF-8 text")
+
+    # Plain text commands
+    if not text.startswith("{"):
+        return Request(None, [text], is_batch=False)
+
+    try:
+        obj = json.loads(text)
+    except ValueError:
+        raise InvalidRequest(f"Invalid json request: {text}")
+
+    if "commands" in obj:
+        commands = obj["commands"]
+    elif "command" in obj:
+        commands = [obj["command"]]
+    else:
+        raise InvalidRequest(f"Request holds no commands: {text}")
+
+    if (not isinstance(commands, list)) or (not all(isinstance(c, str) for c in commands)):
+        raise InvalidRequest(f"Commands must be a list of strings: {text}")
+
+    return Request(obj.get("id"), commands, is_batch=True)
+
+
+def process_request(request: Request, execute):
+    """
+    Runs every command of a request
+
+    :param request: The request to run
+    :param execute: A function running a single text command, returning its response message or None,
+                    and raising an exception if the command fails
+    :return: The response dictionary for a json request, or None for a plain text command
+    """
+    results = []
+
+    for command in request.commands:
+        try:
+            message = execute(command)
+            results.append({"ok": True} if message is None else {"ok": True, "message": message})
+        except Exception as e:
+            results.append({"ok": False, "error": str(e) or type(e).__name__})
+
+    if not request.is_batch:
+        return None
+
+    return {"id": request.request_id, "results": results}
@@ -4,20 +4,27 @@ This is not a REST api, as it is stateful and will only transmit when new data i
 """
 import json
 import datetime
+import time
+
+from data_handling.resampling import lttb
 
 # Remember that the Pi is considered the server, and the tablet is considered the client
 
-def server_to_client_transmission():
+def server_to_client_transmission(state: dict, timestamp: float = None):
     """
-    The Pi to tablet transmission data
+    The Pi to tablet transmission of the state of the system.
+    Only the values that changed since the last transmission are included.
 
-    :return:
+    :param state: A dictionary containing the {topic: {key: value}} that changed
+    :param timestamp: The time of the change in seconds since the epoch, None for now
+    :return: The json string
     """
-    _obj = {
-        "time": datetime.datetime.now(),
-        "state": {
+    if timestamp is None:
+        timestamp = time.time()
 
-        }
+    _obj = {
+        "time": datetime.datetime.fromtimestamp(timestamp).isoformat(),
+        "state": state
     }
     return json.dumps(_obj)
 
@@ -27,3 +34,26 @@ def client_to_server_transmission():
         "time": datetime.datetime.now(),
     }
     return json.dumps(_obj)
+
+
+def history_transmission(device_id, timestamps, readings, max_points: int):
+    """
+    The Pi to tablet transmission of the reading history of a device.
+    Readings are downsampled so that long histories fit in a small transmission.
+
+    :param device_id: The id of the device the readings were taken from
+    :param timestamps: The datetime64 times of the readings
+    :param readings: The float readings
+    :param max_points: The maximum number of readings to transmit
+    :return: The json string
+    """
+    timestamps, readings = lttb(timestamps, readings, max_points)
+    _obj = {
+        "time": datetime.datetime.now().isoformat(),
+        "history": {
+            "id": device_id,
+            "times": [str(t) for t in timestamps.astype("datetime64[s]")],
+            "readings": [round(r, 2) for r in readings.tolist()]
+        }
+    }
+    return json.dumps(_obj)
@@ -0,0 +1,188 @@
+"""
+Push based telemetry for connected clients.
+
+Clients subscribe to topics rather than polling for the state of the system.
+The system publishes the latest values of each topic every cycle, and each subscriber is sent only the values
+that changed since it was last sent the topic, at most once per the interval it subscribed with.
+A new subscriber is sent every value of the topic with its first transmission.
+"""
+
+import time
+from threading import Lock
+
+# Define the topics clients may subscribe to
+TOPICS = ("rooms", "element", "dampers", "fan")
+
+
+class Subscription(object):
+    """
+    The state of a single client's subscription to a topic
+    """
+
+    def __init__(self, min_interval: float):
+        """
+        :param min_interval: The minimum time in seconds between transmissions of the topic
+        """
+        self.min_interval = min_interval
+
+        # Define the time of the last transmission of the topic, None before the first
+        self.last_send_time = None
+
+        # Store the values of the topic last sent to the subscriber
+        self.sent = {}
+
+
+class SubscriptionChange(object):
+    """
+    A subscription or unsubscription requested by a command, applied for the client that sent it
+    """
+
+    def __init__(self, topic, subscribe: bool, min_interval: float = None):
+        """
+        :param topic: The topic to change the subscription of, None to unsubscribe from every topic
+        :param subscribe: Whether to subscribe to or unsubscribe from the topic
+        :param min_interval: The minimum time in seconds between transmissions, None for the default
+        """
+        self.topic = topic
+        self.subscribe = subscribe
+        self.min_interval = min_interval
+
+    def apply(self, publisher, client) -> None:
+        """
+        :param publisher: The TelemetryPublisher to change the subscription with
+        :param client: The client the subscription belongs to
+        :return: None
+        """
+        if self.subscribe:
+            publisher.subscribe(client, self.topic, self.min_interval)
+        else:
+            publisher.unsubscribe(client, self.topic)
+
+
+class TelemetryPublisher(object):
+    """
+    Tracks the latest values of each topic and pushes changes to the clients subscribed to them
+    """
+
+    def __init__(self, send, default_interval: float, clock=time.monotonic):
+        """
+        :param send: A function taking a client and a dictionary containing the {topic: {key: value}}
+                     that changed, sending the changes to the client
+        :param default_interval: The minimum time in seconds between transmissions to subscribers
+                                 that did not request an interval
+        :param clock: A function returning the current time in seconds
+        """
+        self.send = send
+        self.default_interval = default_interval
+        self.clock = clock
+
+        # Store the latest published values by topic
+        self._state = {topic: {} for topic in TOPICS}
+
+        # Store the subscriptions of each client as {client: {topic: Subscription}}
+        self._subscribers = {}
+
+        self._lock = Lock()
+
+    def subscribe(self, client, topic: str, min_interval: float = None) -> None:
+        """
+        Subscribes a client to a topic. Subscribing again resends every value of the topic.
+
+        :param client: The client to send changes to
+        :param topic: The topic to subscribe to
+        :param min_interval: The minimum time in seconds between transmissions, None for the default
+        :return: None
+        """
+        if topic not in self._state:
+            raise KeyError(f"Unknown topic: {topic}")
+
+        if min_interval is None:
+            min_interval = self.default_interval
+        if min_interval < 0.0:
+            raise ValueError(f"The interval of a subscription may not be negative: {min_interval}")
+
+        with self._lock:
+            self._subscribers.setdefault(client, {})[topic] = Subscription(min_interval)
+
+    def unsubscribe(self, client, topic: str = None) -> None:
+        """
+        :param client: The client to stop sending changes to
+        :param topic: The topic to unsubscribe from, None for every topic
+        :return: None
+        """
+        if (topic is not None) and (topic not in self._state):
+            raise KeyError(f"Unknown topic: {topic}")
+
+        with self._lock:
+            subscriptions = self._subscribers.get(client, {})
+            if topic is None:
+                subscriptions.clear()
+            else:
+                subscriptions.pop(topic, None)
+
+            if not subscriptions:
+                self._subscribers.pop(client, None)
+
+    def remove_client(self, client) -> None:
+        """
+        Removes every subscription of a client that disconnected
+
+        :param client: The client that disconnected
+        :return: None
+        """
+        with self._lock:
+            self._subscribers.pop(client, None)
+
+    def subscriptions(self, client) -> dict:
+        """
+        :param client: The client to retrieve the subscriptions of
+        :return: A dictionary containing the {topic: minimum interval} the client is subscribed with
+        """
+        with self._lock:
+            return {topic: sub.min_interval for topic, sub in self._subscribers.get(client, {}).items()}
+
+    def publish(self, topic: str, values: dict) -> None:
+        """
+        Updates the latest values of a topic. Values are sent to subscribers on the next flush.
+
+        :param topic: The topic the values belong to
+        :param values: A dictionary containing the {key: value} of the topic. Keys not given keep their values.
+        :return: None
+        """
+        with self._lock:
+            self._state[topic].update(values)
+
+    def flush(self) -> None:
+        """
+        Sends each subscriber the values that changed in the topics it is due to be sent
+
+        :return: None
+        """
+        now = self.clock()
+        messages = []
+
+        with self._lock:
+            for client, subscriptions in self._subscribers.items():
+                changes = {}
+
+                for topic, sub in subscriptions.items():
+                    # Wait until the rate limit of the subscriber allows another transmission
+                    if (sub.last_send_time is not None) and (now - sub.last_send_time < sub.min_interval):
+                        continue
+
+                    # Find the values that the subscriber has not been sent
+                    delta = {key: value for key, value in self._state[topic].items()
+                             if (key not in sub.sent) or (sub.sent[key] != value)}
+                    if not delta:
+                        continue
+
+                    sub.sent.update(delta)
+                    sub.last_send_time = now
+                    changes[topic] = delta
+
+                if changes:
+                    messages.append((client, changes))
+
+        # Send outside of the lock so that a slow send does not hold up publishing
+        for client, changes in messages:
+            self.send(client, changes)
@@ -0,0 +1,394 @@
+"""
+Encodings of the messages sent from the Pi to a client.
+
+Every client starts with the json encoding, where each message is a line of json.
+A client may switch to the binary encoding when it connects with the command "encoding binary".
+Every message sent after the command, including the response to the command, is then a binary frame:
+
+    length (varint) | message type (1 byte) | body
+
+A json message has the json text as its body. A telemetry message has the body:
+
+    timestamp | field count (1 byte) | field id (1 byte) | value | field id | value ...
+
+The timestamp of the first telemetry message is absolute milliseconds since the epoch (8 bytes),
+and later timestamps are varint milliseconds since the previous message, flagged in the message type.
+Field ids combine the topic and the key within the topic, so key names are never sent.
+Temperatures and angles are sent as signed centi-degree integers (2 bytes), and flags as a single byte.
+"""
+
+import json
+import struct
+import time
+
+from bluetooth_connection import framing, json_format
+from bluetooth_connection.telemetry import TOPICS
+
+# Define the message types of binary frames
+MESSAGE_JSON = 0x00
+MESSAGE_TELEMETRY = 0x01
+
+# Define the flag of a message type marking an absolute timestamp
+ABSOLUTE_TIME_FLAG = 0x80
+
+ABSOLUTE_TIME = struct.Struct("<q")
+
+# Define the value types of fields
+TEMPERATURE = 0
+ANGLE = 1
+FLAG = 2
+
+CENTI_DEGREES = struct.Struct("<h")
+FLAG_VALUE = struct.Struct("<B")
+
+# Define the values used to send a value of None
+NULL_CENTI_DEGREES = -32768
+NULL_FLAG = 0xFF
+
+# Define the keys of each topic in field id order, rooms and dampers are identified by up to 16 room ids
+TOPIC_FIELDS = {
+    "rooms": (TEMPERATURE, tuple(str(_id) for _id in range(16))),
+    "element": (FLAG, ("enabled", "heating")),
+    "dampers": (ANGLE, tuple(str(_id) for _id in range(16))),
+    "fan": (FLAG, ("on",)),
+}
+
+
+def _create_field_tables():
+    """
+    :return: A tuple of the dictionaries {(topic, key): (field id, value type)} and {field id: (topic, key, value type)}
+    """
+    field_ids = {}
+    fields = {}
+
+    # The upper nibble of a field id is the topic and the lower nibble is the key
+    for topic_number, topic in enumerate(TOPICS):
+        value_type, keys = TOPIC_FIELDS[topic]
+        for key_number, key in enumerate(keys):
+            field_id = (topic_number << 4) | key_number
+            field_ids[(topic, key)] = (field_id, value_type)
+            fields[field_id] = (topic, key, value_type)
+
+    return field_ids, fields
+
+
+FIELD_IDS, FIELDS = _create_field_tables()
+
+
+class TelemetryUpdate(object):
+    """
+    A change in the state of the system sent to a subscribed client
+    """
+
+    def __init__(self, state: dict, timestamp: float):
+        """
+        :param state: A dictionary containing the {topic: {key: value}} that changed
+        :param timestamp: The time of the update in seconds since the epoch
+        """
+        self.state = state
+        self.timestamp = timestamp
+
+    def __eq__(self, other):
+        return isinstance(other, TelemetryUpdate) and (self.state, self.timestamp) == (other.state, other.timestamp)
+
+    def __repr__(self):
+        return f"TelemetryUpdate({self.state!r}, {self.timestamp!r})"
+
+
+def encode_varint(value: int) -> bytes:
+    """
+    :param value: A non negative integer
+    :return: The integer in 7 bits per byte, least significant first, with the high bit marking continuation
+    """
+    out = bytearray()
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def decode_varint(data, offset: int) -> tuple:
+    """
+    :param data: The bytes holding the varint
+    :param offset: The offset of the varint in the data
+    :return: A tuple of the integer and the offset after it, or (None, offset) if the varint is incomplete
+    """
+    value = 0
+    shift = 0
+    position = offset
+
+    while position < len(data):
+        byte = data[position]
+        position += 1
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return value, position
+        shift += 7
+
+    return None, offset
+
+
+def _encode_value(value_type: int, value) -> bytes:
+    if value_type == FLAG:
+        return FLAG_VALUE.pack(NULL_FLAG if value is None else int(bool(value)))
+
+    if value is None:
+        return CENTI_DEGREES.pack(NULL_CENTI_DEGREES)
+    return CENTI_DEGREES.pack(int(round(float(value) * 100)))
+
+
+def _decode_value(value_type: int, data, offset: int) -> tuple:
+    if value_type == FLAG:
+        raw, = FLAG_VALUE.unpack_from(data, offset)
+        return (None if raw == NULL_FLAG else bool(raw)), offset + FLAG_VALUE.size
+
+    raw, = CENTI_DEGREES.unpack_from(data, offset)
+    return (None if raw == NULL_CENTI_DEGREES else raw / 100), offset + CENTI_DEGREES.size
+
+
+class TelemetryEncoder(object):
+    """
+    Encodes telemetry messages, timestamped relative to the previous message of the same client
+    """
+
+    def __init__(self):
+        # Define the time of the last message in milliseconds, None before the first message
+        self._last_time_ms = None
+
+    def encode(self, update: TelemetryUpdate) -> bytes:
+        """
+        :param update: The update to encode
+        :return: The telemetry message body with its message type
+        """
+        time_ms = int(round(update.timestamp * 1000))
+
+        # Send an absolute time for the first message, or if the clock moved backwards
+        if (self._last_time_ms is None) or (time_ms < self._last_time_ms):
+            out = bytearray([MESSAGE_TELEMETRY | ABSOLUTE_TIME_FLAG])
+            out += ABSOLUTE_TIME.pack(time_ms)
+        else:
+            out = bytearray([MESSAGE_TELEMETRY])
+            out += encode_varint(time_ms - self._last_time_ms)
+        self._last_time_ms = time_ms
+
+        fields = [(topic, key, value) for topic, values in update.state.items() for key, value in values.items()]
+        if len(fields) > 0xFF:
+            raise ValueError(f"A telemetry message may hold at most 255 fields, not {len(fields)}")
+
+        out.append(len(fields))
+        for topic, key, value in fields:
+            field_id, value_type = FIELD_IDS[(topic, key)]
+            out.append(field_id)
+            out += _encode_value(value_type, value)
+
+        return bytes(out)
+
+
+class TelemetryDecoder(object):
+    """
+    Decodes telemetry messages sent by a TelemetryEncoder
+    """
+
+    def __init__(self):
+        self._last_time_ms = None
+
+    def decode(self, payload: bytes) -> TelemetryUpdate:
+        """
+        :param payload: The telemetry message body with its message type
+        :return: The decoded update
+        """
+        message_type = payload[0]
+        offset = 1
+
+        if message_type & ABSOLUTE_TIME_FLAG:
+            time_ms, = ABSOLUTE_TIME.unpack_from(payload, offset)
+            offset += ABSOLUTE_TIME.size
+        else:
+            if self._last_time_ms is None:
+                raise ValueError("A relative timestamp was received before an absolute timestamp")
+            delta_ms, offset = decode_varint(payload, offset)
+            time_ms = self._last_time_ms + delta_ms
+        self._last_time_ms = time_ms
+
+        field_count = payload[offset]
+        offset += 1
+
+        state = {}
+        for _ in range(field_count):
+            topic, key, value_type = FIELDS[payload[offset]]
+            value, offset = _decode_value(value_type, payload, offset + 1)
+            state.setdefault(topic, {})[key] = value
+
+        return TelemetryUpdate(state, time_ms / 1000)
+
+
+class JsonWire(object):
+    """
+    The default encoding, sending each message as a line of json
+    """
+
+    name = "json"
+
+    def encode(self, message) -> bytes:
+        """
+        :param message: A TelemetryUpdate, or a message accepted by framing.encode_frame
+        :return: The encoded frame
+        """
+        if isinstance(message, TelemetryUpdate):
+            message = json_format.server_to_client_transmission(message.state, message.timestamp)
+
+        return framing.encode_frame(message)
+
+
+class BinaryWire(object):
+    """
+    The compact encoding, sending each message as a length prefixed binary frame
+    """
+
+    name = "binary"
+
+    def __init__(self):
+        self.telemetry_encoder = TelemetryEncoder()
+
+    def encode(self, message) -> bytes:
+        """
+        :param message: A TelemetryUpdate, or a message accepted by framing.encode_frame
+        :return: The encoded frame
+        """
+        if isinstance(message, TelemetryUpdate):
+            payload = self.telemetry_encoder.encode(message)
+        else:
+            payload = bytes([MESSAGE_JSON]) + framing.encode_frame(message).rstrip(framing.FRAME_TERMINATOR)
+
+        return encode_varint(len(payload)) + payload
+
+
+class BinaryFrameDecoder(object):
+    """
+    Reassembles and decodes the binary frames received by a client using the binary encoding
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self.telemetry_decoder = TelemetryDecoder()
+
+    def feed(self, data: bytes) -> list:
+        """
+        :param data: The chunk of data received
+        :return: A list of the messages received, TelemetryUpdates for telemetry and dictionaries for json
+        """
+        self._buffer += data
+        messages = []
+
+        while True:
+            length, offset = decode_varint(self._buffer, 0)
+            if (length is None) or (len(self._buffer) < offset + length):
+                break
+
+            payload = bytes(self._buffer[offset:offset + length])
+            del self._buffer[:offset + length]
+
+            if payload[0] == MESSAGE_JSON:
+                messages.append(json.loads(payload[1:].decode()))
+            else:
+                messages.append(self.telemetry_decoder.decode(payload))
+
+        return messages
+
+
+# Define the encodings a client may select
+WIRES = {
+    JsonWire.name: JsonWire,
+    BinaryWire.name: BinaryWire,
+}
+
+
+def create_wire(name: str):
+    """
+    :param name: The name of the encoding
+    :return: A new encoder of the encoding, holding the state of a single client
+    """
+    try:
+        return WIRES[name]()
+    except KeyError:
+        raise KeyError(f"Unknown encoding: {name}")
+
+
+class EncodingChange(object):
+    """
+    A change of encoding requested by a command, applied for the client that sent it
+    """
+
+    def __init__(self, wire):
+        """
+        :param wire: The encoder of the encoding to switch to
+        """
+        self.wire = wire
+
+    def apply(self, bt_server, client) -> None:
+        """
+        :param bt_server: The server the client is connected to
+        :param client: The client switching encoding
+        :return: None
+        """
+        bt_server.set_client_wire(client, self.wire)
+
+
+def create_snapshot(rooms: int = 3) -> dict:
+    """
+    :param rooms: The number of rooms in the system
+    :return: The state of a typical system, as sent to a new subscriber of every topic
+    """
+    return {
+        "rooms": {str(_id): 21.5 + _id * 0.3 for _id in range(rooms)},
+        "element": {"enabled": True, "heating": True},
+        "dampers": {str(_id): 90.0 if _id % 2 else 0.0 for _id in range(rooms)},
+        "fan": {"on": True},
+    }
+
+
+def benchmark(iterations: int = 10000) -> None:
+    """
+    Compares the bytes per update and encode/decode times of the json and binary encodings
+
+    :param iterations: The number of updates to encode and decode
+    :return: None
+    """
+    snapshot = create_snapshot()
+    delta = {"rooms": {"1": 21.9}}
+    start_time = time.time()
+
+    for label, state in (("snapshot", snapshot), ("single room delta", delta)):
+        updates = [TelemetryUpdate(state, start_time + i) for i in range(iterations)]
+
+        json_wire = JsonWire()
+        binary_wire = BinaryWire()
+
+        t0 = time.perf_counter()
+        json_frames = [json_wire.encode(update) for update in updates]
+        t1 = time.perf_counter()
+        binary_frames = [binary_wire.encode(update) for update in updates]
+        t2 = time.perf_counter()
+
+        for frame in json_frames:
+            json.loads(frame)
+        t3 = time.perf_counter()
+        binary_decoder = BinaryFrameDecoder()
+        for frame in binary_frames:
+            binary_decoder.feed(frame)
+        t4 = time.perf_counter()
+
+        # Skip the first binary frame, which carries an absolute timestamp
+        json_size = sum(map(len, json_frames[1:])) / (iterations - 1)
+        binary_size = sum(map(len, binary_frames[1:])) / (iterations - 1)
+
+        print(f"{label}:")
+        print(f"  json:   {json_size:6.1f} bytes/update, "
+              f"encode {(t1 - t0) / iterations * 1e6:5.1f} us, decode {(t3 - t2) / iterations * 1e6:5.1f} us")
+        print(f"  binary: {binary_size:6.1f} bytes/update, "
+              f"encode {(t2 - t1) / iterations * 1e6:5.1f} us, decode {(t4 - t3) / iterations * 1e6:5.1f} us")
+
+
+if __name__ == "__main__":
+    benchmark()
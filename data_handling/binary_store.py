@@ -0,0 +1,117 @@
+"""
+Compact append-only binary storage of sensor measurements.
+
+Each sensor has its own file of fixed width records.
+A record is an int64 of milliseconds since the epoch followed by a float32 measurement, both little endian.
+As records are appended in time order, a time range of a file can be found with a binary search
+and read as a slice of a memory map rather than parsing every line of a csv file.
+"""
+
+import datetime
+import os
+import struct
+import time
+from threading import Lock
+
+import numpy as np
+
+from data_handling.custom_logger import create_path_for_file
+from system.system_constants import log_directories
+
+# Define the layout of a single measurement record
+RECORD_STRUCT = struct.Struct("<qf")
+RECORD_DTYPE = np.dtype([("time", "<i8"), ("value", "<f4")])
+
+# Define the extension of binary measurement files
+BINARY_EXTENSION = "bin"
+
+
+def get_binary_file_path(device_id, directory: str = None) -> str:
+    """
+    :param device_id: The sensor ID
+    :param directory: The directory of the binary files, defaults to the binary measurements log directory
+    :return: The path of the sensor's binary measurement file
+    """
+    if directory is None:
+        directory = log_directories["binary_measurements"]
+
+    return os.path.join(directory, f"{device_id}.{BINARY_EXTENSION}")
+
+
+def to_epoch_ms(timestamp: datetime.datetime) -> int:
+    """
+    :param timestamp: A naive local or timezone aware datetime
+    :return: The number of milliseconds since the epoch
+    """
+    return int(round(timestamp.timestamp() * 1000.0))
+
+
+class BinaryMeasurementWriter(object):
+    """
+    Appends measurement records to a sensor's binary measurement file
+    """
+
+    def __init__(self, device_id, directory: str = None):
+        """
+        :param device_id: The sensor ID to write measurements of
+        :param directory: The directory of the binary files, defaults to the binary measurements log directory
+        """
+        self.file_path = get_binary_file_path(device_id, directory)
+        create_path_for_file(self.file_path)
+
+        # Each record is written with a single unbuffered append so that readers never see a partial record
+        self._file = open(self.file_path, "ab", buffering=0)
+        self._write_lock = Lock()
+
+    def write(self, value: float, timestamp: float = None) -> None:
+        """
+        Appends a measurement record
+
+        :param value: The measurement to write
+        :param timestamp: The time of the measurement in seconds since the epoch, defaults to the current time
+        :return: None
+        """
+        if timestamp is None:
+            timestamp = time.time()
+
+        record = RECORD_STRUCT.pack(int(round(timestamp * 1000.0)), value)
+
+        with self._write_lock:
+            self._file.write(record)
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def read_measurements(device_id, start_time: datetime.datetime = None, end_time: datetime.datetime = None,
+                      directory: str = None) -> tuple:
+    """
+    Reads the measurements of a sensor within a time range from its binary measurement file.
+
+    The arrays returned are views of a read only memory map of the file,
+    so only the pages of the time range requested are ever read from disk.
+
+    :param device_id: The sensor ID to read measurements of
+    :param start_time: The earliest measurement time to include, defaults to the start of the file
+    :param end_time: The latest measurement time to include, defaults to the end of the file
+    :param directory: The directory of the binary files, defaults to the binary measurements log directory
+    :return: A tuple of a datetime64[ms] array of UTC measurement times and a float32 array of measurements
+    """
+    file_path = get_binary_file_path(device_id, directory)
+
+    # Ignore a partially written record at the end of the file
+    record_count = os.path.getsize(file_path) // RECORD_DTYPE.itemsize
+
+    if record_count == 0:
+        return np.empty(0, dtype="datetime64[ms]"), np.empty(0, dtype=np.float32)
+
+    records = np.memmap(file_path, dtype=RECORD_DTYPE, mode="r", shape=(record_count,))
+    times = records["time"]
+
+    # Binary search for the first and last records within the time range
+    first_record = 0 if start_time is None else np.searchsorted(times, to_epoch_ms(start_time), side="left")
+    last_record = record_count if end_time is None else np.searchsorted(times, to_epoch_ms(end_time), side="right")
+
+    selected = records[first_record:last_record]
+
+    return selected["time"].view("datetime64[ms]"), selected["value"]
@@ -1,8 +1,230 @@
+import atexit
 import logging
 import os
 import os.path as path
+import queue
+import time
+from logging.handlers import QueueHandler, QueueListener
 
-from system.system_constants import csv_formatter, cons_formatter, log_directories
+from data_handling import segments
+from system.system_constants import csv_formatter, cons_formatter, log_directories, log_flush_interval, log_batch_size
+from system.system_constants import log_segment_max_bytes, log_segment_max_age
+
+
+class BatchedFileHandler(logging.FileHandler):
+    """
+    A file handler that buffers formatted records and writes them to the file in batches.
+    The buffer is written once it holds batch_size records or when the handler is flushed.
+
+    The file can optionally be rotated into a compressed archive segment
+    once it grows past a size or its first record is older than an age.
+    """
+
+    def __init__(self, filename, batch_size: int, max_bytes: int = None, max_age: float = None):
+        """
+        :param filename: The log file to write to
+        :param batch_size: The number of records to buffer before writing
+        :param max_bytes: The size in bytes to rotate the file at, by default the file is not rotated by size
+        :param max_age: The age in seconds to rotate the file at, by default the file is not rotated by age
+        """
+        super().__init__(filename, delay=True)
+        self.batch_size = batch_size
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._buffer = []
+
+        # Store the time of the first record of the file in seconds since the epoch
+        self._segment_start = None
+        if path.isfile(self.baseFilename) and path.getsize(self.baseFilename):
+            first_time = segments.read_time_bounds(self.baseFilename)[0]
+            self._segment_start = time.time() if first_time is None else first_time.timestamp()
+
+    def emit(self, record) -> None:
+        try:
+            self._buffer.append(self.format(record) + self.terminator)
+        except Exception:
+            self.handleError(record)
+            return
+
+        if self._segment_start is None:
+            self._segment_start = record.created
+
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        Writes all buffered records to the file, rotating the file afterwards if it is due
+
+        :return: None
+        """
+        self.acquire()
+        try:
+            if self._buffer:
+                if self.stream is None:
+                    self.stream = self._open()
+
+                self.stream.write("".join(self._buffer))
+                self._buffer = []
+
+            if self.stream is not None:
+                self.stream.flush()
+
+                if self.should_rotate():
+                    self.rotate()
+        finally:
+            self.release()
+
+    def should_rotate(self) -> bool:
+        if (self.max_bytes is not None) and (self.stream.tell() >= self.max_bytes):
+            return True
+
+        if (self.max_age is not None) and (self._segment_start is not None):
+            return time.time() - self._segment_start >= self.max_age
+
+        return False
+
+    def rotate(self) -> None:
+        """
+        Closes the file and archives it as a compressed segment. The next write starts a new file.
+
+        :return: None
+        """
+        self.stream.close()
+        self.stream = None
+
+        try:
+            segments.archive_log_file(self.baseFilename)
+            self._segment_start = None
+
+        # Leave the file in place to be archived on a later flush
+        except OSError:
+            pass
+
+
+class BatchingQueueListener(QueueListener):
+    """
+    A queue listener that writes records from a single background thread.
+
+    Each record is routed to the handlers of the logger it was logged to,
+    and all handlers are flushed at least once every flush interval.
+    """
+
+    def __init__(self, log_queue: queue.Queue, flush_interval: float):
+        super().__init__(log_queue, respect_handler_level=True)
+        self.flush_interval = flush_interval
+
+        # Define a dictionary of {logger name: handlers}
+        self._routes = {}
+        self._next_flush_time = time.monotonic() + flush_interval
+
+    def add_route(self, logger_name: str, handlers) -> None:
+        """
+        Routes records of a logger to the given handlers
+
+        :param logger_name: The name of the logger
+        :param handlers: The handlers that will handle the logger's records
+        :return: None
+        """
+        self._routes[logger_name] = tuple(handlers)
+
+    def dequeue(self, block):
+        """
+        Waits for the next record, flushing the handlers whenever the flush interval elapses
+        """
+        while True:
+            timeout = self._next_flush_time - time.monotonic()
+
+            if timeout <= 0.0:
+                self.flush()
+                continue
+
+            try:
+                return self.queue.get(block, timeout)
+            except queue.Empty:
+                if not block:
+                    raise
+
+    def handle(self, record) -> None:
+        record = self.prepare(record)
+
+        for handler in self._routes.get(record.name, ()):
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+    def flush(self) -> None:
+        """
+        Flushes all routed handlers
+
+        :return: None
+        """
+        self._next_flush_time = time.monotonic() + self.flush_interval
+
+        for handlers in list(self._routes.values()):
+            for handler in handlers:
+                try:
+                    handler.flush()
+
+                # The stream was closed elsewhere, such as the console during interpreter shutdown
+                except (OSError, ValueError):
+                    pass
+
+    def stop(self) -> None:
+        super().stop()
+        self.flush()
+
+
+# Define the queue that measurement and output records are placed into
+# and the listener thread that writes them out of the control cycle
+_log_queue = queue.Queue()
+_log_listener = BatchingQueueListener(_log_queue, log_flush_interval)
+_log_listener_started = False
+
+
+def add_queued_handlers(logger, file_name) -> None:
+    """
+    Configures a logger to place its records into the log queue.
+    Records are written to the csv file in batches and to the console from the log listener thread.
+    The csv file is rotated into compressed archive segments as it grows.
+
+    :param logger: The logger to configure
+    :param file_name: The csv file to write the logger's records to
+    :return: None
+    """
+    global _log_listener_started
+
+    # Create a file formatter for the logger
+    f_handler = BatchedFileHandler(
+        file_name,
+        batch_size=log_batch_size,
+        max_bytes=log_segment_max_bytes,
+        max_age=log_segment_max_age
+    )
+    f_handler.setFormatter(csv_formatter)
+
+    # Create a stream formatter for the logger
+    s_handler = logging.StreamHandler()
+    s_handler.setFormatter(cons_formatter)
+
+    _log_listener.add_route(logger.name, (f_handler, s_handler))
+    logger.addHandler(QueueHandler(_log_queue))
+
+    # Start the listener with the first queued logger and ensure all records are written on exit
+    if not _log_listener_started:
+        _log_listener_started = True
+        _log_listener.start()
+        atexit.register(_log_listener.stop)
+
+
+def flush_logs() -> None:
+    """
+    Waits for all queued records to be handled and writes them to their files
+
+    :return: None
+    """
+    if _log_listener_started:
+        _log_queue.join()
+        _log_listener.flush()
 
 
 def create_measurement_logger(device_id):
@@ -15,7 +237,7 @@ def create_measurement_logger(device_id):
     logger = logging.getLogger(f"measurement-{device_id}")
     
         
-    if not logger.hasHandlers():
+    if not logger.handlers:
         
         logger.setLevel(logging.INFO)
 
@@ -24,15 +246,8 @@ def create_measurement_logger(device_id):
         file_name = os.path.join(log_directories["measurements"], f"{device_id}.csv")
         create_path_for_file(file_name)
 
-        # Create a file formatter for the logger
-        f_handler = logging.FileHandler(file_name)
-        f_handler.setFormatter(csv_formatter)
-        logger.addHandler(f_handler)
-
-        # Create a stream formatter for the logger
-        s_handler = logging.StreamHandler()
-        s_handler.setFormatter(cons_formatter)
-    logger.addHandler(s_handler)
+        # Write records from the log listener thread so that logging does not block the caller
+        add_queued_handlers(logger, file_name)
 
     # Return the logger object
     return logger
@@ -45,20 +260,14 @@ def create_output_logger(device_id):
     """
     logger = logging.getLogger(f"output-{device_id}")
     
-    if not logger.hasHandlers():
+    if not logger.handlers:
     
         logger.setLevel(logging.INFO)
 
         file_name = os.path.join(log_directories["outputs"], f"{device_id}.csv")
         create_path_for_file(file_name)
 
-        f_handler = logging.FileHandler(file_name)
-        f_handler.setFormatter(csv_formatter)
-        logger.addHandler(f_handler)
-
-        s_handler = logging.StreamHandler()
-        s_handler.setFormatter(cons_formatter)
-        logger.addHandler(s_handler)
+        add_queued_handlers(logger, file_name)
 
     return logger
 
@@ -69,7 +278,7 @@ def create_system_logger():
     """
     logger = logging.getLogger("system")
     
-    if not logger.hasHandlers():
+    if not logger.handlers:
     
         logger.setLevel(logging.INFO)
 
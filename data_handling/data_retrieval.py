@@ -1,10 +1,17 @@
+import copy
 import csv
 import datetime
+import multiprocessing
 import os
 import random
+from concurrent.futures import ProcessPoolExecutor
+from threading import Lock
 
+import numpy as np
+
+from data_handling import indexing, resampling, segments
 from data_handling.custom_logger import csv_formatter, log_directories
-from system.system_constants import base_log_directory
+from system.system_constants import base_log_directory, query_parallel_min_bytes
 
 
 def get_device_types():
@@ -22,7 +29,6 @@ def iget_log_dirs():
         item_path = os.path.join(base_log_directory, item)
         if os.path.isdir(item_path):
             yield item_path
-    raise StopIteration
 
 
 def iget_files_in_directory(dir, ext: str):
@@ -37,51 +43,245 @@ def iget_files_in_directory(dir, ext: str):
         item_path = os.path.join(dir, item)
         if os.path.isfile(item_path) and (item_path.split(".")[-1] == ext):
             yield item_path
-    raise StopIteration
 
 
-def iget_file_readings(csv_file_path):
+class ReadingColumns(object):
+    """
+    Readings loaded from a log file as columns.
+    Levels are categorical, stored as codes into the array of level names.
+    """
+
+    def __init__(self, timestamps: np.ndarray, levels: np.ndarray, level_names: np.ndarray, readings: np.ndarray):
+        """
+        :param timestamps: The datetime64 times the readings were logged at
+        :param levels: The code of the level each reading was logged at, None once readings are resampled
+        :param level_names: The names of the levels indexed by code, None once readings are resampled
+        :param readings: The float readings, NaN where the reading was not a number
+        """
+        self.timestamps = timestamps
+        self.levels = levels
+        self.level_names = level_names
+        self.readings = readings
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def level_mask(self, level: str) -> np.ndarray:
+        """
+        :param level: The level name to match
+        :return: A boolean array of the readings logged at the level
+        """
+        matches = np.flatnonzero(self.level_names == level)
+        if not len(matches):
+            return np.zeros(len(self), dtype=bool)
+        return self.levels == matches[0]
+
+
+# Define the position of the fields at the start of each log line, "YYYY-MM-DD HH:MM:SS, LEVEL, ..."
+TIMESTAMP_LENGTH = 19
+LEVEL_START = TIMESTAMP_LENGTH + 2
+LEVEL_LENGTH = 8
+
+
+def parse_readings(values: np.ndarray) -> np.ndarray:
+    """
+    Converts an array of byte strings to floats.
+    Values that are not numbers are converted to NaN.
+
+    :param values: The byte strings to convert
+    :return: The float array
+    """
+    try:
+        return values.astype(np.float64)
+    except ValueError:
+        pass
+
+    # Fall back on converting each value when some are not numbers
+    readings = np.empty(len(values), dtype=np.float64)
+    for i, value in enumerate(values):
+        try:
+            readings[i] = float(value)
+        except ValueError:
+            readings[i] = np.nan
+    return readings
+
+
+def load_file_readings(csv_file_path, start_offset: int = 0, end_offset: int = None) -> ReadingColumns:
     """
-    Generator function to get ALL data reading in a csv file
+    Loads ALL data readings in a csv file, or in a byte range of the file, into columns.
+    Fields are parsed for all lines at once rather than line by line.
 
     :param csv_file_path: The location of the csv file
-    :yield: Tuple of reading attributes
+    :param start_offset: The byte offset of the first line to read
+    :param end_offset: The byte offset to stop reading at, defaults to the end of the file
+    :return: The ReadingColumns of the file
     """
-    with open(csv_file_path, mode="r") as f:
-        csv_reader = csv.reader(f, quotechar='|')
-        for row in csv_reader:
-            # Currently assume all data logs will be only 3 data points per row
-            # Nice to explicitly declare the data size for now.
-            time, level, reading = row
-            yield (time, level, reading)
-    raise StopIteration
+    with open(csv_file_path, mode="rb") as f:
+        f.seek(start_offset)
+        data = f.read(-1 if end_offset is None else max(0, end_offset - start_offset))
+
+    return parse_log_data(data)
+
+
+def parse_log_data(data: bytes) -> ReadingColumns:
+    """
+    Parses the lines of a log into columns
+
+    :param data: The contents of the log
+    :return: The ReadingColumns of the log
+    """
+    lines = [line for line in data.splitlines() if line]
+    if not lines:
+        return ReadingColumns(
+            timestamps=np.empty(0, dtype="datetime64[s]"),
+            levels=np.empty(0, dtype=np.intp),
+            level_names=np.empty(0, dtype=str),
+            readings=np.empty(0, dtype=np.float64)
+        )
+
+    # Define the lines as a fixed width character matrix so that fields at fixed positions can be sliced out
+    width = max(max(len(line) for line in lines), LEVEL_START + LEVEL_LENGTH)
+    line_array = np.array(lines, dtype=f"S{width}")
+    characters = line_array.view(np.uint8).reshape(len(lines), width)
+
+    # Lines that do not start with a timestamp are not readings
+    valid = (characters[:, 4] == ord("-")) & (characters[:, 13] == ord(":"))
+    line_array = line_array[valid]
+    characters = characters[valid].copy()
+
+    # Convert the timestamps into ISO format and parse them
+    characters[:, 10] = ord("T")
+    timestamps = characters[:, :TIMESTAMP_LENGTH].copy().view(f"S{TIMESTAMP_LENGTH}").ravel()
+    timestamps = timestamps.astype("datetime64[s]")
+
+    # The level is the field following the timestamp
+    level_field = characters[:, LEVEL_START:LEVEL_START + LEVEL_LENGTH].copy().view(f"S{LEVEL_LENGTH}").ravel()
+    level_names, levels = np.unique(np.char.partition(level_field, b",")[:, 0], return_inverse=True)
+
+    # The reading is always the last field
+    readings = parse_readings(np.char.strip(np.char.rpartition(line_array, b",")[:, 2]))
+
+    return ReadingColumns(
+        timestamps=timestamps,
+        levels=levels.ravel(),
+        level_names=level_names.astype(str),
+        readings=readings
+    )
+
+
+def iget_file_lines(file, end_offset=None):
+    """
+    Generator function to decode the lines of a binary file up to an offset
+
+    :param file: The binary file positioned at the first line to yield
+    :param end_offset: The byte offset to stop yielding lines at, defaults to the end of the file
+    :yield: Decoded lines
+    """
+    position = file.tell()
+    for line in file:
+        if (end_offset is not None) and (position >= end_offset):
+            break
+        position += len(line)
+        yield line.decode()
+
+
+def iget_line_readings(lines):
+    """
+    Generator function to split log lines into their reading fields.
+    Fields are yielded as the strings logged, use load_file_readings to get typed columns instead.
+
+    :param lines: The decoded lines of a log
+    :yield: Tuple of the reading time, level, and reading strings
+    """
+    csv_reader = csv.reader(lines, quotechar='|')
+    for row in csv_reader:
+        # Rows start with the time and level, the reading is always the last data point.
+        # Measurement logs also hold the sensor id in between.
+        time, level, reading = row[0], row[1], row[-1]
+        yield (time, level, reading)
+
+
+def iget_file_readings(csv_file_path, start_offset: int = 0, end_offset: int = None):
+    """
+    Generator function to get ALL data reading in a csv file, or in a byte range of the file
+
+    :param csv_file_path: The location of the csv file
+    :param start_offset: The byte offset of the first line to read
+    :param end_offset: The byte offset to stop reading at, defaults to the end of the file
+    :yield: Tuple of the reading time, level, and reading strings
+    """
+    with open(csv_file_path, mode="rb") as f:
+        f.seek(start_offset)
+        yield from iget_line_readings(iget_file_lines(f, end_offset))
+
+
+def concatenate_readings(parts: list) -> ReadingColumns:
+    """
+    Joins readings loaded in several parts, such as from several segments of a log
+
+    :param parts: The ReadingColumns to join in order
+    :return: The joined ReadingColumns
+    """
+    if len(parts) == 1:
+        return parts[0]
+
+    # Levels are coded differently in each part, so code them again from their names
+    level_names, levels = np.unique(
+        np.concatenate([part.level_names[part.levels] for part in parts] + [np.empty(0, dtype=str)]),
+        return_inverse=True
+    )
+
+    return ReadingColumns(
+        timestamps=np.concatenate([part.timestamps for part in parts] + [np.empty(0, dtype="datetime64[s]")]),
+        levels=levels.ravel(),
+        level_names=level_names,
+        readings=np.concatenate([part.readings for part in parts] + [np.empty(0, dtype=np.float64)])
+    )
+
+
+def load_segment_readings(segment_path, start_time: datetime.datetime = None,
+                          end_time: datetime.datetime = None) -> ReadingColumns:
+    """
+    Loads the readings of a compressed archive segment logged within a time-range into columns
+
+    :param segment_path: The path of the archived segment
+    :param start_time: The earliest time to load readings from
+    :param end_time: The latest time to load readings from
+    :return: The ReadingColumns within the time-range
+    """
+    columns = parse_log_data(segments.read_segment(segment_path))
+
+    mask = np.ones(len(columns), dtype=bool)
+    if start_time is not None:
+        mask &= columns.timestamps >= np.datetime64(start_time.replace(microsecond=0))
+    if end_time is not None:
+        mask &= columns.timestamps <= np.datetime64(end_time)
+
+    return ReadingColumns(columns.timestamps[mask], columns.levels[mask], columns.level_names, columns.readings[mask])
 
 
 def time_filter(start_time: datetime.datetime, end_time: datetime.datetime):
     """
     Generator function to iterate through a Generator statement
-    and return measurements that fall within the specified time range
+    and return measurements that fall within the specified time range.
+    Data is logged in time order, so iteration stops at the first measurement past the end time.
     """
 
     def decorate(func):
         def call(*args, **kwargs):
             for data in func(*args, **kwargs):
-                time_valid = True
-                data_timestamp = datetime.datetime.strptime(data[0], csv_formatter.datefmt)
+                data_timestamp = data[0]
+                if isinstance(data_timestamp, str):
+                    data_timestamp = datetime.datetime.strptime(data_timestamp, csv_formatter.datefmt)
 
-                # Filter out results that are outside of the datetime range
-                if start_time > data_timestamp:
-                    time_valid = False
-                if data_timestamp < data_timestamp:
-                    time_valid = False
+                # Stop once the data is past the end of the datetime range
+                if (end_time is not None) and (data_timestamp > end_time):
+                    return
 
                 # Only yield results within the range
-                if time_valid:
+                if (start_time is None) or (data_timestamp >= start_time):
                     yield data
 
-            # Stop the Iterator
-            raise StopIteration
-
         return call
 
     return decorate
@@ -90,7 +290,7 @@ def time_filter(start_time: datetime.datetime, end_time: datetime.datetime):
 def priority_filter(level_wanted):
     """
     Generator function to iterate through a Generator statement
-    and return measurements that fall within the specified time range
+    and return measurements that were logged at the specified level
     """
 
     def decorate(func):
@@ -99,35 +299,60 @@ def priority_filter(level_wanted):
                 # Retrieve the level that the data was logged at
                 level = data[1]
 
-                # Filter out results that are outside of the datetime range
+                # Filter out results that were logged at other levels
                 if level == level_wanted:
                     yield data
 
-            # Stop the yield loop
-            raise StopIteration
-
         return call
 
     return decorate
 
 
+def load_time_filtered_readings(csv_file_path, start_time, end_time, read_only: bool = False) -> ReadingColumns:
+    """
+    Loads the readings of a log logged within a time-range into columns.
+    Archived segments of the log overlapping the time-range are read first,
+    then the index of the live csv file is binary searched so that only the lines within the range are read.
+
+    :param csv_file_path:   The file-path of the csv file to retrieve values from
+    :param start_time:      The earliest time to load readings from
+    :param end_time:        The latest time to load readings from
+    :param read_only:       Whether to leave the index file as it is rather than bringing it up to date
+    :return:                The ReadingColumns within the time-range
+    """
+    parts = [
+        load_segment_readings(segment_path, start_time, end_time)
+        for segment_path in segments.iget_segments(csv_file_path, start_time, end_time)
+    ]
+
+    # The live file is missing once a log has been archived, until the device logs again
+    if os.path.isfile(csv_file_path):
+        start_offset, end_offset = indexing.get_time_range_offsets(csv_file_path, start_time, end_time, read_only)
+        parts.append(load_file_readings(csv_file_path, start_offset, end_offset))
+
+    return concatenate_readings(parts)
+
+
 def iget_time_filtered_data(csv_file_path, start_time, end_time):
     """
-    A generator function to filter out data-points that within a certain time-range
+    A generator function to filter out data-points that within a certain time-range.
+    Both archived segments and the live csv file are read.
+    The index of the live file is binary searched so that only the lines within the range are read.
 
     :param csv_file_path:   The file-path of the csv file to retrieve values from
     :param start_time:      The time to start yielding data
     :param end_time:        The time to stop yielding data
-    :yield:             Data within the time-range
+    :yield:             Tuple of the reading time, level, and reading strings within the time-range
     """
+    for segment_path in segments.iget_segments(csv_file_path, start_time, end_time):
+        lines = segments.read_segment(segment_path).decode().splitlines()
 
-    @time_filter(start_time, end_time)
-    def get_data():
-        for data in iget_file_readings(csv_file_path):
-            yield data
-        raise StopIteration
+        # Segments are whole logs, so their readings are filtered by time as they are read
+        yield from time_filter(start_time, end_time)(iget_line_readings)(lines)
 
-    get_data()
+    if os.path.isfile(csv_file_path):
+        start_offset, end_offset = indexing.get_time_range_offsets(csv_file_path, start_time, end_time)
+        yield from iget_file_readings(csv_file_path, start_offset, end_offset)
 
 
 def iget_deltatime_filtered_data(csv_file_path, time_delta: datetime.timedelta):
@@ -143,13 +368,298 @@ def iget_deltatime_filtered_data(csv_file_path, time_delta: datetime.timedelta):
     end_time = datetime.datetime.now()
     start_time = end_time - time_delta
 
-    @time_filter(start_time, end_time)
-    def get_data():
-        for data in iget_file_readings(csv_file_path):
-            yield data
-        raise StopIteration
+    yield from iget_time_filtered_data(csv_file_path, start_time, end_time)
+
+
+def resample_readings(columns: ReadingColumns, interval: datetime.timedelta, aggregate: str = "mean") -> ReadingColumns:
+    """
+    Aggregates readings into regular time buckets.
+    Levels are not kept once readings are combined.
+
+    :param columns: The readings to resample
+    :param interval: The width of each time bucket
+    :param aggregate: The aggregate of each bucket to keep, one of "min", "max", "mean", or "last"
+    :return: The ReadingColumns holding the start time and aggregate reading of each bucket containing readings
+    """
+    buckets = resampling.bucket_readings(columns.timestamps, columns.readings, interval).non_empty()
+
+    return ReadingColumns(
+        timestamps=buckets.timestamps,
+        levels=None,
+        level_names=None,
+        readings=buckets.get_aggregate(aggregate)
+    )
+
+
+# Store the pool of processes that load log files in parallel, started on first use and shared by all queries
+_query_executor = None
+_query_executor_workers = None
+_query_executor_lock = Lock()
+
+
+def get_query_executor(max_workers: int = None) -> ProcessPoolExecutor:
+    """
+    Retrieves the shared pool of query processes, starting it if needed.
+    Starting an interpreter and importing numpy costs more than loading a few logs,
+    so the processes are kept for the lifetime of the system rather than started for every query.
+
+    :param max_workers: The maximum number of processes to use, defaults to the number of processors
+    :return: The ProcessPoolExecutor
+    """
+    global _query_executor, _query_executor_workers
+
+    with _query_executor_lock:
+        # A pool of another size is replaced, which only happens when callers ask for different sizes
+        if (_query_executor is not None) and (_query_executor_workers != max_workers):
+            _query_executor.shutdown(wait=True)
+            _query_executor = None
+
+        if _query_executor is None:
+            # Workers are spawned rather than forked so that they do not inherit the locks and threads of the system
+            _query_executor = ProcessPoolExecutor(
+                max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"))
+            _query_executor_workers = max_workers
+
+        return _query_executor
+
+
+def shutdown_query_executor() -> None:
+    """
+    Stops the shared pool of query processes if it was started
+
+    :return: None
+    """
+    global _query_executor
+
+    with _query_executor_lock:
+        if _query_executor is not None:
+            _query_executor.shutdown(wait=True)
+            _query_executor = None
+
+
+class LogQuery(object):
+    """
+    A lazily evaluated query over the log files of a device type.
+
+    Each method returns a new query with the filter added, nothing is read until the query is loaded or iterated.
+    Time filters are pushed down into the index of each file so that only the lines within the range are read,
+    and files of devices that are not wanted are never opened.
+    """
+
+    def __init__(self, device_type: str = "measurements", read_only: bool = False):
+        """
+        :param device_type: The log directory to query
+        :param read_only: Whether to leave index files as they are, for queries run while the IndexMaintainer is
+        """
+        self.directory = log_directories[device_type]
+
+        self.start_time = None
+        self.end_time = None
+        self.levels = None
+        self.device_ids = None
+        self.resample_interval = None
+        self.resample_aggregate = "mean"
+
+        # Define whether index files are left as they are, so that they are only written by the IndexMaintainer
+        self.read_only = read_only
+
+    def _with(self, **attributes) -> "LogQuery":
+        query = copy.copy(self)
+        for name, value in attributes.items():
+            setattr(query, name, value)
+        return query
+
+    def where_time(self, start: datetime.datetime = None, end: datetime.datetime = None) -> "LogQuery":
+        """
+        :param start: The earliest time to include, defaults to the start of the logs
+        :param end: The latest time to include, defaults to the end of the logs
+        :return: The query filtered to the time range
+        """
+        return self._with(start_time=start, end_time=end)
+
+    def where_level(self, *levels: str) -> "LogQuery":
+        """
+        :param levels: The level names to include
+        :return: The query filtered to the levels
+        """
+        return self._with(levels=levels)
+
+    def sensors(self, device_ids) -> "LogQuery":
+        """
+        :param device_ids: The ids of the devices to include
+        :return: The query filtered to the devices
+        """
+        return self._with(device_ids=list(device_ids))
+
+    def resample(self, interval: datetime.timedelta, aggregate: str = "mean") -> "LogQuery":
+        """
+        :param interval: The width of each time bucket readings are aggregated into
+        :param aggregate: The aggregate of each bucket to keep, one of "min", "max", "mean", or "last"
+        :return: The query with readings resampled
+        """
+        return self._with(resample_interval=interval, resample_aggregate=aggregate)
+
+    def iget_files(self):
+        """
+        Generator function to retrieve the device id and live file path of each log included in the query
+
+        :yield: Tuple of the device id and file path
+        """
+        device_ids = self.device_ids
+        if device_ids is None:
+            # Include devices that only have archived segments
+            archive_directory = os.path.join(self.directory, "archive")
+            archived_ids = os.listdir(archive_directory) if os.path.isdir(archive_directory) else []
+            live_ids = [os.path.splitext(os.path.basename(f))[0] for f in iget_files_in_directory(self.directory, "csv")]
+            device_ids = sorted(set(live_ids).union(archived_ids))
+
+        for device_id in device_ids:
+            file_path = os.path.join(self.directory, f"{device_id}.csv")
+            if os.path.isfile(file_path) or os.path.isfile(segments.get_manifest_path(file_path)):
+                yield device_id, file_path
+
+    def load_file(self, file_path) -> ReadingColumns:
+        """
+        Applies the query to a single log file
+
+        :param file_path: The log file to load
+        :return: The ReadingColumns matching the query
+        """
+        columns = load_time_filtered_readings(file_path, self.start_time, self.end_time, self.read_only)
+
+        if self.levels is not None:
+            mask = np.zeros(len(columns), dtype=bool)
+            for level in self.levels:
+                mask |= columns.level_mask(level)
+
+            columns = ReadingColumns(
+                timestamps=columns.timestamps[mask],
+                levels=columns.levels[mask],
+                level_names=columns.level_names,
+                readings=columns.readings[mask]
+            )
+
+        if self.resample_interval is not None:
+            columns = resample_readings(columns, self.resample_interval, self.resample_aggregate)
+
+        return columns
+
+    def load(self) -> dict:
+        """
+        Runs the query
+
+        :return: A dictionary containing the {device id: ReadingColumns}
+        """
+        return {device_id: self.load_file(file_path) for device_id, file_path in self.iget_files()}
+
+    def load_parallel(self, max_workers: int = None,
+                      min_parallel_bytes: int = query_parallel_min_bytes) -> dict:
+        """
+        Runs the query with each file loaded by a separate process of the shared query pool
+
+        :param max_workers: The maximum number of processes to use, defaults to the number of processors
+        :param min_parallel_bytes: The total size of the live log files below which the files are loaded serially
+        :return: A dictionary containing the {device id: ReadingColumns}
+        """
+        files = list(self.iget_files())
+        total_bytes = sum(os.path.getsize(file_path) for device_id, file_path in files if os.path.isfile(file_path))
+
+        # Index files are only read so that they are never written at the same time as by the IndexMaintainer
+        query = self._with(read_only=True)
+
+        # Handing files to other processes is not worth it for a single file or a little data
+        if (len(files) < 2) or (total_bytes < min_parallel_bytes):
+            return {device_id: query.load_file(file_path) for device_id, file_path in files}
+
+        results = get_query_executor(max_workers).map(query.load_file, [file_path for device_id, file_path in files])
+        return {device_id: columns for (device_id, file_path), columns in zip(files, results)}
+
+    def load_aligned(self, max_workers: int = None) -> "ReadingFrame":
+        """
+        Runs the query in parallel and aligns the readings of all devices by time
+
+        :param max_workers: The maximum number of processes to use, defaults to the number of processors
+        :return: The ReadingFrame of all devices
+        """
+        return align_readings(self.load_parallel(max_workers))
+
+    def __iter__(self):
+        """
+        Runs the query one file at a time
+
+        :yield: Tuple of the device id, reading time, and reading
+        """
+        for device_id, file_path in self.iget_files():
+            columns = self.load_file(file_path)
+            for timestamp, reading in zip(columns.timestamps.tolist(), columns.readings.tolist()):
+                yield device_id, timestamp, reading
+
+
+class ReadingFrame(object):
+    """
+    Readings of several devices aligned to a shared set of times
+    """
+
+    def __init__(self, timestamps: np.ndarray, device_ids: list, readings: np.ndarray):
+        """
+        :param timestamps: The sorted datetime64 times of the rows
+        :param device_ids: The device id of each column
+        :param readings: A 2D float array of readings by [row, column], NaN where a device has no reading at a time
+        """
+        self.timestamps = timestamps
+        self.device_ids = device_ids
+        self.readings = readings
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def get_device_readings(self, device_id) -> np.ndarray:
+        """
+        :param device_id: The device to get the readings of
+        :return: The column of readings of the device
+        """
+        return self.readings[:, self.device_ids.index(device_id)]
+
+
+def align_readings(device_readings: dict) -> ReadingFrame:
+    """
+    Merges the readings of several devices into a frame with a row for every time any device has a reading.
+    When a device has several readings at the same time the last one is used.
+
+    :param device_readings: A dictionary containing the {device id: ReadingColumns}
+    :return: The aligned ReadingFrame
+    """
+    device_ids = list(device_readings)
+
+    all_timestamps = [columns.timestamps.astype("datetime64[s]") for columns in device_readings.values()]
+    timestamps = np.unique(np.concatenate(all_timestamps)) if all_timestamps else np.empty(0, "datetime64[s]")
+
+    readings = np.full((len(timestamps), len(device_ids)), np.nan)
+    for column, device_timestamps in enumerate(all_timestamps):
+        rows = np.searchsorted(timestamps, device_timestamps)
+        readings[rows, column] = device_readings[device_ids[column]].readings
+
+    return ReadingFrame(timestamps, device_ids, readings)
+
+
+def query_devices(device_ids, start_time: datetime.datetime = None, end_time: datetime.datetime = None,
+                  interval: datetime.timedelta = None, max_workers: int = None) -> ReadingFrame:
+    """
+    Loads the measurements of several devices within a time window in parallel
+
+    :param device_ids: The ids of the devices to load
+    :param start_time: The earliest time to load, defaults to the start of the logs
+    :param end_time: The latest time to load, defaults to the end of the logs
+    :param interval: The width of the time buckets readings are averaged into, by default readings are not resampled
+    :param max_workers: The maximum number of processes to use, defaults to the number of processors
+    :return: The ReadingFrame of the devices
+    """
+    query = LogQuery().sensors(device_ids).where_time(start_time, end_time)
+
+    if interval is not None:
+        query = query.resample(interval)
 
-    return get_data()
+    return query.load_aligned(max_workers)
 
 
 def get_rand_data():
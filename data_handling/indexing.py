@@ -1,104 +1,363 @@
+import calendar
 import datetime
 import os.path
+import struct
+from array import array
+from threading import Thread, Event
 
-from data_handling.data_retrieval import iget_log_dirs, iget_files_in_directory
+from data_handling import custom_logger, data_retrieval
+from system import system_constants
 from system.system_constants import csv_formatter, log_directories
 
+# Create a logger to log general system information
+system_logger = custom_logger.create_system_logger()
+
 
 # Index files created for fast searching of sensor readings.
 # With this measurements can be binary searched for time filters in the range.
-# I will come back to this if it is needed.
+#
+# An index file is stored next to the log file as {log file}.index and consists of a header followed by entries.
+# The header holds a magic string, the inode of the log file, the number of bytes of the log file that were indexed
+# and the number of entries. Each entry holds the timestamp of a line in seconds followed by the byte offset
+# of the start of the line, both as native 64 bit integers so that the entries can be loaded straight into an array.
+#
+# Log files are only ever appended to, so an index is brought up to date by indexing the tail written since.
+# A log file that was replaced or truncated is detected by its inode and size, and is indexed from the start again.
+
+# Define the header of an index file
+INDEX_HEADER = struct.Struct("<4sQQQ")
+INDEX_MAGIC = b"TIX2"
+
+# Define the number of bytes each entry takes up in the index file
+ENTRY_SIZE = 2 * array("q").itemsize
 
+# Define the number of characters of the timestamp at the start of each log line
+TIMESTAMP_LENGTH = len(datetime.datetime(2000, 1, 1).strftime(csv_formatter.datefmt))
 
-def index_character_in_file(file_path, char="\n") -> None:
+
+class LogIndex(object):
     """
-    Get all byte indexes of a character in a file and write these to a file
+    The index of a log file as loaded from disk
     """
 
-    character_locations = []
-    with open(file_path, newline=char) as file:
-        # for l in file:
-        line = file.readline()
-        while line:
-            character_locations.append(str(file.tell()))
-            line = file.readline()
+    def __init__(self, inode: int, indexed_size: int, entries: array):
+        """
+        :param inode: The inode of the log file that was indexed
+        :param indexed_size: The number of bytes of the log file that were indexed
+        :param entries: An array of [timestamp, offset, ...] entries
+        """
+        self.inode = inode
+        self.indexed_size = indexed_size
+        self.entries = entries
 
-    create_index_file(file_path, character_locations)
+    def __len__(self):
+        return len(self.entries) // 2
 
 
-# Create a CSV .index file
-def create_index_file(file_path, indexes) -> None:
-    with open(f"{file_path}.index", "w") as f:
-        f.write("\n".join(indexes))
+def get_index_path(file_path) -> str:
+    return f"{file_path}.index"
 
 
-def index_all_logs() -> None:
+def to_index_time(timestamp: datetime.datetime) -> int:
     """
-    Index all csv files in the log folders
+    Converts a timestamp to the whole seconds stored in the index.
+    Timestamps are compared as wall clock times, the same way they are written to the logs.
+
+    :param timestamp: The timestamp to convert
+    :return: The number of seconds since the epoch
     """
-    for dir in iget_log_dirs():
-        for file in iget_files_in_directory(dir, "csv"):
-            index_character_in_file(file, char="\n")
+    return calendar.timegm(timestamp.timetuple())
 
 
-def search_file_for_timestamp_boundry(file_path, time_boundry: datetime.datetime):
+def parse_line_timestamp(line: bytes):
     """
+    Parses the timestamp at the start of a log line
 
-    :param file_path: The file path to search through
-    :return:
+    :param line: The log line
+    :return: The timestamp in index seconds, or None if the line does not start with a timestamp
     """
-    index_file = f"{file_path}.index"
-    char_indexes = None
+    try:
+        timestamp = datetime.datetime.strptime(line[:TIMESTAMP_LENGTH].decode(), csv_formatter.datefmt)
+    except (UnicodeDecodeError, ValueError):
+        return None
 
-    with open(index_file) as f:
-        char_indexes = [int(l) for l in f.readlines()]
+    return to_index_time(timestamp)
 
-    # if char_indexes is None:
-    #    index_character_in_file(file_path)
 
-    with open(file_path) as f:
+def index_lines(file_path, start_offset: int = 0) -> tuple:
+    """
+    Index the start of every complete line of a log file from an offset
 
-        boundary_found = False
+    :param file_path: The log file to index
+    :param start_offset: The byte offset of the first line to index
+    :return: A tuple of the new entries and the number of bytes of the file indexed
+    """
 
-        index_upper_limit = len(char_indexes) - 1
-        upper_check = index_upper_limit
-        lower_check = 0
+    entries = array("q")
+    indexed_size = start_offset
 
-        while not boundary_found:
-            if upper_check == lower_check + 1:
-                boundary_found = True
+    with open(file_path, "rb") as file:
+        file.seek(start_offset)
+        for line in file:
+
+            # Leave a partially written last line to be indexed once it is complete
+            if not line.endswith(b"\n"):
                 break
 
-            # Declare the index to be found
-            index_to_find = int((upper_check + lower_check) / 2) - 1
+            timestamp = parse_line_timestamp(line)
+
+            # Lines without a timestamp are treated as a part of the previous line
+            if timestamp is not None:
+                entries.append(timestamp)
+                entries.append(indexed_size)
+
+            indexed_size += len(line)
+
+    return entries, indexed_size
+
+
+def index_log_file(file_path) -> None:
+    """
+    Index the start of every complete line of a log file and write the index file
+    """
+    inode = os.stat(file_path).st_ino
+    entries, indexed_size = index_lines(file_path)
+    create_index_file(file_path, LogIndex(inode, indexed_size, entries))
+
+
+# Create a binary .index file
+def create_index_file(file_path, index: LogIndex) -> None:
+    with open(get_index_path(file_path), "wb") as f:
+        f.write(INDEX_HEADER.pack(INDEX_MAGIC, index.inode, index.indexed_size, len(index)))
+        f.write(index.entries.tobytes())
+
+
+def append_index_file(file_path, index: LogIndex, entries: array, indexed_size: int) -> None:
+    """
+    Appends new entries to an index file.
+    The header is written last so that an interrupted append leaves the previous index intact.
+
+    :param file_path: The log file the index belongs to
+    :param index: The index currently on disk
+    :param entries: The entries to append
+    :param indexed_size: The number of bytes of the log file indexed including the new entries
+    :return: None
+    """
+    with open(get_index_path(file_path), "r+b") as f:
+        f.seek(INDEX_HEADER.size + len(index) * ENTRY_SIZE)
+        f.write(entries.tobytes())
+        f.truncate()
+        f.seek(0)
+        f.write(INDEX_HEADER.pack(INDEX_MAGIC, index.inode, indexed_size, len(index) + len(entries) // 2))
+
+    index.entries.extend(entries)
+    index.indexed_size = indexed_size
+
+
+def load_index(file_path):
+    """
+    Loads the index of a log file
+
+    :param file_path: The log file to load the index of
+    :return: The LogIndex of the file, or None if there is no valid index
+    """
+    try:
+        with open(get_index_path(file_path), "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return None
+
+    if len(data) < INDEX_HEADER.size:
+        return None
+
+    magic, inode, indexed_size, entry_count = INDEX_HEADER.unpack_from(data)
+    entries_end = INDEX_HEADER.size + entry_count * ENTRY_SIZE
+    if (magic != INDEX_MAGIC) or (len(data) < entries_end):
+        return None
+
+    entries = array("q")
+    entries.frombytes(data[INDEX_HEADER.size:entries_end])
+
+    return LogIndex(inode, indexed_size, entries)
+
+
+def update_index(file_path) -> LogIndex:
+    """
+    Brings the index of a log file up to date, only indexing the part of the file appended since the last update.
+    The file is indexed from the start if there is no index or the file was replaced or truncated.
+
+    :param file_path: The log file to update the index of
+    :return: The updated LogIndex
+    """
+    index = load_index(file_path)
+    file_stat = os.stat(file_path)
+
+    if (index is None) or (index.inode != file_stat.st_ino) or (index.indexed_size > file_stat.st_size):
+        index_log_file(file_path)
+        return load_index(file_path)
+
+    if index.indexed_size < file_stat.st_size:
+        entries, indexed_size = index_lines(file_path, index.indexed_size)
+        if indexed_size > index.indexed_size:
+            append_index_file(file_path, index, entries, indexed_size)
+
+    return index
+
+
+def read_index(file_path) -> LogIndex:
+    """
+    Gets an up to date index of a log file without writing to the index file.
+    The part of the file the index file does not cover is indexed in memory, so that the index file
+    is only ever written by a single process while other processes, such as query workers, read it.
+
+    :param file_path: The log file to get the index of
+    :return: The up to date LogIndex
+    """
+    index = load_index(file_path)
+    file_stat = os.stat(file_path)
+
+    if (index is None) or (index.inode != file_stat.st_ino) or (index.indexed_size > file_stat.st_size):
+        entries, indexed_size = index_lines(file_path)
+        return LogIndex(file_stat.st_ino, indexed_size, entries)
+
+    if index.indexed_size < file_stat.st_size:
+        entries, index.indexed_size = index_lines(file_path, index.indexed_size)
+        index.entries.extend(entries)
+
+    return index
+
+
+def index_all_logs() -> None:
+    """
+    Bring the indexes of all csv files in the log folders up to date
+    """
+    for dir in data_retrieval.iget_log_dirs():
+        for file in data_retrieval.iget_files_in_directory(dir, "csv"):
+            update_index(file)
 
-            char_limits = char_indexes[index_to_find:index_to_find + 2]
-            lower_char_limit, upper_char_lim = char_limits
-            chars_to_read = upper_char_lim - lower_char_limit - 2
 
-            f.seek(lower_char_limit)
-            line = f.read(chars_to_read)
+class IndexMaintainer(object):
+    """
+    Periodically brings the indexes of all log files up to date from a background thread.
+    Since only newly appended data is indexed, each pass costs time proportional to the data logged since the last.
+    """
+
+    def __init__(self, interval: float = system_constants.log_index_interval):
+        """
+        :param interval: The time in seconds to wait between indexing passes
+        """
+        self.interval = interval
+
+        self._stop_event = Event()
+        self._thread = None
+
+    def start(self) -> None:
+        """
+        Starts the indexing thread
+
+        :return: None
+        """
+        self._thread = Thread(target=self.index_loop, name="log-indexer", daemon=True)
+        self._thread.start()
 
-            time_str = line.split(",")[0]
-            time_line = datetime.datetime.strptime(time_str, csv_formatter.datefmt)
+    def index_loop(self) -> None:
+        """
+        Indexes all logs until the maintainer is stopped
 
-            if time_line > time_boundry:
-                pass
+        :return: None
+        """
+        while not self._stop_event.is_set():
+            try:
+                index_all_logs()
 
+            # Log files may be rotated or removed while they are being indexed
+            except OSError as e:
+                system_logger.warning(f"Unable to index log files: {e!r}")
 
-            elif time_line < time_boundry:
-                pass
+            self._stop_event.wait(self.interval)
+
+    def stop(self) -> None:
+        """
+        Stops the indexing thread after the current pass
+
+        :return: None
+        """
+        self._stop_event.set()
+
+
+def bisect_timestamps(entries: array, timestamp: int, after: bool = False) -> int:
+    """
+    Binary searches the entries of an index for a timestamp
 
+    :param entries: The index entries to search
+    :param timestamp: The timestamp in index seconds to search for
+    :param after: Whether to find the first entry after the timestamp rather than at or after it
+    :return: The number of the first entry found, or the number of entries if there is none
+    """
+    lower_check = 0
+    upper_check = len(entries) // 2
+
+    while lower_check < upper_check:
+        index_to_check = (lower_check + upper_check) // 2
+        time_line = entries[2 * index_to_check]
+
+        if (time_line < timestamp) or (after and time_line == timestamp):
+            lower_check = index_to_check + 1
+        else:
+            upper_check = index_to_check
+
+    return lower_check
+
+
+def get_entry_offset(index: LogIndex, entry_number: int) -> int:
+    """
+    :return: The byte offset of an entry, or the number of bytes indexed if the entry is past the end
+    """
+    if entry_number >= len(index):
+        return index.indexed_size
+
+    return index.entries[2 * entry_number + 1]
+
+
+def search_file_for_timestamp_boundry(file_path, time_boundry: datetime.datetime) -> int:
+    """
+    Finds the byte offset of the first line logged at or after a time
+
+    :param file_path: The file path to search through
+    :param time_boundry: The time to search for
+    :return: The byte offset of the line
+    """
+    index = update_index(file_path)
+    return get_entry_offset(index, bisect_timestamps(index.entries, to_index_time(time_boundry)))
+
+
+def get_time_range_offsets(file_path, start_time: datetime.datetime = None,
+                           end_time: datetime.datetime = None, read_only: bool = False) -> tuple:
+    """
+    Finds the byte range of a log file holding the lines logged within a time range
+
+    :param file_path: The file path to search through
+    :param start_time: The earliest time to include, defaults to the start of the file
+    :param end_time: The latest time to include, defaults to the end of the file
+    :param read_only: Whether to leave the index file as it is rather than bringing it up to date
+    :return: A tuple of the start and end byte offsets of the range
+    """
+    index = read_index(file_path) if read_only else update_index(file_path)
 
-            else:
-                pass
+    start_offset = 0
+    if start_time is not None:
+        start_offset = get_entry_offset(index, bisect_timestamps(index.entries, to_index_time(start_time)))
 
+    end_offset = index.indexed_size
+    if end_time is not None:
+        end_offset = get_entry_offset(index, bisect_timestamps(index.entries, to_index_time(end_time), after=True))
 
+    return start_offset, max(start_offset, end_offset)
 
 
 if __name__ == '__main__':
     print("Indexing started")
     index_all_logs()
     print("Indexing completed")
-    search_file_for_timestamp_boundry(os.path.join(log_directories["measurements"], "dummy_id.csv"),
-                                      datetime.datetime.now())
+    print(search_file_for_timestamp_boundry(os.path.join(log_directories["measurements"], "dummy_id.csv"),
+                                            datetime.datetime.now()))
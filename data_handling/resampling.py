@@ -0,0 +1,177 @@
+"""
+Resampling of irregularly logged readings onto regular time grids, and downsampling of readings for display
+"""
+
+import datetime
+
+import numpy as np
+
+
+class ResampledReadings(object):
+    """
+    Readings aggregated into regular time buckets.
+    Buckets without readings have a count of 0 and NaN aggregates.
+    """
+
+    def __init__(self, timestamps: np.ndarray, minimum: np.ndarray, maximum: np.ndarray, mean: np.ndarray,
+                 last: np.ndarray, count: np.ndarray):
+        """
+        :param timestamps: The datetime64 start time of each bucket
+        :param minimum: The lowest reading in each bucket
+        :param maximum: The highest reading in each bucket
+        :param mean: The average reading in each bucket
+        :param last: The latest reading in each bucket
+        :param count: The number of readings in each bucket
+        """
+        self.timestamps = timestamps
+        self.min = minimum
+        self.max = maximum
+        self.mean = mean
+        self.last = last
+        self.count = count
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def get_aggregate(self, aggregate: str) -> np.ndarray:
+        """
+        :param aggregate: The name of the aggregate, one of "min", "max", "mean", or "last"
+        :return: The aggregate of each bucket
+        """
+        if aggregate not in ("min", "max", "mean", "last"):
+            raise ValueError(f"Unknown aggregate: {aggregate}")
+        return getattr(self, aggregate)
+
+    def non_empty(self) -> "ResampledReadings":
+        """
+        :return: The buckets that contain readings
+        """
+        mask = self.count > 0
+        return ResampledReadings(
+            self.timestamps[mask], self.min[mask], self.max[mask], self.mean[mask], self.last[mask], self.count[mask])
+
+
+def bucket_readings(timestamps: np.ndarray, readings: np.ndarray, interval: datetime.timedelta,
+                    start_time: np.datetime64 = None, end_time: np.datetime64 = None) -> ResampledReadings:
+    """
+    Aggregates readings into buckets on a regular time grid.
+    Readings that are not numbers are left out of the aggregates.
+
+    :param timestamps: The datetime64 times of the readings
+    :param readings: The float readings
+    :param interval: The width of each bucket
+    :param start_time: The start of the grid, defaults to the bucket of the earliest reading
+    :param end_time: The end of the grid, defaults to the bucket of the latest reading
+    :return: The ResampledReadings with a bucket for every interval of the grid
+    """
+
+    # Work in whole seconds since the epoch
+    step = max(1, int(interval.total_seconds()))
+    seconds = timestamps.astype("datetime64[s]").astype(np.int64)
+
+    # Leave readings that are not numbers out
+    numeric = ~np.isnan(readings)
+    seconds = seconds[numeric]
+    readings = readings[numeric]
+
+    if start_time is not None:
+        grid_start = np.datetime64(start_time, "s").astype(np.int64) // step
+    elif len(seconds):
+        grid_start = seconds.min() // step
+    else:
+        grid_start = 0
+
+    if end_time is not None:
+        grid_end = np.datetime64(end_time, "s").astype(np.int64) // step
+    elif len(seconds):
+        grid_end = seconds.max() // step
+    else:
+        grid_end = grid_start - 1
+
+    bucket_count = max(0, int(grid_end - grid_start + 1))
+    buckets = seconds // step - grid_start
+
+    # Leave readings outside of the grid out
+    in_grid = (buckets >= 0) & (buckets < bucket_count)
+    buckets = buckets[in_grid]
+    seconds = seconds[in_grid]
+    readings = readings[in_grid]
+
+    minimum = np.full(bucket_count, np.nan)
+    maximum = np.full(bucket_count, np.nan)
+    mean = np.full(bucket_count, np.nan)
+    last = np.full(bucket_count, np.nan)
+    count = np.bincount(buckets, minlength=bucket_count)
+
+    if len(buckets):
+        # Group readings by bucket with the readings in each bucket in time order
+        order = np.lexsort((seconds, buckets))
+        buckets = buckets[order]
+        readings = readings[order]
+
+        group_starts = np.flatnonzero(np.diff(buckets, prepend=-1))
+        group_ends = np.append(group_starts[1:], len(buckets)) - 1
+        filled = buckets[group_starts]
+
+        minimum[filled] = np.minimum.reduceat(readings, group_starts)
+        maximum[filled] = np.maximum.reduceat(readings, group_starts)
+        mean[filled] = np.add.reduceat(readings, group_starts) / count[filled]
+        last[filled] = readings[group_ends]
+
+    grid = ((np.arange(bucket_count) + grid_start) * step).astype("datetime64[s]")
+
+    return ResampledReadings(grid, minimum, maximum, mean, last, count)
+
+
+def lttb(timestamps: np.ndarray, readings: np.ndarray, threshold: int) -> tuple:
+    """
+    Downsamples readings for display using the Largest-Triangle-Three-Buckets algorithm.
+    The first and last readings are always kept, and from each bucket in between the reading
+    forming the largest triangle with the previously kept reading and the average of the next bucket is kept.
+    This keeps the peaks and troughs that averaging would flatten.
+
+    :param timestamps: The datetime64 times of the readings in time order
+    :param readings: The float readings
+    :param threshold: The number of readings to keep
+    :return: A tuple of the kept timestamps and readings
+    """
+    numeric = ~np.isnan(readings)
+    timestamps = timestamps[numeric]
+    readings = readings[numeric]
+
+    length = len(readings)
+    if (threshold >= length) or (threshold < 3):
+        return timestamps, readings
+
+    x = timestamps.astype("datetime64[ms]").astype(np.float64)
+    y = readings
+
+    # Readings other than the first and last are divided between threshold - 2 buckets
+    bucket_edges = np.floor(np.linspace(1, length - 1, threshold - 1)).astype(np.int64)
+
+    kept = np.empty(threshold, dtype=np.int64)
+    kept[0] = 0
+    kept[-1] = length - 1
+
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, end = bucket_edges[bucket], bucket_edges[bucket + 1]
+
+        # Average the next bucket, the last bucket is followed by the last reading
+        if bucket + 2 < len(bucket_edges):
+            next_start, next_end = end, bucket_edges[bucket + 2]
+        else:
+            next_start, next_end = length - 1, length
+        next_x = x[next_start:next_end].mean()
+        next_y = y[next_start:next_end].mean()
+
+        # Calculate twice the area of the triangle formed with each reading in the bucket
+        areas = np.abs(
+            (x[previous] - next_x) * (y[start:end] - y[previous]) -
+            (x[previous] - x[start:end]) * (next_y - y[previous])
+        )
+
+        previous = start + int(np.argmax(areas))
+        kept[bucket + 1] = previous
+
+    return timestamps[kept], readings[kept]
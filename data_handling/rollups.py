@@ -0,0 +1,287 @@
+"""
+Multi-resolution rollups of sensor measurements.
+
+Measurements are aggregated as they are logged into 1 minute, 1 hour, and 1 day buckets.
+Each sensor has a binary file per resolution holding a fixed width record for every bucket.
+The record of the bucket still receiving measurements is rewritten in place every flush interval,
+so that at most one flush interval of measurements is lost if the system stops unexpectedly.
+A record is an int64 bucket start in seconds since the epoch followed by the float32 min, max, mean,
+and last measurement of the bucket and a uint32 measurement count, all little endian.
+Buckets are aligned to UTC, the same as the times in the binary measurement files.
+
+Historical queries can then read the coarsest rollup that still gives the number of points wanted
+rather than aggregating every raw measurement again.
+"""
+
+import datetime
+import os
+import struct
+import time
+from threading import Lock
+
+import numpy as np
+
+from data_handling import data_retrieval
+from data_handling.binary_store import to_epoch_ms
+from data_handling.custom_logger import create_path_for_file
+from data_handling.resampling import ResampledReadings, bucket_readings
+from system.system_constants import log_directories, log_flush_interval
+
+# Define the resolutions rollups are kept at as (name, seconds) from finest to coarsest
+RESOLUTIONS = (("1m", 60), ("1h", 60 * 60), ("1d", 24 * 60 * 60))
+
+# Define the layout of a single rollup record
+RECORD_STRUCT = struct.Struct("<qffffI")
+RECORD_DTYPE = np.dtype([
+    ("start", "<i8"), ("min", "<f4"), ("max", "<f4"), ("mean", "<f4"), ("last", "<f4"), ("count", "<u4")
+])
+
+
+def get_rollup_file_path(device_id, resolution: str, directory: str = None) -> str:
+    """
+    :param device_id: The sensor ID
+    :param resolution: The name of the resolution
+    :param directory: The directory of the rollup files, defaults to the rollups log directory
+    :return: The path of the sensor's rollup file at the resolution
+    """
+    if directory is None:
+        directory = log_directories["rollups"]
+
+    return os.path.join(directory, f"{device_id}.{resolution}.bin")
+
+
+class RollupBucket(object):
+    """
+    The aggregates of a bucket that is still receiving measurements
+    """
+
+    def __init__(self, start: int, value: float):
+        """
+        :param start: The start of the bucket in seconds since the epoch
+        :param value: The first measurement of the bucket
+        """
+        self.start = start
+        self.min = value
+        self.max = value
+        self.total = value
+        self.last = value
+        self.count = 1
+
+    def add(self, value: float) -> None:
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        self.total += value
+        self.last = value
+        self.count += 1
+
+    def pack(self) -> bytes:
+        return RECORD_STRUCT.pack(self.start, self.min, self.max, self.total / self.count, self.last, self.count)
+
+
+class RollupWriter(object):
+    """
+    Maintains the rollups of a sensor at every resolution as measurements arrive.
+    Each bucket has a single record in its file, written once the flush interval has passed since the last write,
+    once a measurement arrives for a later bucket, or when the writer is closed.
+    """
+
+    def __init__(self, device_id, directory: str = None, flush_interval: float = log_flush_interval):
+        """
+        :param device_id: The sensor ID to maintain the rollups of
+        :param directory: The directory of the rollup files, defaults to the rollups log directory
+        :param flush_interval: The time in seconds between writes of the buckets still receiving measurements
+        """
+        self.flush_interval = flush_interval
+
+        # Store the file descriptor of each resolution and the offset the bucket receiving measurements is written at
+        self._fds = {}
+        self._offsets = {}
+        for name, seconds in RESOLUTIONS:
+            file_path = get_rollup_file_path(device_id, name, directory)
+            create_path_for_file(file_path)
+            self._fds[name] = os.open(file_path, os.O_WRONLY | os.O_CREAT, 0o644)
+
+            # Overwrite a partially written record left at the end of the file
+            self._offsets[name] = os.path.getsize(file_path) // RECORD_STRUCT.size * RECORD_STRUCT.size
+
+        # Store the bucket currently receiving measurements at each resolution
+        self._buckets = {}
+        self._write_lock = Lock()
+        self._last_flush_time = time.monotonic()
+
+    def add(self, value: float, timestamp: float = None) -> None:
+        """
+        Adds a measurement to the rollups
+
+        :param value: The measurement to add
+        :param timestamp: The time of the measurement in seconds since the epoch, defaults to the current time
+        :return: None
+        """
+        if timestamp is None:
+            timestamp = time.time()
+
+        with self._write_lock:
+            for name, seconds in RESOLUTIONS:
+                start = int(timestamp) // seconds * seconds
+                bucket = self._buckets.get(name)
+
+                if (bucket is not None) and (bucket.start == start):
+                    bucket.add(value)
+                    continue
+
+                # The measurement starts a new bucket, so the previous one is complete
+                if bucket is not None:
+                    self._write_bucket(name, bucket)
+                    self._offsets[name] += RECORD_STRUCT.size
+                self._buckets[name] = RollupBucket(start, value)
+
+            # Write the buckets still receiving measurements so that they survive an unexpected stop
+            if time.monotonic() - self._last_flush_time >= self.flush_interval:
+                self._flush_buckets()
+
+    def _write_bucket(self, name: str, bucket: RollupBucket) -> None:
+        # Each bucket is written at the same offset until it is complete
+        os.pwrite(self._fds[name], bucket.pack(), self._offsets[name])
+
+    def _flush_buckets(self) -> None:
+        for name, bucket in self._buckets.items():
+            self._write_bucket(name, bucket)
+        self._last_flush_time = time.monotonic()
+
+    def flush(self) -> None:
+        """
+        Writes the buckets that are still receiving measurements
+
+        :return: None
+        """
+        with self._write_lock:
+            self._flush_buckets()
+
+    def close(self) -> None:
+        """
+        Writes the buckets that are still receiving measurements and closes the rollup files.
+        A bucket continued by a later writer is merged with the rest of the bucket when read.
+
+        :return: None
+        """
+        with self._write_lock:
+            self._flush_buckets()
+            self._buckets.clear()
+
+            for fd in self._fds.values():
+                os.close(fd)
+            self._fds.clear()
+
+
+def read_rollup(device_id, resolution: str, start_time: datetime.datetime = None,
+                end_time: datetime.datetime = None, directory: str = None) -> ResampledReadings:
+    """
+    Reads the rollup buckets of a sensor within a time range
+
+    :param device_id: The sensor ID to read the rollups of
+    :param resolution: The name of the resolution to read
+    :param start_time: The earliest bucket start to include, defaults to the start of the file
+    :param end_time: The latest bucket start to include, defaults to the end of the file
+    :param directory: The directory of the rollup files, defaults to the rollups log directory
+    :return: The ResampledReadings of the buckets with datetime64[s] UTC start times
+    """
+    file_path = get_rollup_file_path(device_id, resolution, directory)
+
+    # Ignore a partially written record at the end of the file
+    record_count = os.path.getsize(file_path) // RECORD_DTYPE.itemsize if os.path.isfile(file_path) else 0
+    if record_count == 0:
+        empty = np.empty(0)
+        return ResampledReadings(np.empty(0, "datetime64[s]"), empty, empty, empty, empty, np.empty(0, np.int64))
+
+    records = np.memmap(file_path, dtype=RECORD_DTYPE, mode="r", shape=(record_count,))
+    starts = records["start"]
+
+    # Binary search for the buckets within the time range
+    first_record = 0
+    if start_time is not None:
+        first_record = np.searchsorted(starts, to_epoch_ms(start_time) // 1000, side="left")
+
+    last_record = record_count
+    if end_time is not None:
+        last_record = np.searchsorted(starts, to_epoch_ms(end_time) // 1000, side="right")
+    records = records[first_record:last_record]
+
+    # Merge buckets written more than once, such as ones written early when the system was stopped
+    group_starts = np.flatnonzero(np.diff(records["start"], prepend=-1))
+    group_ends = np.append(group_starts[1:], len(records)) - 1
+    counts = np.add.reduceat(records["count"].astype(np.int64), group_starts)
+    totals = np.add.reduceat(records["mean"].astype(np.float64) * records["count"], group_starts)
+
+    return ResampledReadings(
+        timestamps=records["start"][group_starts].astype("datetime64[s]"),
+        minimum=np.minimum.reduceat(records["min"].astype(np.float64), group_starts),
+        maximum=np.maximum.reduceat(records["max"].astype(np.float64), group_starts),
+        mean=totals / counts,
+        last=records["last"][group_ends].astype(np.float64),
+        count=counts
+    )
+
+
+def choose_resolution(start_time: datetime.datetime, end_time: datetime.datetime, max_points: int):
+    """
+    Picks the coarsest rollup resolution that still gives at least the number of points wanted over a time range
+
+    :param start_time: The start of the time range
+    :param end_time: The end of the time range
+    :param max_points: The number of points wanted
+    :return: The name of the resolution, or None if even the finest rollup is too coarse
+    """
+    seconds_per_point = (end_time - start_time).total_seconds() / max(1, max_points)
+
+    chosen = None
+    for name, seconds in RESOLUTIONS:
+        if seconds <= seconds_per_point:
+            chosen = name
+
+    return chosen
+
+
+def query_history(device_id, start_time: datetime.datetime, end_time: datetime.datetime,
+                  max_points: int) -> ResampledReadings:
+    """
+    Retrieves the aggregated history of a sensor over a time range with about the number of points wanted.
+    The coarsest rollup giving enough points is read, falling back on aggregating the raw measurement log
+    when the time range is too short for any rollup, or no rollup holds the time range,
+    such as for measurements logged before rollups were kept.
+
+    :param device_id: The sensor ID to retrieve the history of
+    :param start_time: The start of the time range
+    :param end_time: The end of the time range
+    :param max_points: The number of points wanted
+    :return: The ResampledReadings of the history with datetime64[s] UTC times
+    """
+    resolution = choose_resolution(start_time, end_time, max_points)
+    if resolution is not None:
+        history = read_rollup(device_id, resolution, start_time, end_time)
+        if len(history):
+            return history
+
+    # Aggregate the raw measurements into as many buckets as points wanted
+    # The indexes are kept up to date by the IndexMaintainer, so they are only read here
+    interval = (end_time - start_time) / max(1, max_points)
+    columns = data_retrieval.LogQuery(read_only=True).sensors([device_id]).where_time(start_time, end_time).load().get(device_id)
+
+    if columns is None:
+        return read_rollup(device_id, RESOLUTIONS[0][0], start_time, end_time)
+
+    # Logged times are local, convert them to UTC to match the rollups using the current UTC offset
+    utc_offset = np.timedelta64(int(datetime.datetime.now().astimezone().utcoffset().total_seconds()), "s")
+    timestamps = columns.timestamps.astype("datetime64[s]") - utc_offset
+
+    return bucket_readings(timestamps, columns.readings, interval).non_empty()
+
+
+def to_local_times(timestamps: np.ndarray) -> np.ndarray:
+    """
+    Converts UTC times to naive local times, the same as the times in the measurement logs
+
+    :param timestamps: The datetime64 UTC times
+    :return: The datetime64[s] local times
+    """
+    seconds = timestamps.astype("datetime64[s]").astype(np.int64).tolist()
+    return np.array([datetime.datetime.fromtimestamp(s) for s in seconds], dtype="datetime64[s]")
@@ -0,0 +1,188 @@
+"""
+Rotation of log files into compressed archive segments.
+
+Each log file is written to as a live segment at its usual path.
+Once the live segment grows too large or too old it is compressed into the archive directory of the log
+and recorded in the log's manifest along with the times of its first and last lines,
+so that queries can skip over segments outside of the time range wanted.
+
+    {directory}/{device_id}.csv                                 The live segment
+    {directory}/archive/{device_id}/manifest.json               The manifest of archived segments
+    {directory}/archive/{device_id}/{device_id}.{start}.csv.gz  An archived segment
+"""
+
+import datetime
+import gzip
+import json
+import os
+import shutil
+
+from system.system_constants import csv_formatter
+
+# Define the name of the manifest file in each archive directory
+MANIFEST_NAME = "manifest.json"
+
+# Define the number of bytes read from the end of a log file to find the last line
+TAIL_READ_SIZE = 4096
+
+
+def get_archive_directory(file_path) -> str:
+    """
+    :param file_path: The path of the live log file
+    :return: The directory archived segments of the log are placed in
+    """
+    directory, file_name = os.path.split(file_path)
+    return os.path.join(directory, "archive", os.path.splitext(file_name)[0])
+
+
+def get_manifest_path(file_path) -> str:
+    """
+    :param file_path: The path of the live log file
+    :return: The path of the log's manifest
+    """
+    return os.path.join(get_archive_directory(file_path), MANIFEST_NAME)
+
+
+def load_manifest(file_path) -> list:
+    """
+    :param file_path: The path of the live log file
+    :return: A list of the manifest entry of each archived segment in time order
+    """
+    try:
+        with open(get_manifest_path(file_path)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return []
+
+
+def save_manifest(file_path, manifest: list) -> None:
+    """
+    Replaces the manifest of a log in a single step so that readers never see a partial manifest
+
+    :param file_path: The path of the live log file
+    :param manifest: The list of manifest entries
+    :return: None
+    """
+    manifest_path = get_manifest_path(file_path)
+    temporary_path = f"{manifest_path}.tmp"
+
+    with open(temporary_path, "w") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(temporary_path, manifest_path)
+
+
+def parse_line_time(line: bytes):
+    """
+    :param line: A log line
+    :return: The datetime at the start of the line, or None if the line does not start with a timestamp
+    """
+    try:
+        return datetime.datetime.strptime(line.split(b",", 1)[0].decode(), csv_formatter.datefmt)
+    except (UnicodeDecodeError, ValueError):
+        return None
+
+
+def read_time_bounds(file_path) -> tuple:
+    """
+    Reads the times of the first and last lines of a log file
+
+    :param file_path: The log file to read
+    :return: A tuple of the first and last datetimes, either of which is None if not found
+    """
+    with open(file_path, "rb") as f:
+        first_time = parse_line_time(f.readline())
+
+        f.seek(max(0, os.path.getsize(file_path) - TAIL_READ_SIZE))
+        last_time = None
+        for line in reversed(f.read().splitlines()):
+            last_time = parse_line_time(line)
+            if last_time is not None:
+                break
+
+    return first_time, last_time
+
+
+def archive_log_file(file_path):
+    """
+    Compresses the live segment of a log into its archive and records it in the manifest.
+    The live segment is removed so that the next record written starts a new one.
+
+    :param file_path: The path of the live log file
+    :return: The manifest entry of the archived segment, or None if there was nothing to archive
+    """
+    if (not os.path.isfile(file_path)) or (os.path.getsize(file_path) == 0):
+        return None
+
+    first_time, last_time = read_time_bounds(file_path)
+    if first_time is None:
+        first_time = datetime.datetime.fromtimestamp(os.path.getmtime(file_path))
+    if last_time is None:
+        last_time = first_time
+
+    archive_directory = get_archive_directory(file_path)
+    os.makedirs(archive_directory, exist_ok=True)
+
+    # Name the segment by the time of its first line, numbering segments that start in the same second
+    base_name = f"{os.path.splitext(os.path.basename(file_path))[0]}.{first_time.strftime('%Y%m%d-%H%M%S')}"
+    segment_name = f"{base_name}.csv.gz"
+    number = 1
+    while os.path.exists(os.path.join(archive_directory, segment_name)):
+        segment_name = f"{base_name}-{number}.csv.gz"
+        number += 1
+
+    # Compress into a temporary file first so that an interrupted compression never appears in the archive
+    segment_path = os.path.join(archive_directory, segment_name)
+    with open(file_path, "rb") as source, gzip.open(f"{segment_path}.tmp", "wb") as destination:
+        shutil.copyfileobj(source, destination)
+    os.replace(f"{segment_path}.tmp", segment_path)
+
+    entry = {
+        "file": segment_name,
+        "start": first_time.strftime(csv_formatter.datefmt),
+        "end": last_time.strftime(csv_formatter.datefmt),
+        "size": os.path.getsize(file_path)
+    }
+
+    manifest = load_manifest(file_path)
+    manifest.append(entry)
+    save_manifest(file_path, manifest)
+
+    # Remove the live segment and its index
+    os.remove(file_path)
+    if os.path.isfile(f"{file_path}.index"):
+        os.remove(f"{file_path}.index")
+
+    return entry
+
+
+def iget_segments(file_path, start_time: datetime.datetime = None, end_time: datetime.datetime = None):
+    """
+    Generator function to retrieve the archived segments of a log that overlap a time range in time order
+
+    :param file_path: The path of the live log file
+    :param start_time: The earliest time wanted, defaults to the start of the archive
+    :param end_time: The latest time wanted, defaults to the end of the archive
+    :yield: Archived segment paths
+    """
+    archive_directory = get_archive_directory(file_path)
+
+    for entry in load_manifest(file_path):
+        segment_start = datetime.datetime.strptime(entry["start"], csv_formatter.datefmt)
+        segment_end = datetime.datetime.strptime(entry["end"], csv_formatter.datefmt)
+
+        # Skip segments entirely outside of the time range
+        if (start_time is not None) and (segment_end < start_time.replace(microsecond=0)):
+            continue
+        if (end_time is not None) and (segment_start > end_time):
+            continue
+
+        yield os.path.join(archive_directory, entry["file"])
+
+
+def read_segment(segment_path) -> bytes:
+    """
+    :param segment_path: The path of an archived segment
+    :return: The decompressed contents of the segment
+    """
+    with gzip.open(segment_path, "rb") as f:
+        return f.read()
@@ -1,21 +1,45 @@
 """
-This file is responsible for
+This file is responsible for processing events added from any thread.
 
+Events are placed into a queue and handled by long lived worker threads that block on the queue,
+so adding an event never creates a thread and an event can never be left in the queue unhandled.
+Events are handled by priority, and an event superseded by a later event for the same target is dropped.
 """
 
+import logging
 from threading import Thread, Lock
-from queue import Queue
 
 # from event_system.events import Event
 from event_system.events import *
+from event_system.event_queue import CoalescingPriorityQueue
+
+# Log errors through the system logger once it has been configured
+system_logger = logging.getLogger("system")
+
+# Define a marker placed in the queue to stop a worker, after all events already added
+_STOP = object()
+_STOP_PRIORITY = PRIORITY_NORMAL + 1
 
 
 class EventHandler(object):
-    def __init__(self):
+    def __init__(self, workers: int = 1):
+        """
+        :param workers: The number of threads handling events.
+                        With a single worker events are handled one at a time by priority,
+                        then in the order they were added.
+        """
+        self._event_queue = CoalescingPriorityQueue()
 
-        self._event_queue = Queue()
-        self.event_handle_lock = Lock()
-        # SetServoToDegree
+        # Define whether the handler has been stopped and a lock to check it with when adding events
+        self._stopped = False
+        self._state_lock = Lock()
+
+        # Define the worker threads once so that they are reused for every event
+        self._workers = []
+        for number in range(workers):
+            worker = Thread(target=self.worker_loop, name=f"event-handler-{number}", daemon=True)
+            self._workers.append(worker)
+            worker.start()
 
     @property
     def event_queue(self):
@@ -23,45 +47,69 @@ class EventHandler(object):
 
     def add_event(self, action: Event):
         """
-        Add an action to the action queue and process it if another action is not currently being processed
+        Add an action to the action queue to be processed by the next free worker.
+        A waiting action with the same coalesce key is replaced.
 
         :param action: The action to handle
         :return: None
         """
+        with self._state_lock:
+            if self._stopped:
+                system_logger.warning(f"Event added after the event handler was stopped: {action!r}")
+                return
 
-        # Add the event to the queue
-        self.event_queue.put(action)
-
-        # Check if a thread is not currently processing the queue
-        if not self.event_handle_lock.locked():
-            self.process_event_queue()
+            # Add the event to the queue
+            self.event_queue.put(action, action.priority, action.coalesce_key)
 
-    def process_event_queue(self):
+    def worker_loop(self):
         """
-        Process actions until no more actions are in the queue
+        Process actions as they are added until the handler is stopped
         :return: None
         """
+        while True:
+            # Wait for the next event
+            _event = self._event_queue.get()
 
-        def event_handle_thread_function(obj: EventHandler):
-            # Ensure that there are values in the queue
-            while not obj._event_queue.empty():
-                # Ensure that only one process is accessing the queue at a time
-                obj.event_handle_lock.acquire()
+            try:
+                if _event is _STOP:
+                    return
 
-                # Retrieve the new event
-                _event = obj._event_queue.get()
-
-                # Handle the event
-                obj.event_handle(_event)
+                # Handle the event, an error handling one event should not stop the worker
+                try:
+                    self.event_handle(_event)
+                except Exception:
+                    system_logger.exception(f"Error handling event: {_event!r}")
 
+            finally:
                 # Indicate that the event handling has completed
-                obj.event_handle_lock.release()
+                self._event_queue.task_done()
+
+    def join(self):
+        """
+        Waits until all events added have been handled
+        :return: None
+        """
+        self._event_queue.join()
+
+    def stop(self, wait: bool = True):
+        """
+        Stops the workers once the events already added have been handled.
+        Events added afterwards are ignored.
+
+        :param wait: Whether to wait for the workers to finish
+        :return: None
+        """
+        with self._state_lock:
+            if self._stopped:
+                return
+            self._stopped = True
 
-        # Define the thread
-        event_thread = Thread(target=event_handle_thread_function, args=(self,))
+            for _ in self._workers:
+                self._event_queue.put(_STOP, _STOP_PRIORITY)
 
-        # Begin the thread
-        event_thread.start()
+        if wait:
+            for worker in self._workers:
+                worker.join()
 
     def event_handle(self, _event: Event):
         """
@@ -0,0 +1,116 @@
+"""
+A priority queue of events that coalesces superseded events
+"""
+
+import heapq
+import itertools
+from threading import Condition, Lock
+
+
+class CoalescingPriorityQueue(object):
+    """
+    A thread safe queue that hands out items by priority, then in the order they were added.
+
+    An item added with the same coalesce key as an item still waiting in the queue replaces it,
+    so only the latest of a burst of items for the same target is ever handed out.
+    Provides the put/get/task_done/join interface of queue.Queue.
+    """
+
+    def __init__(self):
+        # Define a heap of [priority, sequence number, item] entries
+        self._heap = []
+        self._sequence = itertools.count()
+
+        # Define a dictionary of {coalesce key: entry} for items waiting in the queue
+        self._pending = {}
+
+        self._lock = Lock()
+        self._not_empty = Condition(self._lock)
+        self._all_tasks_done = Condition(self._lock)
+        self._unfinished_tasks = 0
+
+        # Count the number of items replaced by later items
+        self.coalesced = 0
+
+    def put(self, item, priority: int, coalesce_key=None) -> None:
+        """
+        Adds an item to the queue
+
+        :param item: The item to add
+        :param priority: The priority of the item, lower values are handed out first
+        :param coalesce_key: A key identifying items that supersede each other, None if the item is never superseded
+        :return: None
+        """
+        with self._lock:
+            entry = self._pending.get(coalesce_key) if coalesce_key is not None else None
+
+            # Replace the waiting item in its place in the queue
+            if (entry is not None) and (entry[0] == priority):
+                entry[2] = item
+                self.coalesced += 1
+                return
+
+            # The waiting item has a different priority, so remove it and queue the new item in its own place
+            if entry is not None:
+                entry[2] = None
+                self._pending.pop(coalesce_key)
+                self._unfinished_tasks -= 1
+                self.coalesced += 1
+
+            entry = [priority, next(self._sequence), item, coalesce_key]
+            heapq.heappush(self._heap, entry)
+            if coalesce_key is not None:
+                self._pending[coalesce_key] = entry
+
+            self._unfinished_tasks += 1
+            self._not_empty.notify()
+
+    def get(self):
+        """
+        Removes and returns the next item, waiting until one is available
+
+        :return: The item
+        """
+        with self._lock:
+            while True:
+                while not self._heap:
+                    self._not_empty.wait()
+
+                priority, sequence, item, coalesce_key = heapq.heappop(self._heap)
+
+                # Skip entries that were removed when their item was superseded
+                if item is None:
+                    continue
+
+                if coalesce_key is not None:
+                    self._pending.pop(coalesce_key, None)
+
+                return item
+
+    def task_done(self) -> None:
+        """
+        Indicates that an item retrieved from the queue has been processed
+
+        :return: None
+        """
+        with self._lock:
+            self._unfinished_tasks -= 1
+            if self._unfinished_tasks <= 0:
+                self._all_tasks_done.notify_all()
+
+    def join(self) -> None:
+        """
+        Waits until every item added has been retrieved and processed
+
+        :return: None
+        """
+        with self._lock:
+            while self._unfinished_tasks > 0:
+                self._all_tasks_done.wait()
+
+    def qsize(self) -> int:
+        with self._lock:
+            return sum(1 for entry in self._heap if entry[2] is not None)
+
+    def empty(self) -> bool:
+        return self.qsize() == 0
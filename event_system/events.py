@@ -2,13 +2,31 @@
 Event definition file
 """
 
+# Define the priorities events are handled at. Events with lower values are handled first
+PRIORITY_SAFETY = 0
+PRIORITY_SYSTEM = 1
+PRIORITY_NORMAL = 2
+
 
 class Event(object):
     param_name = None
 
+    # Define the priority the event is handled at
+    priority = PRIORITY_NORMAL
+
     def __init__(self):
         pass
 
+    @property
+    def coalesce_key(self):
+        """
+        Events with the same coalesce key supersede each other while waiting to be handled,
+        so that only the latest one is handled. Events without a key are never superseded.
+
+        :return: A hashable key, or None
+        """
+        return None
+
     def action(self):
         pass
 
@@ -20,5 +38,3 @@ class PrintEvent(Event):
 
     def action(self):
         print(self.what_to_print)
-
-
@@ -13,3 +13,4 @@ if __name__ == "__main__":
         s.enter_main_loop()
     except KeyboardInterrupt:
         sl.info("System shutting down. Goodbye cruel world.")
+        s.shutdown()
@@ -427,6 +427,9 @@ class Servo(object):
         GPIO.setup(self._pin, GPIO.OUT)
         self.pwm = GPIO.PWM(self._pin, self.pwm_freq)
 
+        # Define the angle the servo was last rotated to, None until it is first rotated
+        self.angle = None
+
         # Start the PWM controller
         self.start()
 
@@ -459,6 +462,7 @@ class Servo(object):
         :return: None
         """
         self.pwm.ChangeDutyCycle(self.get_angle_pwm(angle))
+        self.angle = angle
 
     def get_angle_pwm(self, angle: float) -> float:
         """
@@ -0,0 +1,35 @@
+"""
+Events reporting changes to the devices connected to the 1-Wire bus.
+
+These events only log the change, so they are kept apart from the system events
+to allow the bus inventory to be used without the GPIO library.
+"""
+
+import logging
+
+from event_system.events import Event
+
+# Log bus changes through the system logger once it has been configured
+system_logger = logging.getLogger("system")
+
+
+class SensorEvent(Event):
+    def __init__(self, sensor_id):
+        super().__init__()
+        self.sensor_id = sensor_id
+
+
+class SensorConnectedEvent(SensorEvent):
+    def __init__(self, sensor_id):
+        super().__init__(sensor_id)
+
+    def action(self):
+        system_logger.info(f"The temperature sensor with ID: {self.sensor_id} was connected to the 1W-BUS")
+
+
+class SensorDisconnectedEvent(SensorEvent):
+    def __init__(self, sensor_id):
+        super().__init__(sensor_id)
+
+    def action(self):
+        system_logger.warning(f"The temperature sensor with ID: {self.sensor_id} was removed from the 1W-BUS")
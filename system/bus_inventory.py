@@ -0,0 +1,87 @@
+"""
+Cached inventory of the devices connected to the 1-Wire bus
+"""
+
+import time
+from threading import Lock
+
+from system import system_constants
+from system.sensors import W1Bus
+from system.bus_events import SensorConnectedEvent, SensorDisconnectedEvent
+
+
+class W1BusInventory(object):
+    """
+    A cached inventory of the sensor IDs on the 1-Wire bus.
+
+    The bus directory is only scanned when the inventory is older than the refresh interval
+    or when a refresh is requested. Sensors added to or removed from the bus between
+    scans are reported to the event handler as events.
+    """
+
+    def __init__(self, event_handler=None,
+                 refresh_interval: float = system_constants.w1_inventory_refresh_interval,
+                 base_dir: str = None):
+        """
+        :param event_handler: The event handler to report added and removed sensors to
+        :param refresh_interval: The age in seconds after which the inventory is scanned again
+        :param base_dir: The directory containing the 1-Wire devices, defaults to W1Bus.BASE_DIR
+        """
+        self.event_handler = event_handler
+        self.refresh_interval = refresh_interval
+        self.base_dir = base_dir
+
+        self._sensor_ids = frozenset()
+        self._last_refresh_time = None
+
+        # Ensure that only one thread scans the bus at a time
+        self._refresh_lock = Lock()
+
+    def refresh(self) -> tuple:
+        """
+        Scans the bus and reports the sensors added or removed since the last scan.
+        The first scan defines the initial inventory and does not report any events.
+
+        :return: A tuple of the sets of added and removed sensor IDs
+        """
+        with self._refresh_lock:
+            connected_ids = frozenset(W1Bus(self.base_dir))
+
+            first_refresh = self._last_refresh_time is None
+
+            added_ids = connected_ids - self._sensor_ids
+            removed_ids = self._sensor_ids - connected_ids
+
+            self._sensor_ids = connected_ids
+            self._last_refresh_time = time.monotonic()
+
+        if (self.event_handler is not None) and (not first_refresh):
+            for _uuid in sorted(added_ids):
+                self.event_handler.add_event(SensorConnectedEvent(_uuid))
+
+            for _uuid in sorted(removed_ids):
+                self.event_handler.add_event(SensorDisconnectedEvent(_uuid))
+
+        return added_ids, removed_ids
+
+    def refresh_if_stale(self) -> None:
+        """
+        Scans the bus if it has not been scanned within the refresh interval
+
+        :return: None
+        """
+        if (self._last_refresh_time is None) or \
+                (time.monotonic() - self._last_refresh_time > self.refresh_interval):
+            self.refresh()
+
+    def get_sensor_ids(self) -> frozenset:
+        """
+        Getter method for the sensor IDs on the bus
+
+        :return: A set of 12 character long strings of the sensor ids
+        """
+        self.refresh_if_stale()
+        return self._sensor_ids
+
+    def __contains__(self, _uuid) -> bool:
+        return _uuid in self.get_sensor_ids()
@@ -0,0 +1,126 @@
+"""
+A declarative grammar for text commands.
+
+Commands are declared as patterns of literal words and typed parameters, such as "room <room:int> set angle <angle:float>".
+All patterns are compiled into a single trie so that a command is matched with one dictionary lookup per word,
+and the help text is generated from the patterns themselves.
+"""
+
+
+class InvalidCommand(Exception):
+    pass
+
+
+# Define the keys of trie nodes that hold a parameter branch and a completed command
+_PARAMETER = object()
+_COMMAND = object()
+
+
+class Command(object):
+    def __init__(self, pattern: str, handler, help_text: str):
+        """
+        :param pattern: The pattern the command was declared with
+        :param handler: The function called with the converted parameters as keyword arguments
+        :param help_text: A description of the command
+        """
+        self.pattern = pattern
+        self.handler = handler
+        self.help_text = help_text
+
+
+class CommandGrammar(object):
+    """
+    A set of command patterns compiled into a trie of words
+    """
+
+    # Define the converters available to parameters by type name
+    converters = {
+        "int": int,
+        "float": float,
+        "str": str
+    }
+
+    def __init__(self):
+        self._root = {}
+        self.commands = []
+
+    def add_command(self, pattern: str, handler, help_text: str = "") -> None:
+        """
+        Adds a command to the grammar
+
+        :param pattern: Space separated literal words and <name:type> parameters
+        :param handler: The function called with the converted parameters as keyword arguments
+        :param help_text: A description of the command
+        :return: None
+        """
+        command = Command(pattern, handler, help_text)
+        node = self._root
+
+        for word in pattern.split():
+            if word.startswith("<") and word.endswith(">"):
+                name, type_name = word[1:-1].split(":")
+                converter = self.converters[type_name]
+
+                if _PARAMETER in node:
+                    existing_name, existing_converter, child = node[_PARAMETER]
+                    if (existing_name, existing_converter) != (name, converter):
+                        raise ValueError(f"Conflicting parameter {word} in command: {pattern}")
+                else:
+                    child = {}
+                    node[_PARAMETER] = (name, converter, child)
+                node = child
+
+            else:
+                node = node.setdefault(word, {})
+
+        if _COMMAND in node:
+            raise ValueError(f"Duplicate command: {pattern}")
+        node[_COMMAND] = command
+
+        self.commands.append(command)
+
+    def parse(self, inp: str) -> tuple:
+        """
+        Matches input against the grammar. Literal words take precedence over parameters.
+
+        :param inp: The command input
+        :return: A tuple of the matched Command and a dictionary containing the {parameter name: converted value}
+        """
+        node = self._root
+        arguments = {}
+
+        for word in inp.split():
+            if word in node:
+                node = node[word]
+
+            elif _PARAMETER in node:
+                name, converter, node = node[_PARAMETER]
+                try:
+                    arguments[name] = converter(word)
+                except ValueError:
+                    raise InvalidCommand(f"Invalid value for {name}: {word}")
+
+            else:
+                raise InvalidCommand(f"Unexpected word: {word}")
+
+        if _COMMAND not in node:
+            raise InvalidCommand(f"Incomplete command: {inp}")
+
+        return node[_COMMAND], arguments
+
+    def dispatch(self, inp: str):
+        """
+        Matches input against the grammar and calls the handler of the command matched
+
+        :param inp: The command input
+        :return: The value returned by the handler
+        """
+        command, arguments = self.parse(inp)
+        return command.handler(**arguments)
+
+    def format_help(self) -> str:
+        """
+        :return: A line for each command with its pattern and description
+        """
+        width = max((len(command.pattern) for command in self.commands), default=0)
+        return "\n".join(f"{command.pattern.ljust(width)}  {command.help_text}" for command in self.commands)
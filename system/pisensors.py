@@ -78,6 +78,9 @@ import math
 
 import RPi.GPIO as GPIO
 
+from system.sensors import RetryPolicy, SensorHealth, W1SlaveReader, default_retry_policy, read_crc_verified
+from system.bus_inventory import W1BusInventory
+
 ############################
 #  Hardware Configuration  #
 ############################
@@ -417,7 +420,7 @@ class DallasTempSensor(Sensor):
     # Define the sensor unit class constant
     _UNITS = "C"
 
-    def __init__(self, sensor_name: str, device_id: str):
+    def __init__(self, sensor_name: str, device_id: str, retry_policy: RetryPolicy = default_retry_policy):
         """
         Constructor method.
 
@@ -428,6 +431,9 @@ class DallasTempSensor(Sensor):
 
             device_id:
                 The unique 12 character long hex string found in the directory structure.
+
+            retry_policy:
+                Defines how reads that fail the CRC check are retried
         """
 
         # Calls parent object constructor. In this case, the Sensor object
@@ -437,10 +443,15 @@ class DallasTempSensor(Sensor):
         # set the id of the sensor. This should be a 12 character long hex code
         self._id = device_id
 
+        # Define how failed reads are retried and count their outcomes
+        self.retry_policy = retry_policy
+        self.health = SensorHealth()
+
         # Set variables to None initially because python likes to verify
         # that attributes have values before setting them with another method
         # and then set with the _hardware_setup() call
         self._file_path = None
+        self._w1_reader = None
         self._hardware_setup()
 
     ####################
@@ -463,16 +474,12 @@ class DallasTempSensor(Sensor):
         self._file_path = "{0}28-{1}/w1_slave".format(
             W1Bus.get_base_directory(), self.device_id())
 
-        # Attempt to open the sensor reading fil
-        try:
-            # Using the with open statement,
-            # python will handle the closing of the file once it has broken from the with structure
-            with open(self.get_path(), "r") as file_open_test:
-                pass
+        # Define a reader that keeps the device file open between reads
+        self._w1_reader = W1SlaveReader(self._file_path)
 
-        # If there was an issue opening the sensor file
-        except:
-            raise OSError
+        # Verify that the sensor is on the bus using the shared inventory rather than opening its file
+        if self.device_id() not in bus_inventory:
+            raise OSError(f"The temperature sensor with ID: {self.device_id()} is not on the 1W-BUS")
 
     ###################
     #  Read Methods  #
@@ -496,40 +503,16 @@ class DallasTempSensor(Sensor):
         Returns a float that is the temperature reading in degrees celsius
         """
 
-        # Reads file until a proper reading found
-        while True:
-
-            # This should return the temperature reading
-            lines = self.read_temp_raw()
-
-            # checks if the last 3 characters in the file read "YES"
-            if lines[0].strip()[-3:] == 'YES':
-                break
-            else:
-                time.sleep(0.2)
-
-        # searches for "t=" in the temperature line that was found as the most recent measurement
-        equals_pos = lines[1].find('t=')
-
-        # If the value of t was found in the string
-        if equals_pos != -1:
+        # Reads file until a proper reading found or the retry policy is exhausted
+        millidegrees = read_crc_verified(self._id, self._w1_reader.read, self.retry_policy, self.health)
 
-            # Pulls all values found after "t=" from the read string
-            temp_string = lines[1][equals_pos + 2:]
-
-            # Converts the retrieved string to a temperature reading
-            temp_c = float(temp_string) / 1000.0
-
-            # temp in ferenheight
-            # temp_f = temp_c * 9.0 / 5.0 + 32.0
-
-            # return the c degree float measurement of the temperature
-            return temp_c
-
-        else:
-            # if "t=" was not found in the file
+        # if "t=" was not found in the file
+        if millidegrees is None:
             raise TemperatureNotFound
 
+        # return the c degree float measurement of the temperature
+        return millidegrees / 1000.0
+
 
 class Measurement(object):
     """
@@ -614,3 +597,7 @@ class W1Bus(list):
         getter method for the W1 sensor base directory
         """
         return cls.BASE_DIR
+
+
+# Define an inventory of the 1-Wire bus shared by all Dallas temperature sensors
+bus_inventory = W1BusInventory(base_dir=W1Bus.get_base_directory())
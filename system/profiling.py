@@ -0,0 +1,177 @@
+"""
+Opt-in latency profiling of the system cycle
+"""
+
+import time
+from collections import deque
+
+
+class _Measurement(object):
+    """
+    Context manager recording the time spent within it to a profiler
+    """
+    __slots__ = ("_profiler", "_key", "_start_time")
+
+    def __init__(self, profiler, key):
+        self._profiler = profiler
+        self._key = key
+        self._start_time = None
+
+    def __enter__(self):
+        self._start_time = self._profiler.clock()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._profiler.record(self._key, self._profiler.clock() - self._start_time)
+        return False
+
+
+class _NullMeasurement(object):
+    """
+    Context manager that does nothing, used while profiling is disabled
+    """
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
+
+
+# A single shared instance is used so that disabled profiling does not allocate
+_NULL_MEASUREMENT = _NullMeasurement()
+
+
+class CycleProfiler(object):
+    """
+    Records latencies of the phases of the system cycle, sensor reads and actuator calls.
+
+    The most recent samples of each key are kept in a ring buffer and summarized
+    into statistics and a histogram when a snapshot is taken.
+    While disabled, measuring and recording return straight away.
+    """
+
+    # Define the upper bounds in seconds of the histogram buckets. A final bucket holds all larger samples
+    HISTOGRAM_BOUNDS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+    def __init__(self, enabled: bool = False, buffer_size: int = 1000, clock=time.perf_counter):
+        """
+        :param enabled: Whether samples are recorded
+        :param buffer_size: The number of most recent samples kept per key
+        :param clock: A function returning a time in seconds
+        """
+        self.enabled = enabled
+        self.buffer_size = buffer_size
+        self.clock = clock
+
+        # Define a dictionary of {key: ring buffer of samples in seconds}
+        self._samples = {}
+
+    def measure(self, key):
+        """
+        Creates a context manager recording the time spent within it
+
+        :param key: The key to record the sample under, a string or tuple of strings
+        :return: The context manager
+        """
+        if not self.enabled:
+            return _NULL_MEASUREMENT
+
+        return _Measurement(self, key)
+
+    def record(self, key, seconds: float) -> None:
+        """
+        Records a single sample
+
+        :param key: The key to record the sample under, a string or tuple of strings
+        :param seconds: The latency to record
+        :return: None
+        """
+        if not self.enabled:
+            return
+
+        samples = self._samples.get(key)
+        if samples is None:
+            samples = self._samples.setdefault(key, deque(maxlen=self.buffer_size))
+
+        samples.append(seconds)
+
+    def record_all(self, timings: dict, prefix: str) -> None:
+        """
+        Records a sample for each item of a dictionary of timings
+
+        :param timings: A dictionary of {name: seconds}
+        :param prefix: The first part of the key each sample is recorded under
+        :return: None
+        """
+        if not self.enabled:
+            return
+
+        for name, seconds in timings.items():
+            self.record((prefix, name), seconds)
+
+    def reset(self) -> None:
+        """
+        Discards all recorded samples
+
+        :return: None
+        """
+        self._samples = {}
+
+    @staticmethod
+    def format_key(key) -> str:
+        if isinstance(key, tuple):
+            return ".".join(str(k) for k in key)
+        return str(key)
+
+    def snapshot(self) -> dict:
+        """
+        Summarizes the recorded samples of each key
+
+        :return: A dictionary of {key name: statistics}
+        """
+        stats = {}
+
+        for key, samples in list(self._samples.items()):
+            values = sorted(samples)
+            if not values:
+                continue
+
+            # Count the samples falling into each histogram bucket
+            histogram = [0] * (len(self.HISTOGRAM_BOUNDS) + 1)
+            bucket = 0
+            for value in values:
+                while bucket < len(self.HISTOGRAM_BOUNDS) and value > self.HISTOGRAM_BOUNDS[bucket]:
+                    bucket += 1
+                histogram[bucket] += 1
+
+            stats[self.format_key(key)] = {
+                "count": len(values),
+                "min": values[0],
+                "mean": sum(values) / len(values),
+                "p50": values[int(0.50 * (len(values) - 1))],
+                "p90": values[int(0.90 * (len(values) - 1))],
+                "p99": values[int(0.99 * (len(values) - 1))],
+                "max": values[-1],
+                "histogram": histogram
+            }
+
+        return stats
+
+    def format_snapshot(self) -> str:
+        """
+        :return: A human readable table of the snapshot statistics in milliseconds
+        """
+        if not self.enabled:
+            return "Cycle profiling is disabled"
+
+        lines = [f"{'key':<24}{'count':>7}{'mean':>9}{'p50':>9}{'p90':>9}{'p99':>9}{'max':>9}"]
+
+        for name, s in sorted(self.snapshot().items()):
+            lines.append(
+                f"{name:<24}{s['count']:>7}"
+                + "".join(f"{s[stat] * 1000.0:>9.1f}" for stat in ("mean", "p50", "p90", "p99", "max"))
+            )
+
+        return "\n".join(lines)
@@ -16,9 +16,15 @@ import itertools
 from bluetooth import *
 
 # Logging and handling sensitive stuff
-from data_handling import custom_logger
+from data_handling import custom_logger, data_retrieval
+from data_handling.indexing import IndexMaintainer
 from data_handling.custom_errors import OverTemperature, UnderTemperature
 
+from bluetooth_connection import framing
+from bluetooth_connection.command_server import CommandServer
+from bluetooth_connection.telemetry import TelemetryPublisher, SubscriptionChange, TOPICS
+from bluetooth_connection.wire_codec import TelemetryUpdate, EncodingChange, WIRES, create_wire
+
 from multiprocessing import Manager
 
 # A bluetooth logging module used for sending new events over bluetooth
@@ -31,6 +37,11 @@ from system.active_components import Element, RegisterFlowController, DeviceEnab
 
 # System components
 from system.sensors import TargetTemperatureSensor, ElementSensor, TemperatureSensor, W1Bus, TemperatureNotFound
+from system.bus_inventory import W1BusInventory
+from system.sensor_reader import SensorReaderPool, BackgroundSensorSampler, BulkConversionReader
+from system.scheduler import CycleScheduler, PhaseTimer
+from system.profiling import CycleProfiler
+from system.command_grammar import CommandGrammar, InvalidCommand
 
 from event_system.event_handler import EventHandler
 from event_system.events import Event
@@ -52,26 +63,20 @@ class BT_Server(object):
         # Configure bluetooth socket_server
         self.server_socket = BluetoothSocket(RFCOMM)
 
-        self.client_socket = None
-        self.client_info = None
-
-        self.event_thread = None
-
         self.server_socket.bind(("", PORT_ANY))
-        self.server_socket.listen(1)
+
+        # Allow several clients, such as a phone and a tablet, to wait to be accepted at once
+        self.server_socket.listen(system_constants.bluetooth_max_clients)
 
         # Get the port that the socket_server it bound to
         self.port = self.server_socket.getsockname()[1]
 
         self.uuid = "94f39d29-7d6d-437d-973b-fba39e49d4ee"
 
-        # self.advertise_BT_service()
-
-    def wait_for_client(self):
+        # Define the server multiplexing every connected client once serving has started
+        self.command_server = None
 
-        system_logger.info(f"Waiting for connection on RFCOMM channel {self.port}")
-        self.client_socket, self.client_info = self.server_socket.accept()
-        system_logger.info(f"Accepted connection from {self.client_info}")
+        # self.advertise_BT_service()
 
     def advertise_BT_service(self):
         advertise_service(
@@ -82,54 +87,80 @@ class BT_Server(object):
             # protocols = [ OBEX_UUID ]
         )
 
+    def serve(self, frame_handler, disconnect_handler=None):
+        """
+        Starts serving every client from a single background thread.
+        Each frame received is passed to the frame handler and any response returned is sent back to its client.
+
+        :param frame_handler: A function taking a frame and the client it was received from,
+                              returning a response message or None
+        :param disconnect_handler: An optional function called with each client that disconnects
+        :return: None
+        """
+        system_logger.info(f"Waiting for connections on RFCOMM channel {self.port}")
+
+        self.command_server = CommandServer(
+            self.server_socket, frame_handler,
+            max_clients=system_constants.bluetooth_max_clients,
+            send_buffer_limit=system_constants.bluetooth_send_buffer_limit,
+            disconnect_handler=disconnect_handler)
+        self.command_server.start()
+
     def stop_server(self):
-        # Close both client and server sockets
+        # Disconnect every client before closing the server socket
+        if self.command_server is not None:
+            self.command_server.stop()
+            self.command_server = None
+
         self.server_socket.close()
-        self.client_socket.close()
         self.server_socket = None
-        self.client_socket = None
 
         system_logger.info("BT Server stopped")
 
-    def receive_data_to_queue_loop(self, _data_queue: queue.Queue):
+    def send_string(self, _string):
+        """
+        Sends a message to every connected client as a single frame
+
+        :param _string: The message to send
+        :return: None
+        """
+        if self.command_server is None or not self.command_server.clients:
+            system_logger.warning("Unable to send a message with no client connected")
+            return
 
-        try:
-            while True:
-                data = self.server_socket.recv(1024)
-                if len(data) == 0:
-                    break
-                _data_queue.put(data)
-                system_logger.debug(f"received {data}")
-
-        except IOError as e:
-            self.client_disconnected()
-            raise e
-
-    def begin_data_receive_loop(self, _data_queue: queue.Queue):
-        self.event_thread = Thread(
-            target=self.receive_data_to_queue_loop,
-            args=(_data_queue,),
-            kwargs={}
-        )
-        self.event_thread.start()
+        self.command_server.broadcast(_string)
 
-    def send_string(self, _string):
-        print("Transmission begun.")
-        # for p in break_string_into_segmented_byte_list(_string, None):
-        self.client_socket.send(_string)
+    def send_to_client(self, client, _string):
+        """
+        Sends a message to a single client as a single frame
 
-        print("Transmission complete.")
+        :param client: The client to send the message to
+        :param _string: The message to send
+        :return: None
+        """
+        if self.command_server is not None:
+            self.command_server.send(client, _string)
 
-    def client_disconnected(self):
-        self.client_socket = None
-        self.client_info = None
-        self.client_socket.close()
+    def send_telemetry(self, client, changes: dict):
+        """
+        Sends changes in the state of the system to a single client
 
-        print("Client disconnected")
+        :param client: The client to send the changes to
+        :param changes: A dictionary containing the {topic: {key: value}} that changed
+        :return: None
+        """
+        self.send_to_client(client, TelemetryUpdate(changes, time.time()))
 
+    def set_client_wire(self, client, wire):
+        """
+        Changes the encoding of the messages sent to a client
 
-class InvalidCommand(Exception):
-    pass
+        :param client: The client to change the encoding of
+        :param wire: The encoder of the new encoding
+        :return: None
+        """
+        if self.command_server is not None:
+            self.command_server.set_wire(client, wire)
 
 
 class StringCommandHandler(object):
@@ -137,6 +168,7 @@ class StringCommandHandler(object):
     def __init__(self, handler: EventHandler, system):
         self.handler = handler
         self.system = system
+        self.grammar = self.create_grammar()
         # self.get_input_loop()
 
     def start(self):
@@ -149,128 +181,243 @@ class StringCommandHandler(object):
     def get_input_loop(self):
         while True:
             inp = self.get_input()
-            self.handle_input(inp)
+            response = self.handle_input(inp)
+            if response is not None:
+                self.send_response(response)
 
-    @staticmethod
-    def input_parse(inp):
-        cmd_args = inp.split()
-        command = cmd_args[0]
-        args = cmd_args[1:]
-        return command, args
+    def send_response(self, response: str) -> None:
+        """
+        Sends a response to the source of the commands
 
-    def handle_input(self, inp):
-        command, args = self.input_parse(inp)
-        _event = None
+        :param response: The response to send
+        :return: None
+        """
+        system_logger.info(response)
 
-        try:
-            if command == "system":
-                if args[0] == "start":
-                    _event = SystemStartEvent(self.system.element)
-
-                elif args[0] == "stop":
-                    _event = SystemStopEvent(self.system.element)
-
-                elif args[0] == "operation":
-                    if args[1] == "mode":
-                        if args[2] == "test":
-                            _event = SystemOperationModeTestEvent(self.system)
-                        elif args[2] == "auto":
-                            _event = SystemOperationModeAutoEvent(self.system)
-                        elif args[2] == "extreme":
-                            _event = SystemOperationModeExtremeEvent(self.system)
-                        else:
-                            raise InvalidCommand
-                        raise InvalidCommand
-                    else:
-                        raise InvalidCommand
-                else:
-                    raise InvalidCommand
-
-            elif command == "element":
-                if args[0] == "set":
-                    if args[1] == "heat":
-                        _event = ElementHeatEvent(self.system.element)
-                    elif args[1] == "cool":
-                        _event = ElementCoolEvent(self.system.element)
-                    elif args[1] == "heat+cool":
-                        _event = ElementHeatAndCoolEvent(self.system.element)
-                    else:
-                        raise InvalidCommand
+    def create_grammar(self) -> CommandGrammar:
+        """
+        Declares every command accepted and the event each creates
 
-                elif args[0] == "get":
-                    if args[1] == "status":
-                        _event = ElementGetStatus(
-                            self.system.element,
-                            self.system.system.bt_connection)
-                    else:
-                        raise InvalidCommand
-                else:
-                    raise InvalidCommand
+        :return: The compiled CommandGrammar
+        """
+        grammar = CommandGrammar()
+        system = self.system
+
+        def add(pattern, help_text):
+            def decorate(func):
+                grammar.add_command(pattern, func, help_text)
+                return func
+            return decorate
+
+        # Commands returning a string or dictionary respond with it to the source of the command,
+        # so that the response of a json request is correlated by its id and only sent to the requesting client
+        @add("help", "List all commands")
+        def _():
+            return grammar.format_help()
+
+        # System commands
+        @add("system start", "Enable the element")
+        def _():
+            return SystemStartEvent(system.element)
+
+        @add("system stop", "Disable the element")
+        def _():
+            return SystemStopEvent(system.element)
+
+        @add("system stats on", "Start gathering cycle latency statistics")
+        def _():
+            return SystemStatsEnableEvent(system.profiler, True)
+
+        @add("system stats off", "Stop gathering cycle latency statistics")
+        def _():
+            return SystemStatsEnableEvent(system.profiler, False)
+
+        @add("system get stats", "Send the cycle latency statistics")
+        def _():
+            return {"stats_enabled": system.profiler.enabled, "stats": system.profiler.snapshot()}
+
+        @add("system get health", "Send the read failure counters of every temperature sensor")
+        def _():
+            return {"health": system.get_sensor_health()}
+
+        @add("system operation mode test", "Switch to the test operation mode")
+        def _():
+            return SystemOperationModeTestEvent(system)
+
+        @add("system operation mode auto", "Switch to the automatic operation mode")
+        def _():
+            return SystemOperationModeAutoEvent(system)
+
+        @add("system operation mode extreme", "Switch to the extreme operation mode")
+        def _():
+            return SystemOperationModeExtremeEvent(system)
+
+        # Element commands
+        @add("element set heat", "Set the element to heat")
+        def _():
+            return ElementHeatEvent(system.element)
+
+        @add("element set cool", "Set the element to cool")
+        def _():
+            return ElementCoolEvent(system.element)
+
+        @add("element set heat+cool", "Set the element to heat and cool")
+        def _():
+            return ElementHeatAndCoolEvent(system.element)
+
+        @add("element get status", "Send the state of the element")
+        def _():
+            return {"enabled": system.element.enabled, "heating": system.element.heating}
+
+        # Room commands
+        @add("room <room:int> set angle <angle:float>", "Rotate the room damper to an angle")
+        def _(room, angle):
+            return RegisterRotateEvent(system.room_dampers[room], angle)
+
+        @add("room <room:int> set pwm <pwm:float>", "Apply a duty cycle to the room damper")
+        def _(room, pwm):
+            return RegisterPWMEvent(system.room_dampers[room], pwm)
+
+        @add("room <room:int> set open", "Open the room damper")
+        def _(room):
+            return RegisterOpenEvent(system.room_dampers[room])
+
+        @add("room <room:int> set close", "Close the room damper")
+        def _(room):
+            return RegisterCloseEvent(system.room_dampers[room])
+
+        @add("room <room:int> set temp <temp:float>", "Set the target temperature of the room")
+        def _(room, temp):
+            return TemperatureTargetUpdatedEvent(system.room_sensors[room], Temperature(temp))
+
+        @add("room <room:int> get status", "Send the latest temperature of the room")
+        def _(room):
+            # The readings are replaced every cycle, so the latest are looked up when the command is run
+            reading = system.room_readings.get(system.room_sensors[room].get_id)
+            return {"room": room, "temperature": None if reading is None else float(reading)}
+
+        @add("room <room:int> get history <minutes:float>", "Send the temperature history of the room")
+        def _(room, minutes):
+            return GetRoomHistory(system.room_sensors[room], datetime.timedelta(minutes=minutes), system.bt_connection)
+
+        # Telemetry commands
+        topics = ", ".join(TOPICS)
+
+        @add("subscribe <topic:str>", f"Push changes to a topic ({topics})")
+        def _(topic):
+            return SubscriptionChange(topic, subscribe=True)
+
+        @add("subscribe <topic:str> every <interval:float>",
+             "Push changes to a topic at most once per interval in seconds")
+        def _(topic, interval):
+            return SubscriptionChange(topic, subscribe=True, min_interval=interval)
+
+        @add("unsubscribe <topic:str>", "Stop pushing changes to a topic")
+        def _(topic):
+            return SubscriptionChange(topic, subscribe=False)
+
+        @add("unsubscribe all", "Stop pushing changes to every topic")
+        def _():
+            return SubscriptionChange(None, subscribe=False)
 
-            elif command == "room":
-                target_room = int(args[0])
+        # Negotiate the encoding of the messages sent to the client
+        encodings = ", ".join(WIRES)
 
-                if args[1] == "set":
+        @add("encoding <name:str>", f"Select the encoding of messages sent to the client ({encodings})")
+        def _(name):
+            return EncodingChange(create_wire(name))
 
-                    if args[2] == "angle":
-                        angle = float(args[3])
-                        _event = RegisterRotateEvent(self.system.room_dampers[target_room], angle)
+        # Fan commands
+        @add("fan set on", "Turn the fans on")
+        def _():
+            return FanOnEvent(system.fan)
 
-                    elif args[2] == "pwm":
-                        pwm = float(args[3])
-                        _event = RegisterPWMEvent(self.system.room_dampers[target_room], pwm)
+        @add("fan set off", "Turn the fans off")
+        def _():
+            return FanOffEvent(system.fan)
 
-                    elif args[2] == "open":
-                        _event = RegisterOpenEvent(self.system.room_dampers[target_room])
+        @add("fan get status", "Send whether the fans are on")
+        def _():
+            return {"fan": system.fan.status}
 
-                    elif args[2] == "close":
-                        _event = RegisterCloseEvent(self.system.room_dampers[target_room])
+        return grammar
 
-                    elif args[2] == "temp":
-                        new_temp = Temperature(float(args[2]))
-                        _event = TemperatureTargetUpdatedEvent(self.system.room_sensors[target_room], new_temp)
+    def execute_command(self, inp, client=None):
+        """
+        Runs a text command, raising InvalidCommand, KeyError, or ValueError if the command is not valid
 
-                    else:
-                        raise InvalidCommand
+        :param inp: The command input
+        :param client: The client the command was received from, None if it was not received from a client
+        :return: The response message of the command, or None if the command has no response
+        """
+        _event = self.grammar.dispatch(inp)
 
-                elif args[1] == "get":
-                    if args[2] == "status":
-                        # todo: Figure out how to get this to send the value to the requested target
-                        temp = self.system.room_sensors[target_room]
+        # Respond to the source of the command directly rather than through an event
+        if isinstance(_event, (str, dict)):
+            return _event
 
-                    else:
-                        raise InvalidCommand
-                else:
-                    raise InvalidCommand
-
-            elif command == "fan":
-                if args[0] == "set":
-                    if args[1] == "on":
-                        pass
-                    elif args[1] == "off":
-                        pass
-                    else:
-                        raise InvalidCommand
+        # Handle the event created by the command
+        elif isinstance(_event, Event):
+            # Answer only the client that requested the event
+            if isinstance(_event, ResponseEvent):
+                _event.client = client
 
-                elif args[0] == "get":
-                    if args[1] == "status":
-                        pass
-                else:
-                    raise InvalidCommand
-            else:
-                raise InvalidCommand
-            # Completed argument handling
+            self.command_dispatch(_event)
 
-            # Handle the actual event if no errors were raised
-            if isinstance(_event, Event):
-                self.command_dispatch(_event)
+        # Subscriptions and encodings belong to the client that requested them
+        elif isinstance(_event, SubscriptionChange):
+            if client is None:
+                raise InvalidCommand("Subscriptions require a connected client")
+            _event.apply(self.system.telemetry, client)
 
-            else:
-                system_logger.warning(f"Unassigned command with arguments: {inp}")
+        elif isinstance(_event, EncodingChange):
+            if client is None:
+                raise InvalidCommand("Encodings require a connected client")
+            _event.apply(self.system.bt_connection, client)
+
+        return None
+
+    def handle_input(self, inp, client=None):
+        """
+        Runs a text command, logging it if it is not valid
+
+        :param inp: The command input
+        :param client: The client the command was received from, None if it was not received from a client
+        :return: The response message of the command, or None if the command has no response
+        """
+        try:
+            return self.execute_command(inp, client)
 
         # Except an error with invalid arguments
-        except (InvalidCommand, KeyError):
-            system_logger.warning(f"Invalid command: {inp}")
+        except (InvalidCommand, KeyError, ValueError) as e:
+            system_logger.warning(f"Invalid command: {inp} ({e})")
+            return None
+
+    def handle_frame(self, frame: bytes, client=None):
+        """
+        Runs the commands of a frame received from a client
+
+        :param frame: The frame received
+        :param client: The client the frame was received from
+        :return: The response message, or None if the frame expects no response
+        """
+        try:
+            request = framing.parse_request(frame)
+        except framing.InvalidRequest as e:
+            system_logger.warning(str(e))
+            return {"id": None, "error": str(e)}
+
+        # Plain text commands are only responded to by the commands that return a message
+        if not request.is_batch:
+            response = self.handle_input(request.commands[0], client)
+            return None if response is None else {"message": response}
+
+        response = framing.process_request(request, lambda command: self.execute_command(command, client))
+        for command, result in zip(request.commands, response["results"]):
+            if not result["ok"]:
+                system_logger.warning(f"Invalid command: {command} ({result['error']})")
+
+        return response
 
     def command_dispatch(self, _event):
         self.handler.add_event(_event)
@@ -286,16 +433,15 @@ class BluetoothCommandListener(StringCommandHandler):
         super().__init__(handler, system)
 
     def start(self):
-        t = Thread(target=self.connect_accept_data_loop)
-        t.start()
+        # Every client is served from the command server thread
+        self.bt_connection.serve(self.handle_frame, self.client_disconnected)
 
-    def connect_accept_data_loop(self):
-        while True:
-            try:
-                self.bt_connection.wait_for_client()
-                self.bt_connection.begin_data_receive_loop(self.handler.event_queue)
-            except IOError:
-                pass
+    def client_disconnected(self, client) -> None:
+        # Stop pushing telemetry to clients that are no longer connected
+        self.system.telemetry.remove_client(client)
+
+    def send_response(self, response: str) -> None:
+        self.bt_connection.send_string(response)
 
 
 class CommandlineCommandHandler(StringCommandHandler):
@@ -335,9 +481,15 @@ class System(object):
         self.mode = "auto"
 
         # Define an event handler object to process events in the system
-        self.event_handler = EventHandler()
+        self.event_handler = EventHandler(workers=system_constants.event_handler_workers)
         self.bt_listener = BluetoothCommandListener(self.event_handler, self)
 
+        # Define the publisher pushing changes in the state of the system to subscribed clients
+        self.telemetry = TelemetryPublisher(
+            send=self.bt_connection.send_telemetry,
+            default_interval=system_constants.telemetry_min_interval
+        )
+
         # Enable the system if default_enabled is true
         if default_enabled:
             self.element.enabled = True
@@ -360,14 +512,20 @@ class System(object):
         # define ids for rooms
         room_ids = range(3)
 
+        # Define an inventory of the bus that reports sensors being connected and removed
+        self.w1_inventory = W1BusInventory(self.event_handler)
+
         # Verify that all temperature sensors are connected to the bus
-        connected_uuids = W1Bus()
-        for _uuid in system_constants.sensor_UUIDS:
-            if _uuid not in connected_uuids:
+        connected_uuids = self.w1_inventory.get_sensor_ids()
+        for _uuid in system_constants.sensor_UUIDS.values():
+            if (_uuid is not None) and (_uuid not in connected_uuids):
                 system_logger.warning(f"The temperature sensor with ID: {_uuid} was unable to be located on the 1W-BUS")
 
         # self.servo_enabler = DeviceEnabler(system_constants.servo_enable_pin)
 
+        # Define the enabler of the fans
+        self.fan = DeviceEnabler(system_constants.fan_enable_pin)
+
         # Setup dampers and sensors for each room
         for _id in room_ids:
             # todo: Gather target temperature
@@ -406,6 +564,61 @@ class System(object):
             )
         }
 
+        # Define an opt-in profiler for the latencies of the cycle
+        self.profiler = CycleProfiler(
+            enabled=system_constants.cycle_profiling_enabled,
+            buffer_size=system_constants.cycle_profiling_buffer_size
+        )
+
+        # Define how the temperature sensors are read each cycle
+        if system_constants.sensor_read_mode == "background":
+            # Sample sensors continuously and read the latest values from a cache
+            self.sensor_reader = BackgroundSensorSampler(
+                sensors=self.get_all_sensors_iterable(),
+                sample_interval=system_constants.sensor_sample_interval,
+                max_age=system_constants.sensor_sample_max_age,
+                profiler=self.profiler,
+                failure_delay=system_constants.sensor_sample_failure_delay,
+                failure_max_delay=system_constants.sensor_sample_failure_max_delay
+            )
+            self.sensor_reader.start()
+
+        elif system_constants.sensor_read_mode == "bulk":
+            # Start a single conversion on the whole bus and read each sensor's result within the read deadline
+            # Read sensors from a pool with a deadline if the kernel does not support bulk reads
+            self.sensor_reader = BulkConversionReader(
+                W1Bus(),
+                fallback_reader=SensorReaderPool(
+                    max_workers=system_constants.sensor_reader_threads,
+                    read_deadline=system_constants.sensor_read_deadline,
+                    profiler=self.profiler
+                ),
+                read_deadline=system_constants.sensor_read_deadline,
+                profiler=self.profiler
+            )
+
+        else:
+            # Read sensors on demand using a long lived pool of threads
+            self.sensor_reader = SensorReaderPool(
+                max_workers=system_constants.sensor_reader_threads,
+                read_deadline=system_constants.sensor_read_deadline,
+                profiler=self.profiler
+            )
+
+        # Store sensors that failed to report a reading during the last cycle
+        self.stale_sensors = []
+
+        # Define a fixed rate scheduler for the main loop and a timer for the phases of each cycle
+        self.scheduler = CycleScheduler(
+            period=self.update_interval,
+            overrun_policy=system_constants.system_overrun_policy
+        )
+        self.cycle_timer = PhaseTimer()
+
+        # Keep the indexes of the log files up to date alongside the main loop
+        self.index_maintainer = IndexMaintainer()
+        self.index_maintainer.start()
+
     @property
     def bt_connection(self):
         return self.bt_listener.bt_connection
@@ -422,6 +635,14 @@ class System(object):
         )
         return ret_iterable
 
+    def get_sensor_health(self) -> dict:
+        """
+        Retrieves the read failure counters of all temperature sensors in the system
+
+        :return: A dictionary containing the {_id: health counters}
+        """
+        return {sensor.get_id: sensor.health.as_dict() for sensor in self.get_all_sensors_iterable()}
+
     def get_temperature_readings(self):
         """
         Retrieves all temperature sensor readings
@@ -429,25 +650,13 @@ class System(object):
         :return: None
         """
 
-        # Generate a queue for putting temperature values from threads
-        temp_reading_queue = queue.Queue()
-
-        threads = []
-
-        # Instantiate temperature reading threads
+        # Read all sensors using the sensor reader
         # as the reading process can take up to a second per read
-        for temp_sensor in self.get_all_sensors_iterable():
-            temp_gather_thread = Thread(
-                target=temp_sensor.get_temperature_c_into_queue,
-                args=(temp_reading_queue,),
-                kwargs={}
-            )
-            threads.append(temp_gather_thread)
-            temp_gather_thread.start()
+        temperature_readings, self.stale_sensors = self.sensor_reader.read_all(self.get_all_sensors_iterable())
 
-        # Wait for all reads to complete
-        for t in threads:
-            t.join()
+        # Stale sensors are left out of the readings for this cycle
+        for sensor in self.stale_sensors:
+            system_logger.warning(f"No reading available for temperature sensor {sensor.get_id} this cycle")
 
         # Create a dictionary to store room temperature data
         room_readings = {}
@@ -458,8 +667,8 @@ class System(object):
         # Create a list of external temperature readings
         external_temperature_readings = []
 
-        # Handle the queue temperature readings
-        for sensor, reading in queue_drain(temp_reading_queue):
+        # Handle the temperature readings
+        for sensor, reading in temperature_readings:
             if isinstance(sensor, ElementSensor):
 
                 # Store temperature reading in the dictionary
@@ -510,27 +719,63 @@ class System(object):
 
     def handle_cycle(self) -> None:
         """
-        Method for running a system cycle
+        Method for running a system cycle.
+        The time spent in each phase of the cycle is recorded in the cycle timer.
 
         :return: None
         """
+        self.cycle_timer.reset()
+
+        with self.cycle_timer.phase("sensor_read"):
+            # Check for sensors being connected to or removed from the bus
+            self.w1_inventory.refresh_if_stale()
 
-        # Retrieve temperature data
-        external_temperature_readings, self.room_readings, element_sensor_readings = self.get_temperature_readings()
+            # Retrieve temperature data
+            external_temperature_readings, self.room_readings, element_sensor_readings = \
+                self.get_temperature_readings()
 
-        # Create a dictionary to store all temperature errors
-        room_error_readings = self.get_room_temperature_errors(room_readings)
+        with self.cycle_timer.phase("error_calculation"):
+            # Create a dictionary to store all temperature errors
+            room_error_readings = self.get_room_temperature_errors(self.room_readings)
 
-        # Debugging code for now. todo: remove this for final testing
-        print(room_error_readings)
-        print(f"enabled: {self.element.enabled}\nheating: {self.element.heating}\ncooling: {self.element.cooling}")
+        with self.cycle_timer.phase("logging"):
+            # Debugging code for now. todo: remove this for final testing
+            print(room_error_readings)
+            print(f"enabled: {self.element.enabled}\nheating: {self.element.heating}\ncooling: {self.element.cooling}")
 
-        if self.mode == "auto":
-            self.handle_auto_cycle(room_error_readings)
-        elif self.mode == "test":
-            pass
-        elif self.mode == "extreme":
-            self.handle_extreme_cycle(room_error_readings)
+        with self.cycle_timer.phase("actuation"):
+            if self.mode == "auto":
+                self.handle_auto_cycle(room_error_readings)
+            elif self.mode == "test":
+                pass
+            elif self.mode == "extreme":
+                self.handle_extreme_cycle(room_error_readings)
+
+        with self.cycle_timer.phase("telemetry"):
+            self.publish_telemetry()
+            self.telemetry.flush()
+
+    def publish_telemetry(self) -> None:
+        """
+        Publishes the state of the system for subscribed clients.
+        Temperatures are rounded so that sensor noise is not sent as a change.
+
+        :return: None
+        """
+        decimals = system_constants.telemetry_temperature_decimals
+
+        self.telemetry.publish("rooms", {
+            str(_id): round(float(reading), decimals) for _id, reading in self.room_readings.items()})
+
+        self.telemetry.publish("element", {
+            "enabled": self.element.enabled,
+            "heating": self.element.heating
+        })
+
+        self.telemetry.publish("dampers", {
+            str(_id): damper.angle for _id, damper in self.room_dampers.items()})
+
+        self.telemetry.publish("fan", {"on": self.fan.status})
 
     def setup_test_mode(self):
         self.mode = "test"
@@ -546,35 +791,42 @@ class System(object):
         # Iterate through each room
         for _id, servo in self.room_dampers.items():
 
+            # Leave the damper in its current position if the room reading is stale
+            if _id not in room_error_readings:
+                continue
+
             # Debugging code for now. todo: remove this for final testing
             print(f"room temperature delta: {room_error_readings[_id].celsius}")
 
-            # If the system is currently heating/cooling
-            if self.element.enabled:
+            # Record the latency of driving the damper
+            with self.profiler.measure(("actuator", _id)):
+                # If the system is currently heating/cooling
+                if self.element.enabled:
 
-                # If system in heating mode and the room temperature is still below the target
-                if self.element.heating and (room_error_readings[_id].celsius >= 0.0):
-                    servo.close_register()
-                    print(f"System not heating room {_id}")
+                    # If system in heating mode and the room temperature is still below the target
+                    if self.element.heating and (room_error_readings[_id].celsius >= 0.0):
+                        servo.close_register()
+                        print(f"System not heating room {_id}")
 
-                # If system in cooling mode and the room temperature is still above the target
-                elif self.element.cooling and (room_error_readings[_id].celsius <= 0.0):
-                    servo.close_register()
-                    print("System not cooling room")
+                    # If system in cooling mode and the room temperature is still above the target
+                    elif self.element.cooling and (room_error_readings[_id].celsius <= 0.0):
+                        servo.close_register()
+                        print("System not cooling room")
 
-                # The case if the temperature target has not been reached given the current system state
-                else:
-                    servo.open_register()
+                    # The case if the temperature target has not been reached given the current system state
+                    else:
+                        servo.open_register()
 
-            # Dampers should be closed when the system is off
-            else:
-                servo.close_register()
+                # Dampers should be closed when the system is off
+                else:
+                    servo.close_register()
 
-        # Decide if the system should change temperature modes
-        if self.error_sum(room_error_readings.values()) == 0.0:
+        # Decide if the system should change temperature modes, keeping the current mode without every reading
+        if self.all_rooms_read(room_error_readings) and (self.error_sum(room_error_readings.values()) == 0.0):
             # Switch heating/cooling direction
             self.element.heating = self.element.cooling
-            self.element.apply_state()
+            with self.profiler.measure(("actuator", "element")):
+                self.element.apply_state()
 
     def setup_extreme_mode(self):
         self.mode = "extreme"
@@ -583,8 +835,8 @@ class System(object):
 
     def handle_extreme_cycle(self, room_error_readings):
 
-        # Catch temperature in direction satisfied
-        if self.error_sum(room_error_readings.values()) == 0.0:
+        # Catch temperature in direction satisfied, keeping the current mode without every reading
+        if self.all_rooms_read(room_error_readings) and (self.error_sum(room_error_readings.values()) == 0.0):
             # Switch heating/cooling direction
             self.element.heating = self.element.cooling
             self.element.apply_state()
@@ -593,6 +845,16 @@ class System(object):
             self.room_sensors[0].target_temp += 0.1
             self.room_sensors[2].target_temp -= 0.1
 
+    def all_rooms_read(self, room_error_readings: dict) -> bool:
+        """
+        Checks that every room has a fresh reading this cycle.
+        Stale rooms are left out of the readings, and would otherwise make the error sum appear satisfied.
+
+        :param room_error_readings: A dictionary containing the {_id: error} of the rooms read this cycle
+        :return: True if every room with a damper has a reading
+        """
+        return all(_id in room_error_readings for _id in self.room_dampers)
+
     def error_sum(self, error_readings):
         """
         returns the sum of temperature error still needed to be satisfied in the system
@@ -627,46 +889,56 @@ class System(object):
         system_logger.info("System is starting up!")
 
         while True:
+            # Wait until the next cycle is due
+            self.scheduler.wait_for_next_cycle()
+
             # Get the cycle start time
-            cycle_start_time = time.time()
+            cycle_start_time = time.monotonic()
 
             # Run the cycle
             self.handle_cycle()
 
-            # Get the cycle end time
-            cycle_end_time = time.time()
-
             # Calculate the cycle run time
-            delta_time = cycle_end_time - cycle_start_time
+            cycle_time = time.monotonic() - cycle_start_time
+
+            system_logger.debug(f"Main loop completed in {cycle_time:.3f}s ({self.cycle_timer.format_timings()})")
 
-            # Todo: format seconds decimal places
-            system_logger.debug(f"Main loop completed in {delta_time}")
+            # Record the cycle latencies if profiling is enabled
+            self.profiler.record("cycle", cycle_time)
+            self.profiler.record_all(self.cycle_timer.timings, prefix="phase")
 
-            # Get desired sleep time
-            desired_delay_time = self.get_delay_time(delta_time)
-            time.sleep(desired_delay_time)
+            # Handle case where the cycle time is greater than the update interval
+            if cycle_time > self.update_interval:
+                system_logger.warning(
+                    f"Main loop took {cycle_time:.3f}s which is longer than the {self.update_interval}s update interval "
+                    f"({self.cycle_timer.format_timings()}). "
+                    f"Handling the overrun with the {self.scheduler.overrun_policy} policy."
+                )
 
-    def get_delay_time(self, cycle_time: float) -> float:
+    def get_cycle_stats(self) -> dict:
         """
-        Gets the desired delay time from a cycle duration.
+        Retrieves latency statistics of the cycle phases, sensor reads, and actuator calls.
+        Statistics are only gathered while the profiler is enabled.
 
-        :param cycle_time: The desired cycle time in seconds
-        :return:
+        :return: A dictionary containing the {key: statistics}
         """
-        sleep_time = self.update_interval - cycle_time
+        return self.profiler.snapshot()
 
-        # Handle case where sleep time is less than 0.
-        # This is the case when the cycle time is greater than the update interval
-        if sleep_time < 0:
-            # Log a warning with time information about the cycle
-            system_logger.warning(
-                f"Main loop took longer than {self.update_interval} to complete."
-                f"Consider changing the cycle time to a value greater than {cycle_time}"
-                f"to ensure cycle time is consistent!"
-            )
-            sleep_time = 0.0
+    def shutdown(self) -> None:
+        """
+        Releases resources held by the system
 
-        return sleep_time
+        :return: None
+        """
+        self.event_handler.stop()
+        self.sensor_reader.shutdown()
+        self.index_maintainer.stop()
+        data_retrieval.shutdown_query_executor()
+
+        # Write the rollup buckets that are still receiving measurements
+        for sensor in self.get_all_sensors_iterable():
+            if sensor.rollup_writer is not None:
+                sensor.rollup_writer.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,126 @@
+"""
+Fixed rate scheduling and phase timing of the main system loop
+"""
+
+import time
+from contextlib import contextmanager
+
+
+class CycleScheduler(object):
+    """
+    Schedules cycles at a fixed period using the monotonic clock.
+
+    Cycles are started on a fixed grid of start + n * period so that the time spent
+    running a cycle does not accumulate as drift, and clock steps from NTP have no effect.
+
+    When a cycle overruns its period, the overrun policy decides when the next cycle starts:
+        skip:       Missed cycles are dropped and the next cycle starts on the next grid point
+        catch_up:   Missed cycles are run back to back until the schedule has caught up
+        stretch:    The grid is restarted from the end of the cycle that overran
+    """
+
+    OVERRUN_POLICIES = ("skip", "catch_up", "stretch")
+
+    def __init__(self, period: float, overrun_policy: str = "skip", clock=time.monotonic, sleep=time.sleep):
+        """
+        :param period: The time in seconds between the start of each cycle
+        :param overrun_policy: One of OVERRUN_POLICIES
+        :param clock: A function returning a monotonic time in seconds
+        :param sleep: A function sleeping for a given number of seconds
+        """
+        if period <= 0.0:
+            raise ValueError("The cycle period must be greater than 0!")
+
+        if overrun_policy not in self.OVERRUN_POLICIES:
+            raise ValueError(f"{overrun_policy} is not one of {self.OVERRUN_POLICIES}")
+
+        self.period = period
+        self.overrun_policy = overrun_policy
+
+        self._clock = clock
+        self._sleep = sleep
+
+        # The time that the next cycle should start at, None until the first cycle starts
+        self._next_start_time = None
+
+        # Define counters for cycles that could not be started on time
+        self.overruns = 0
+        self.skipped_cycles = 0
+
+    def wait_for_next_cycle(self) -> None:
+        """
+        Waits until the next cycle should start. The first call returns immediately.
+
+        :return: None
+        """
+        now = self._clock()
+
+        # The first cycle defines the start of the grid
+        if self._next_start_time is None:
+            self._next_start_time = now + self.period
+            return
+
+        # The previous cycle completed within its period, finishing exactly on the next start time is not an overrun
+        if now <= self._next_start_time:
+            self._sleep(self._next_start_time - now)
+            self._next_start_time += self.period
+            return
+
+        self.overruns += 1
+
+        if self.overrun_policy == "skip":
+            # Drop every grid point that has already passed and wait for the next one
+            missed_cycles = int((now - self._next_start_time) // self.period) + 1
+            self.skipped_cycles += missed_cycles
+            self._next_start_time += missed_cycles * self.period
+
+            self._sleep(self._next_start_time - now)
+            self._next_start_time += self.period
+
+        elif self.overrun_policy == "catch_up":
+            # Start right away while staying on the original grid
+            self._next_start_time += self.period
+
+        else:
+            # Start right away and move the grid to the current time
+            self._next_start_time = now + self.period
+
+
+class PhaseTimer(object):
+    """
+    Records the time spent in each named phase of a cycle
+    """
+
+    def __init__(self, clock=time.perf_counter):
+        self._clock = clock
+
+        # Define a dictionary of {phase name: duration in seconds} for the current cycle
+        self.timings = {}
+
+    def reset(self) -> None:
+        """
+        Clears the timings of the previous cycle
+
+        :return: None
+        """
+        self.timings = {}
+
+    @contextmanager
+    def phase(self, name: str):
+        """
+        Context manager timing the code run within it as the given phase.
+        Time spent in a phase entered more than once per cycle is summed.
+
+        :param name: The name of the phase
+        """
+        start_time = self._clock()
+        try:
+            yield
+        finally:
+            self.timings[name] = self.timings.get(name, 0.0) + self._clock() - start_time
+
+    def format_timings(self) -> str:
+        """
+        :return: A human readable summary of the phase timings in milliseconds
+        """
+        return ", ".join(f"{name}: {duration * 1000.0:.1f}ms" for name, duration in self.timings.items())
@@ -0,0 +1,337 @@
+"""
+Long lived readers used by the system to gather temperature sensor readings each cycle
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from threading import Thread, Event
+
+from data_handling import custom_logger
+from system.profiling import CycleProfiler
+
+# Create a logger to log general system information
+system_logger = custom_logger.create_system_logger()
+
+
+class SensorReaderPool(object):
+    """
+    A bounded pool of long lived threads responsible for reading temperature sensors.
+
+    Reads are submitted once per cycle and each is given a deadline to complete in.
+    A sensor that misses its deadline is reported as stale and is not submitted again
+    until the outstanding read completes. This way a stuck 1-Wire device can only ever hold a single worker.
+    """
+
+    def __init__(self, max_workers: int, read_deadline: float, profiler: CycleProfiler = None):
+        """
+        :param max_workers: The maximum number of threads used to read sensors
+        :param read_deadline: The time in seconds a read has to complete before being reported as stale
+        :param profiler: The profiler to record read latencies to
+        """
+        self.read_deadline = read_deadline
+        self.profiler = CycleProfiler() if profiler is None else profiler
+
+        # Define the worker threads once so that they are reused every cycle
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="sensor-reader")
+
+        # Store reads that missed their deadline in a previous cycle keyed by sensor
+        self._pending_reads = {}
+
+    def read_all(self, sensors) -> tuple:
+        """
+        Reads all sensors given, waiting at most the read deadline for the results
+
+        :param sensors: An iterable of temperature sensors to read
+        :return: A tuple of a list of (sensor, reading) pairs and a list of stale sensors
+        """
+
+        # Calculate the time that all reads must be completed by
+        deadline = time.monotonic() + self.read_deadline
+
+        readings = []
+        stale_sensors = []
+
+        # Submit a read for every sensor that is not still stuck on a previous read
+        submitted_reads = {}
+        for sensor in sensors:
+            pending_read = self._pending_reads.get(sensor)
+
+            if (pending_read is not None) and (not pending_read.done()):
+                stale_sensors.append(sensor)
+            else:
+                submitted_reads[sensor] = self._executor.submit(self.read_sensor, sensor)
+
+        # Wait for reads to complete until the deadline is reached
+        wait(submitted_reads.values(), timeout=max(0.0, deadline - time.monotonic()))
+
+        for sensor, read in submitted_reads.items():
+
+            # The read missed the deadline, keep track of it so that it is not submitted again
+            if not read.done():
+                self._pending_reads[sensor] = read
+                stale_sensors.append(sensor)
+                system_logger.warning(
+                    f"Temperature sensor {sensor.get_id} did not respond within {self.read_deadline} seconds")
+
+            # The read completed but was unable to get a temperature
+            elif read.exception() is not None:
+                self._pending_reads.pop(sensor, None)
+                stale_sensors.append(sensor)
+                system_logger.warning(
+                    f"Temperature sensor {sensor.get_id} could not be read: {read.exception()!r}")
+
+            else:
+                self._pending_reads.pop(sensor, None)
+                readings.append((sensor, read.result()))
+
+        return readings, stale_sensors
+
+    def read_sensor(self, sensor):
+        """
+        Reads a single sensor, recording the latency of the read
+
+        :param sensor: The temperature sensor to read
+        :return: The temperature read
+        """
+        with self.profiler.measure(("sensor", sensor.get_id)):
+            return sensor.get_temperature_c()
+
+    def shutdown(self) -> None:
+        """
+        Stops accepting new reads. Reads that are in progress are not waited on.
+
+        :return: None
+        """
+        self._executor.shutdown(wait=False)
+
+
+class LatestValueCache(object):
+    """
+    Stores the most recent value for each key along with the monotonic time it was stored at.
+
+    Each entry is replaced as a single immutable tuple.
+    Assigning a dictionary item is atomic, so readers never need to take a lock and never see a partial update.
+    """
+
+    def __init__(self):
+        self._entries = {}
+
+    def update(self, key, value) -> None:
+        """
+        Stores a new value for the key
+
+        :param key: The key to store the value under
+        :param value: The value to store
+        :return: None
+        """
+        self._entries[key] = (value, time.monotonic())
+
+    def get(self, key):
+        """
+        Retrieves the latest entry for the key
+
+        :param key: The key to retrieve the entry of
+        :return: A (value, timestamp) tuple or None if no value has been stored
+        """
+        return self._entries.get(key)
+
+
+class BackgroundSensorSampler(object):
+    """
+    Continuously samples temperature sensors from background threads into a latest value cache.
+
+    Each sensor is given its own sampling thread so that the ~750ms DS18B20 conversion time
+    is spent outside of the control cycle. Reading all sensors then only requires looking up the cache.
+    """
+
+    def __init__(self, sensors, sample_interval: float, max_age: float, profiler: CycleProfiler = None,
+                 failure_delay: float = 1.0, failure_max_delay: float = 30.0):
+        """
+        :param sensors: An iterable of temperature sensors to sample
+        :param sample_interval: The time in seconds to wait between samples of a sensor
+        :param max_age: The age in seconds after which a cached reading is reported as stale
+        :param profiler: The profiler to record sample latencies to
+        :param failure_delay: The minimum time in seconds to wait after a failed sample,
+                              doubled after each further failure until the sensor recovers
+        :param failure_max_delay: The longest time in seconds to wait after a failed sample
+        """
+        self.sensors = list(sensors)
+        self.sample_interval = sample_interval
+        self.max_age = max_age
+        self.failure_delay = failure_delay
+        self.failure_max_delay = failure_max_delay
+        self.profiler = CycleProfiler() if profiler is None else profiler
+
+        # Define the cache that sampled readings are placed into
+        self.cache = LatestValueCache()
+
+        self._stop_event = Event()
+        self._threads = []
+
+    def start(self) -> None:
+        """
+        Starts a sampling thread for each sensor
+
+        :return: None
+        """
+        for sensor in self.sensors:
+            sample_thread = Thread(
+                target=self.sample_loop,
+                args=(sensor,),
+                name=f"sensor-sampler-{sensor.get_id}",
+                daemon=True
+            )
+            self._threads.append(sample_thread)
+            sample_thread.start()
+
+    def sample_loop(self, sensor) -> None:
+        """
+        Samples a sensor into the cache until the sampler is shut down
+
+        :param sensor: The temperature sensor to sample
+        :return: None
+        """
+
+        # Track failures so that a failing sensor is only reported once until it recovers
+        failing = False
+
+        # Define the time to wait after the next failure, so that a missing sensor is not retried in a busy loop
+        failure_delay = self.failure_delay
+
+        while not self._stop_event.is_set():
+            try:
+                with self.profiler.measure(("sensor", sensor.get_id)):
+                    reading = sensor.get_temperature_c()
+
+                self.cache.update(sensor, reading)
+
+                if failing:
+                    system_logger.info(f"Temperature sensor {sensor.get_id} has recovered")
+                failing = False
+                failure_delay = self.failure_delay
+
+                self._stop_event.wait(self.sample_interval)
+
+            except Exception as e:
+                if not failing:
+                    system_logger.warning(f"Temperature sensor {sensor.get_id} could not be sampled: {e!r}")
+                failing = True
+
+                # Back off further after each consecutive failure
+                self._stop_event.wait(max(self.sample_interval, failure_delay))
+                failure_delay = min(failure_delay * 2, self.failure_max_delay)
+
+    def read_all(self, sensors) -> tuple:
+        """
+        Retrieves the latest cached reading of all sensors given
+
+        :param sensors: An iterable of temperature sensors to retrieve readings of
+        :return: A tuple of a list of (sensor, reading) pairs and a list of stale sensors
+        """
+        readings = []
+        stale_sensors = []
+
+        now = time.monotonic()
+
+        for sensor in sensors:
+            entry = self.cache.get(sensor)
+
+            # Report sensors that have not been sampled recently enough as stale
+            if (entry is None) or (now - entry[1] > self.max_age):
+                stale_sensors.append(sensor)
+            else:
+                readings.append((sensor, entry[0]))
+
+        return readings, stale_sensors
+
+    def shutdown(self) -> None:
+        """
+        Stops all sampling threads. Samples that are in progress are not waited on.
+
+        :return: None
+        """
+        self._stop_event.set()
+
+
+class BulkConversionReader(object):
+    """
+    Reads all temperature sensors on a 1-Wire bus using a single simultaneous conversion.
+
+    A round costs one conversion time rather than one per sensor.
+    Rounds are run on a worker thread and given the same deadline as pooled reads,
+    so that a hung sysfs read cannot block the control cycle. While a round is outstanding
+    every sensor is reported as stale and no new round is started.
+    If the bus master does not support bulk reads, sensors are read by the fallback reader instead,
+    so that reads are still made in parallel and within a deadline.
+    """
+
+    def __init__(self, bus, fallback_reader, read_deadline: float, profiler: CycleProfiler = None):
+        """
+        :param bus: The W1Bus the sensors are connected to
+        :param fallback_reader: The reader used when the bus does not support bulk reads, such as a SensorReaderPool
+        :param read_deadline: The time in seconds a round has to complete before its sensors are reported as stale
+        :param profiler: The profiler to record the latency of each round to
+        """
+        self.bus = bus
+        self.fallback_reader = fallback_reader
+        self.read_deadline = read_deadline
+        self.profiler = CycleProfiler() if profiler is None else profiler
+
+        # Define a single worker thread, rounds on the same bus can not overlap
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="bulk-reader")
+
+        # Store a round that missed its deadline in a previous cycle
+        self._pending_round = None
+
+    def read_all(self, sensors) -> tuple:
+        """
+        Reads all sensors given, waiting at most the read deadline for the results
+
+        :param sensors: An iterable of temperature sensors to read
+        :return: A tuple of a list of (sensor, reading) pairs and a list of stale sensors
+        """
+        if not self.bus.supports_bulk_read():
+            return self.fallback_reader.read_all(sensors)
+
+        sensors = list(sensors)
+
+        # A round still stuck from a previous cycle holds the bus, so no sensor can be read
+        if (self._pending_round is not None) and (not self._pending_round.done()):
+            return [], sensors
+
+        bulk_round = self._executor.submit(self.read_round, sensors)
+        wait([bulk_round], timeout=self.read_deadline)
+
+        # The round missed the deadline, keep track of it so that another is not started
+        if not bulk_round.done():
+            self._pending_round = bulk_round
+            system_logger.warning(f"The 1-Wire bus did not complete a bulk read within {self.read_deadline} seconds")
+            return [], sensors
+
+        self._pending_round = None
+
+        # The round failed as a whole, such as when the bulk read file could not be written
+        if bulk_round.exception() is not None:
+            system_logger.warning(f"The 1-Wire bus could not be bulk read: {bulk_round.exception()!r}")
+            return [], sensors
+
+        return bulk_round.result()
+
+    def read_round(self, sensors) -> tuple:
+        """
+        Reads the sensors with a single conversion, recording the latency of the round
+
+        :param sensors: The temperature sensors to read
+        :return: A tuple of a list of (sensor, reading) pairs and a list of sensors that could not be read
+        """
+        with self.profiler.measure(("sensor", "bulk")):
+            return self.bus.bulk_read(sensors)
+
+    def shutdown(self) -> None:
+        """
+        Stops accepting new rounds and shuts down the fallback reader. A round that is in progress is not waited on.
+
+        :return: None
+        """
+        self._executor.shutdown(wait=False)
+        self.fallback_reader.shutdown()
@@ -1,11 +1,17 @@
 from data_handling.data_classes import Temperature
 from data_handling import custom_logger
+from data_handling.binary_store import BinaryMeasurementWriter
+from data_handling.rollups import RollupWriter
 from data_handling.custom_errors import OverTemperature, UnderTemperature
+from system import system_constants
 
 from queue import Queue
 
 from glob import glob
 
+import os
+import time
+
 # Create a logger to log general system information
 system_logger = custom_logger.create_system_logger()
 
@@ -16,21 +22,276 @@ class TemperatureNotFound(Exception):
     """
 
 
+class CRCCheckFailed(TemperatureNotFound):
+    """
+    Represents a sensor whose readings failed the CRC check on every attempt allowed by its retry policy
+    """
+
+    def __init__(self, sensor_id, attempts: int):
+        super().__init__(f"Temperature sensor {sensor_id} failed the CRC check {attempts} times in a row")
+        self.sensor_id = sensor_id
+        self.attempts = attempts
+
+
+class RetryPolicy(object):
+    """
+    Defines how many times a sensor read is attempted and how long to wait between attempts.
+    The delay is multiplied by the backoff factor after every attempt and is capped at the maximum delay.
+    """
+
+    def __init__(self, max_attempts: int, initial_delay: float, backoff: float, max_delay: float,
+                 time_budget: float = None):
+        """
+        :param max_attempts: The maximum number of attempts of a read
+        :param initial_delay: The time in seconds to wait after the first failed attempt
+        :param backoff: The factor the delay is multiplied by after each failed attempt
+        :param max_delay: The longest time in seconds to wait between attempts
+        :param time_budget: The time in seconds all attempts of a read must complete in, None for no limit.
+                            Another attempt is only made if it is expected to complete within the budget.
+        """
+        if max_attempts < 1:
+            raise ValueError("A retry policy must allow at least one attempt!")
+
+        self.max_attempts = max_attempts
+        self.initial_delay = initial_delay
+        self.backoff = backoff
+        self.max_delay = max_delay
+        self.time_budget = time_budget
+
+    def delays(self):
+        """
+        Generator function for the delay to wait after each failed attempt
+
+        :yield: The delay in seconds, once per attempt allowed
+        """
+        delay = self.initial_delay
+        for _ in range(self.max_attempts):
+            yield min(delay, self.max_delay)
+            delay *= self.backoff
+
+
+# Define the retry policy used by sensors unless another is given.
+# Retries stop within the read deadline so that a read the pool gave up on is not left retrying
+default_retry_policy = RetryPolicy(
+    max_attempts=system_constants.sensor_read_max_attempts,
+    initial_delay=system_constants.sensor_read_retry_delay,
+    backoff=system_constants.sensor_read_retry_backoff,
+    max_delay=system_constants.sensor_read_retry_max_delay,
+    time_budget=system_constants.sensor_read_deadline
+)
+
+
+class SensorHealth(object):
+    """
+    Counts the outcomes of reads from a sensor so that degrading probes can be identified
+    """
+
+    def __init__(self):
+        # The number of individual reads that failed the CRC check
+        self.crc_failures = 0
+
+        # The number of reads that failed on every attempt allowed
+        self.failed_reads = 0
+
+        # The number of reads that returned a verified measurement
+        self.successful_reads = 0
+
+    def as_dict(self) -> dict:
+        return {
+            "crc_failures": self.crc_failures,
+            "failed_reads": self.failed_reads,
+            "successful_reads": self.successful_reads
+        }
+
+
+def read_crc_verified(sensor_id, read, retry_policy: RetryPolicy, health: SensorHealth):
+    """
+    Reads a w1_slave device file until the CRC check passes or the retry policy is exhausted
+
+    :param sensor_id: The id of the sensor being read, used for reporting failures
+    :param read: A function returning the parsed (CRC flag, millidegrees) of the device file
+    :param retry_policy: The policy defining the number of attempts and delays between them
+    :param health: The health counters of the sensor to update
+    :return: The temperature in thousandths of a degree celsius, or None if "t=" was not found
+    """
+    start_time = time.monotonic()
+    attempt = 0
+
+    for attempt, delay in enumerate(retry_policy.delays(), start=1):
+
+        attempt_start_time = time.monotonic()
+
+        # This should return the temperature reading
+        crc_valid, millidegrees = read()
+
+        if crc_valid:
+            health.successful_reads += 1
+            return millidegrees
+
+        health.crc_failures += 1
+
+        if attempt >= retry_policy.max_attempts:
+            break
+
+        # Stop if waiting and making another attempt as long as the last would exceed the time budget
+        if retry_policy.time_budget is not None:
+            attempt_duration = time.monotonic() - attempt_start_time
+            elapsed = time.monotonic() - start_time
+            if elapsed + delay + attempt_duration > retry_policy.time_budget:
+                break
+
+        # Back off before trying again rather than spinning on the bus
+        time.sleep(delay)
+
+    health.failed_reads += 1
+    raise CRCCheckFailed(sensor_id, attempt)
+
+
+# Define the byte values looked for when parsing w1_slave files
+_BYTE_Y, _BYTE_E, _BYTE_S = b"YES"
+_BYTE_MINUS, _BYTE_ZERO, _BYTE_NINE = b"-09"
+_BYTE_SPACE, _BYTE_CARRIAGE_RETURN = b" \r"
+
+
+def parse_w1_slave(buffer, length: int) -> tuple:
+    """
+    Parses the contents of a w1_slave device file without building intermediate strings.
+
+    The file consists of two lines, the first ends in YES if the CRC check passed
+    and the second ends in t= followed by the temperature in thousandths of a degree celsius:
+        72 01 4b 46 7f ff 0e 10 57 : crc=57 YES
+        72 01 4b 46 7f ff 0e 10 57 t=23125
+
+    :param buffer: A bytes-like object holding the file contents
+    :param length: The number of valid bytes in the buffer
+    :return: A tuple of the CRC flag and the temperature in thousandths of a degree, or None if "t=" was not found
+    """
+
+    # Find the end of the first line, ignoring trailing whitespace
+    line_end = buffer.find(b"\n", 0, length)
+    if line_end == -1:
+        return False, None
+
+    crc_end = line_end
+    while crc_end > 0 and buffer[crc_end - 1] in (_BYTE_SPACE, _BYTE_CARRIAGE_RETURN):
+        crc_end -= 1
+
+    # checks if the last 3 characters of the first line read "YES"
+    crc_valid = crc_end >= 3 and \
+        buffer[crc_end - 3] == _BYTE_Y and buffer[crc_end - 2] == _BYTE_E and buffer[crc_end - 1] == _BYTE_S
+
+    # searches for "t=" in the temperature line
+    position = buffer.find(b"t=", line_end, length)
+    if position == -1:
+        return crc_valid, None
+    position += 2
+
+    negative = position < length and buffer[position] == _BYTE_MINUS
+    if negative:
+        position += 1
+
+    # Accumulate the digits following "t=" into an integer
+    millidegrees = 0
+    digit_start = position
+    while position < length and _BYTE_ZERO <= buffer[position] <= _BYTE_NINE:
+        millidegrees = millidegrees * 10 + buffer[position] - _BYTE_ZERO
+        position += 1
+
+    if position == digit_start:
+        return crc_valid, None
+
+    return crc_valid, -millidegrees if negative else millidegrees
+
+
+class W1SlaveReader(object):
+    """
+    Reads a w1_slave device file into a reusable buffer through a file descriptor kept open between reads.
+
+    Every read is made from offset 0, which makes the kernel produce a fresh reading from the device.
+    The descriptor is reopened on the next read if the device disappears.
+    """
+
+    # w1_slave files are two lines of under 40 characters each
+    BUFFER_SIZE = 128
+
+    def __init__(self, path: str):
+        self.path = path
+        self._buffer = bytearray(self.BUFFER_SIZE)
+        self._fd = None
+
+    def read(self) -> tuple:
+        """
+        Reads and parses the device file
+
+        :return: A tuple of the CRC flag and the temperature in thousandths of a degree, or None if "t=" was not found
+        """
+        if self._fd is None:
+            self._fd = os.open(self.path, os.O_RDONLY)
+
+        try:
+            length = self._read_into_buffer()
+
+        # Drop the descriptor so that the file is opened again on the next read
+        except OSError:
+            self.close()
+            raise
+
+        return parse_w1_slave(self._buffer, length)
+
+    def _read_into_buffer(self) -> int:
+        """
+        Fills the buffer from the start of the file
+
+        :return: The number of bytes read
+        """
+
+        # os.preadv reads straight into the existing buffer, os.pread is used where it is unavailable
+        if hasattr(os, "preadv"):
+            return os.preadv(self._fd, [self._buffer], 0)
+
+        data = os.pread(self._fd, self.BUFFER_SIZE, 0)
+        self._buffer[:len(data)] = data
+        return len(data)
+
+    def close(self) -> None:
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
 class TemperatureSensor(object):
     """
     Base class for all temperature sensors.
     Implements methods for gathering data and logging results to unique log files
     """
 
-    def __init__(self, _id, _uuid):
+    def __init__(self, _id, _uuid, retry_policy: RetryPolicy = default_retry_policy):
         # Assign the sensor an ID
         self._id = _id
         self.uuid = _uuid
         self._file_path = f"{W1Bus.BASE_DIR}28-{self.uuid}/w1_slave"
+        self._temperature_path = f"{W1Bus.BASE_DIR}28-{self.uuid}/temperature"
+
+        # Define a reader that keeps the device file open between reads
+        self._w1_reader = W1SlaveReader(self._file_path)
+
+        # Define how failed reads are retried and count their outcomes
+        self.retry_policy = retry_policy
+        self.health = SensorHealth()
 
         # Create a logger for the sensor
         self.logger = custom_logger.create_measurement_logger(_id)
 
+        # Create a writer for the sensor's binary measurement file
+        self.binary_writer = None
+        if system_constants.binary_measurement_logging:
+            self.binary_writer = BinaryMeasurementWriter(_id)
+
+        # Create a writer maintaining the sensor's measurement rollups
+        self.rollup_writer = None
+        if system_constants.rollup_logging:
+            self.rollup_writer = RollupWriter(_id)
+
     @property
     def get_id(self):
         return self._id
@@ -41,41 +302,52 @@ class TemperatureSensor(object):
         Opens the device temperature reading file and retrieves the most recent temperature reading
 
         :return: The temperature read in degrees celsius
+        :raises CRCCheckFailed: If no reading passed the CRC check
         """
 
-        # Reads file until a proper reading found
-        while True:
+        # Reads file until a proper reading found or the retry policy is exhausted
+        millidegrees = read_crc_verified(self._id, self._w1_reader.read, self.retry_policy, self.health)
 
-            # This should return the temperature reading
-            lines = self.read_temp_raw()
+        # if "t=" was not found in the file
+        if millidegrees is None:
+            raise TemperatureNotFound
 
-            # checks if the last 3 characters in the file read "YES"
-            if lines[0].strip()[-3:] == 'YES':
-                break
-            else:
-                pass
+        # Converts the retrieved value to a temperature reading
+        temp_c = millidegrees / 1000.0
 
-        # searches for "t=" in the temperature line that was found as the most recent measurement
-        equals_pos = lines[1].find('t=')
+        # Log the retrieved temperature
+        self.log_temperature(temp_c)
 
-        # If the value of t was found in the string
-        if equals_pos != -1:
+        # return the c degree float measurement of the temperature
+        return Temperature(temp_c)
 
-            # Pulls all values found after "t=" from the read string
-            temp_string = lines[1][equals_pos + 2:]
+    def get_converted_temperature_c(self) -> Temperature:
+        """
+        Retrieves the result of a conversion that was already started on the bus.
+        The device temperature file holds the reading in thousandths of a degree celsius.
 
-            # Converts the retrieved string to a temperature reading
-            temp_c = float(temp_string) / 1000.0
+        :return: The temperature read in degrees celsius
+        """
+        try:
+            with open(self._temperature_path, 'r') as reading_file:
+                temp_string = reading_file.read().strip()
 
-            # Log the retrieved temperature
-            self.log_temperature(f"{self._id}, {temp_c}")
+            # An empty or malformed file means the sensor could not be read
+            try:
+                temp_c = int(temp_string) / 1000.0
+            except ValueError:
+                raise TemperatureNotFound
 
-            # return the c degree float measurement of the temperature
-            return Temperature(temp_c)
+        except (OSError, TemperatureNotFound):
+            self.health.failed_reads += 1
+            raise
 
-        else:
-            # if "t=" was not found in the file
-            raise TemperatureNotFound
+        self.health.successful_reads += 1
+
+        # Log the retrieved temperature
+        self.log_temperature(temp_c)
+
+        return Temperature(temp_c)
 
     def get_temperature_c_into_queue(self, _queue: Queue):
         """
@@ -94,8 +366,6 @@ class TemperatureSensor(object):
         Opens the device temperature reading file and retrieves all lines of the file
         """
 
-        print(f"sensor id being read ID: {self._id}")
-
         # using the with open statement,
         # python will handle the closing of the file once it has broken from the with structure
         with open(self._file_path, 'r') as reading_file:
@@ -103,15 +373,21 @@ class TemperatureSensor(object):
             # Each element in the list is a part of the file separated with the "\n" character
             return reading_file.readlines()
 
-    def log_temperature(self, temp_reading) -> None:
+    def log_temperature(self, temp_c: float) -> None:
         """
-        Log the measurement int the sensor's csv file
+        Log the measurement in the sensor's csv file, binary measurement file, and rollups
 
-        :param temp_reading: The temperature reading to log to the csv file
+        :param temp_c: The temperature reading in degrees celsius to log
         :return: None
         """
 
-        self.logger.info(msg=temp_reading)
+        self.logger.info(msg=f"{self._id}, {temp_c}")
+
+        if self.binary_writer is not None:
+            self.binary_writer.write(temp_c)
+
+        if self.rollup_writer is not None:
+            self.rollup_writer.add(temp_c)
 
     @staticmethod
     def c_to_f(temp_c: float) -> float:
@@ -185,22 +461,87 @@ class W1Bus(list):
     # Configure the path of devices on the 1-Wire device protocol
     BASE_DIR = "/sys/bus/w1/devices/"
 
-    def __init__(self):
+    # Configure the file of the bus master used to start a conversion on all devices at once
+    BULK_READ_FILE = "w1_bus_master1/therm_bulk_read"
+
+    def __init__(self, base_dir: str = None):
         """
         Gets all defined sensors and picks out the last 12 characters.
         This will match with the hex ID given to the sensor
+
+        :param base_dir: The directory containing the 1-Wire devices, defaults to BASE_DIR
         """
 
         # Creates the W1Bus as a child class of list
         super().__init__()
 
+        self.base_dir = self.BASE_DIR if base_dir is None else base_dir
+
         # Adds all Sensors to the list
-        self.extend(p[-12:] for p in glob(self.BASE_DIR + '28*'))
+        self.extend(p[-12:] for p in glob(self.base_dir + '28*'))
 
         # gets list of all folders matched with glob.glob, iterates through them
         # Strips the last 12 characters from all matched folders
         # Once ids are taken, reconstructs a list of these sensor IDs.
 
+    @property
+    def bulk_read_path(self) -> str:
+        return os.path.join(self.base_dir, self.BULK_READ_FILE)
+
+    def supports_bulk_read(self) -> bool:
+        """
+        Checks if the kernel provides simultaneous conversions on the bus master
+
+        :return: True if the bulk read file exists
+        """
+        return os.path.exists(self.bulk_read_path)
+
+    def trigger_bulk_conversion(self, timeout: float) -> None:
+        """
+        Starts a temperature conversion on every device of the bus and waits for it to complete.
+
+        Reading the bulk read file returns -1 while a conversion is in progress.
+        Devices that are read before the conversion completes wait on the conversion in the kernel,
+        so the timeout only limits how long this method polls.
+
+        :param timeout: The maximum time in seconds to wait for the conversion
+        :return: None
+        """
+        with open(self.bulk_read_path, 'w') as bulk_file:
+            bulk_file.write("trigger\n")
+
+        deadline = time.monotonic() + timeout
+
+        while time.monotonic() < deadline:
+            with open(self.bulk_read_path, 'r') as bulk_file:
+                if bulk_file.read().strip() != "-1":
+                    break
+
+            time.sleep(0.05)
+
+    def bulk_read(self, sensors) -> tuple:
+        """
+        Reads all sensors given using a single conversion for the whole bus.
+        The bus master must support bulk reads, see supports_bulk_read.
+
+        :param sensors: An iterable of temperature sensors on this bus
+        :return: A tuple of a list of (sensor, reading) pairs and a list of sensors that could not be read
+        """
+        self.trigger_bulk_conversion(system_constants.bulk_conversion_timeout)
+
+        readings = []
+        failed_sensors = []
+
+        for sensor in sensors:
+            try:
+                readings.append((sensor, sensor.get_converted_temperature_c()))
+
+            except (OSError, TemperatureNotFound) as e:
+                system_logger.warning(f"Temperature sensor {sensor.get_id} could not be read: {e!r}")
+                failed_sensors.append(sensor)
+
+        return readings, failed_sensors
+
     def get_sensor_ids(self) -> list:
         """
         Getter method for sensor IDs
@@ -209,3 +550,39 @@ class W1Bus(list):
 
         # return the entirety of the list
         return self
+
+
+if __name__ == "__main__":
+    # Micro-benchmark comparing the readlines based parser with the buffered parser
+    import tempfile
+    import timeit
+
+    def readlines_parse(path):
+        with open(path, 'r') as reading_file:
+            lines = reading_file.readlines()
+        crc_valid = lines[0].strip()[-3:] == 'YES'
+        equals_pos = lines[1].find('t=')
+        return crc_valid, float(lines[1][equals_pos + 2:])
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        sample_path = os.path.join(tmp_dir, "w1_slave")
+        with open(sample_path, "w") as sample_file:
+            sample_file.write(
+                "72 01 4b 46 7f ff 0e 10 57 : crc=57 YES\n"
+                "72 01 4b 46 7f ff 0e 10 57 t=23125\n")
+
+        sample_bytes = open(sample_path, "rb").read()
+        reader = W1SlaveReader(sample_path)
+        repeats = 100000
+
+        benchmarks = {
+            "readlines + str parse": lambda: readlines_parse(sample_path),
+            "W1SlaveReader.read": reader.read,
+            "parse_w1_slave only": lambda: parse_w1_slave(sample_bytes, len(sample_bytes)),
+        }
+
+        for name, func in benchmarks.items():
+            seconds = timeit.timeit(func, number=repeats)
+            print(f"{name:>24}: {seconds / repeats * 1e6:.2f} us per read")
+
+        reader.close()
@@ -21,6 +21,53 @@ room_temp_targets = [20, 24, 26]
 # Define the system loop delay
 system_update_interval = 5.0
 
+# Define how the main loop handles a cycle that takes longer than the update interval.
+# One of "skip", "catch_up", or "stretch"
+system_overrun_policy = "skip"
+
+# Define how temperature sensors are read. Either "pool" to read sensors on demand each cycle,
+# "background" to sample sensors continuously and read the latest values each cycle,
+# or "bulk" to start a single conversion on the whole 1-Wire bus each cycle
+sensor_read_mode = "pool"
+
+# Define whether latencies of the cycle phases, sensor reads, and actuator calls are recorded
+cycle_profiling_enabled = False
+
+# Define the number of most recent latency samples kept for each phase, sensor, and actuator
+cycle_profiling_buffer_size = 1000
+
+# Define the number of threads used to read temperature sensors
+sensor_reader_threads = 8
+
+# Define the time in seconds a sensor read has to complete before it is reported as stale
+sensor_read_deadline = 2.0
+
+# Define how reads that fail the CRC check are retried.
+# The delay is multiplied by the backoff after each attempt and is capped at the maximum delay.
+# Each attempt includes a ~750ms conversion, so two attempts and a delay fit within the read deadline
+sensor_read_max_attempts = 2
+sensor_read_retry_delay = 0.1
+sensor_read_retry_backoff = 2.0
+sensor_read_retry_max_delay = 0.2
+
+# Define the age in seconds after which the inventory of 1-Wire devices is scanned again
+w1_inventory_refresh_interval = 30.0
+
+# Define the maximum time in seconds to wait for a conversion on the whole 1-Wire bus
+bulk_conversion_timeout = 1.5
+
+# Define the time in seconds to wait between samples of a sensor in background mode.
+# Every sample is logged, so sensors are sampled once per cycle rather than continuously
+sensor_sample_interval = system_update_interval
+
+# Define the age in seconds after which a sampled reading is reported as stale, allowing one missed sample
+sensor_sample_max_age = 2 * sensor_sample_interval
+
+# Define the time in seconds to wait after a sensor fails to be sampled in background mode.
+# The delay is doubled after each consecutive failure and is capped at the maximum delay
+sensor_sample_failure_delay = 1.0
+sensor_sample_failure_max_delay = 30.0
+
 ##################
 # Pin constants #
 ##################
@@ -84,9 +131,52 @@ base_log_directory = "/home/pi/ownCloud/Documents/Group4/system/log/"
 log_directories = {
     "measurements": os.path.join(base_log_directory, "measurements"),
     "outputs": os.path.join(base_log_directory, "outputs"),
+    "binary_measurements": os.path.join(base_log_directory, "binary_measurements"),
+    "rollups": os.path.join(base_log_directory, "rollups"),
     "system": base_log_directory
 }
 
+# Define whether measurements are also written to compact binary files
+binary_measurement_logging = True
+
+# Define whether 1 minute, 1 hour, and 1 day rollups of measurements are maintained while logging
+rollup_logging = True
+
+# Define the maximum time in seconds measurement and output records are buffered before being written
+log_flush_interval = 2.0
+
+# Define the number of buffered measurement and output records that are written at once
+log_batch_size = 100
+
+# Define the maximum number of readings sent in response to a history request
+history_max_points = 200
+
+# Define the size in bytes and age in seconds at which measurement and output logs are archived as compressed segments
+log_segment_max_bytes = 4 * 1024 * 1024
+log_segment_max_age = 7 * 24 * 60 * 60
+
+# Define the number of threads handling system events. A single thread handles events in the order they arrive
+event_handler_workers = 1
+
+# Define the time in seconds between bringing the indexes of the log files up to date
+log_index_interval = 60.0
+
+# Define the total size in bytes of the log files a query must read before they are loaded by parallel processes.
+# Smaller queries are loaded serially as handing files to other processes costs more than parsing them
+query_parallel_min_bytes = 4 * 1024 * 1024
+
+# Define the number of Bluetooth clients connected at once, such as a phone and a tablet
+bluetooth_max_clients = 4
+
+# Define the number of unsent bytes at which the command server stops reading from a client
+bluetooth_send_buffer_limit = 64 * 1024
+
+# Define the default minimum time in seconds between telemetry transmissions to a subscribed client
+telemetry_min_interval = 1.0
+
+# Define the number of decimals temperatures are rounded to before telemetry changes are detected
+telemetry_temperature_decimals = 1
+
 # Define a format to be used with reading and writing data to log files
 csv_formatter = logging.Formatter(
     fmt="%(asctime)s, %(levelname)s, %(message)s",
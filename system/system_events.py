@@ -1,34 +1,65 @@
 from event_system.events import *
-from system.active_components import RegisterFlowController, DeviceEnabler
+from data_handling import custom_logger
 from system.sensors import TemperatureSensor
 from system.sensors import TargetTemperatureSensor
+from system.bus_events import SensorEvent, SensorConnectedEvent, SensorDisconnectedEvent
 from data_handling.data_classes import Temperature
+from data_handling import rollups
+from bluetooth_connection import json_format
+from system import system_constants
+
+import datetime
+from typing import TYPE_CHECKING
+
+# The active components drive the GPIO pins, so they are only imported for type checking
+# so that events can be created and tested without the GPIO library
+if TYPE_CHECKING:
+    from system.active_components import RegisterFlowController, DeviceEnabler
+
+# Create a logger for general system information
+system_logger = custom_logger.create_system_logger()
 
 
 class SystemEvent(Event):
-    pass
+    priority = PRIORITY_SYSTEM
 
 
-class SystemStartEvent(SystemEvent):
+class SystemEnableEvent(SystemEvent):
     def __init__(self, element):
         self.element = element
         super().__init__()
 
+    @property
+    def coalesce_key(self):
+        # A start and a stop supersede each other so that the latest command wins,
+        # otherwise a stop handled first by priority could be undone by an earlier start
+        return "element-enable", id(self.element)
+
+
+class SystemStartEvent(SystemEnableEvent):
     def action(self):
         self.element.enabled = True
         self.element.apply_state()
 
 
-class SystemStopEvent(SystemEvent):
-    def __init__(self, element):
-        self.element = element
-        super().__init__()
+class SystemStopEvent(SystemEnableEvent):
+    priority = PRIORITY_SAFETY
 
     def action(self):
         self.element.enabled = False
         self.element.apply_state()
 
 
+class SystemStatsEnableEvent(SystemEvent):
+    def __init__(self, profiler, enabled: bool):
+        super().__init__()
+        self.profiler = profiler
+        self.enabled = enabled
+
+    def action(self):
+        self.profiler.enabled = self.enabled
+
+
 class SystemOperationEvent(SystemEvent):
     pass
 
@@ -66,7 +97,13 @@ class ElementEvent(Event):
         self.element = element
 
 
-class ElementHeatEvent(ElementEvent):
+class ElementModeEvent(ElementEvent):
+    @property
+    def coalesce_key(self):
+        return "element-mode", id(self.element)
+
+
+class ElementHeatEvent(ElementModeEvent):
     def __init__(self, element):
         super().__init__(element)
 
@@ -74,7 +111,7 @@ class ElementHeatEvent(ElementEvent):
         self.element.heating = True
 
 
-class ElementCoolEvent(ElementEvent):
+class ElementCoolEvent(ElementModeEvent):
     def __init__(self, element):
         super().__init__(element)
 
@@ -82,7 +119,7 @@ class ElementCoolEvent(ElementEvent):
         self.element.cooling = True
 
 
-class ElementHeatAndCoolEvent(ElementEvent):
+class ElementHeatAndCoolEvent(ElementModeEvent):
     def __init__(self, element):
         super().__init__(element)
 
@@ -91,15 +128,6 @@ class ElementHeatAndCoolEvent(ElementEvent):
         self.element.apply_state()
 
 
-class ElementGetStatus(ElementEvent):
-    def __init__(self, element, bt_server):
-        super().__init__(element)
-        self.bt_server = bt_server
-
-    def action(self):
-        self.bt_server.send_string(self.element.heating)
-
-
 class ServoEvent(Event):
     pass
 
@@ -109,9 +137,14 @@ class RegisterEvent(ServoEvent):
         self.register = register
         super().__init__()
 
+    @property
+    def coalesce_key(self):
+        # Every register event sets the position of the register, so only the latest one matters
+        return "register", id(self.register)
+
 
 class RegisterOpenEvent(RegisterEvent):
-    def __init__(self, register: RegisterFlowController):
+    def __init__(self, register: "RegisterFlowController"):
         super().__init__(register)
 
     def action(self):
@@ -119,7 +152,7 @@ class RegisterOpenEvent(RegisterEvent):
 
 
 class RegisterCloseEvent(RegisterEvent):
-    def __init__(self, register: RegisterFlowController):
+    def __init__(self, register: "RegisterFlowController"):
         super().__init__(register)
 
     def action(self):
@@ -127,7 +160,7 @@ class RegisterCloseEvent(RegisterEvent):
 
 
 class RegisterRotateEvent(RegisterEvent):
-    def __init__(self, register: RegisterFlowController, new_angle: float):
+    def __init__(self, register: "RegisterFlowController", new_angle: float):
         super().__init__(register)
         self.new_angle = new_angle
 
@@ -136,7 +169,7 @@ class RegisterRotateEvent(RegisterEvent):
 
 
 class RegisterPWMEvent(RegisterEvent):
-    def __init__(self, register: RegisterFlowController, new_pwm: float):
+    def __init__(self, register: "RegisterFlowController", new_pwm: float):
         super().__init__(register)
         self.new_pwm = new_pwm
 
@@ -150,51 +183,83 @@ class TemperatureTargetUpdatedEvent(Event):
         self.target_sensor = target_sensor
         self.new_target_value = new_target_value
 
+    @property
+    def coalesce_key(self):
+        return "target", id(self.target_sensor)
+
     def action(self):
         self.target_sensor.target_temp = self.new_target_value
 
 
-class GetRoomTemperature(Event):
-    def __init__(self, room_readings, sensor_id, bt_server):
+class ResponseEvent(Event):
+    """
+    An event answering the client that requested it once it is handled
+    """
+
+    def __init__(self, bt_server):
         super().__init__()
-        self.room_readings = room_readings
-        self.sensor_id = sensor_id
         self.bt_server = bt_server
 
+        # Define the client the command was received from, set when the command is run
+        self.client = None
+
+    def respond(self, message) -> None:
+        """
+        Sends a message to the client that requested the event, or to every client if it was not requested by one
+
+        :param message: The message to send
+        :return: None
+        """
+        if self.client is None:
+            self.bt_server.send_string(message)
+        else:
+            self.bt_server.send_to_client(self.client, message)
+
+
+class GetRoomHistory(ResponseEvent):
+    def __init__(self, sensor: TemperatureSensor, time_delta: datetime.timedelta, bt_server):
+        super().__init__(bt_server)
+        self.sensor = sensor
+        self.time_delta = time_delta
+
     def action(self):
-        # todo: set this up
-        temperature = self.system.room_readings[self.sensor_id]
-        self.bt_server.send_string(temperature)
+        end_time = datetime.datetime.now()
+        history = rollups.query_history(
+            self.sensor.get_id, end_time - self.time_delta, end_time, system_constants.history_max_points)
+
+        if not len(history):
+            system_logger.warning(f"No history is logged for the temperature sensor with ID: {self.sensor.get_id}")
+            return
+
+        # Rollups are kept in UTC, send local times the same as the rest of the system
+        self.respond(json_format.history_transmission(
+            self.sensor.get_id, rollups.to_local_times(history.timestamps), history.mean,
+            system_constants.history_max_points))
 
 
 class FanEvent(Event):
-    def __init__(self, fan: DeviceEnabler):
+    def __init__(self, fan: "DeviceEnabler"):
         super().__init__()
         self.fan = fan
 
 
-class FanOnEvent(FanEvent):
-    def __init__(self, fan: DeviceEnabler):
-        super().__init__(fan)
+class FanSetEvent(FanEvent):
+    @property
+    def coalesce_key(self):
+        return "fan", id(self.fan)
 
-    def action(self):
-        self.fan.enable()
 
-
-class FanOffEvent(FanEvent):
-    def __init__(self, fan: DeviceEnabler):
+class FanOnEvent(FanSetEvent):
+    def __init__(self, fan: "DeviceEnabler"):
         super().__init__(fan)
 
     def action(self):
-        self.fan.disable()
+        self.fan.enable()
 
 
-class FanStatusEvent(FanEvent):
-    def __init__(self, fan: DeviceEnabler, bt_server):
+class FanOffEvent(FanSetEvent):
+    def __init__(self, fan: "DeviceEnabler"):
         super().__init__(fan)
-        self.bt_server = bt_server
 
     def action(self):
-        self.bt_server.send_string(self.fan.status)
-
-
+        self.fan.disable()
@@ -0,0 +1,42 @@
+import data_handling.binary_store as bs
+
+import datetime
+import numpy as np
+
+
+def test_write_and_read(tmp_path):
+    writer = bs.BinaryMeasurementWriter("bin_test", directory=str(tmp_path))
+
+    start = datetime.datetime(2019, 3, 8, 12, 0, 0)
+    for minute in range(10):
+        timestamp = (start + datetime.timedelta(minutes=minute)).timestamp()
+        writer.write(20.0 + minute * 0.5, timestamp=timestamp)
+    writer.close()
+
+    # Simulate a record that was only partially written
+    with open(writer.file_path, "ab") as f:
+        f.write(b"\x00\x01\x02")
+
+    times, values = bs.read_measurements("bin_test", directory=str(tmp_path))
+    assert len(times) == 10
+    assert times.dtype == np.dtype("datetime64[ms]")
+    assert values.dtype == np.float32
+    assert values[0] == 20.0 and values[-1] == 24.5
+
+    # Time ranges are inclusive of both ends
+    times, values = bs.read_measurements(
+        "bin_test",
+        start_time=start + datetime.timedelta(minutes=2),
+        end_time=start + datetime.timedelta(minutes=4),
+        directory=str(tmp_path))
+    assert list(values) == [21.0, 21.5, 22.0]
+    assert times[0] == np.datetime64(bs.to_epoch_ms(start + datetime.timedelta(minutes=2)), "ms")
+
+
+def test_read_empty(tmp_path):
+    writer = bs.BinaryMeasurementWriter("bin_empty", directory=str(tmp_path))
+    writer.close()
+
+    times, values = bs.read_measurements("bin_empty", directory=str(tmp_path))
+    assert len(times) == 0
+    assert len(values) == 0
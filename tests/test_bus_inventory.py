@@ -0,0 +1,78 @@
+from system.bus_inventory import W1BusInventory
+from system.bus_events import SensorConnectedEvent, SensorDisconnectedEvent
+
+import os
+import shutil
+
+
+class RecordingHandler(object):
+    def __init__(self):
+        self.events = []
+
+    def add_event(self, _event):
+        self.events.append(_event)
+
+    def take(self):
+        # Return the recorded events as (event type, sensor id) pairs and clear them
+        events = [(type(e), e.sensor_id) for e in self.events]
+        self.events.clear()
+        return events
+
+
+def connect(base_dir, _uuid):
+    os.makedirs(os.path.join(base_dir, f"28-{_uuid}"))
+
+
+def disconnect(base_dir, _uuid):
+    shutil.rmtree(os.path.join(base_dir, f"28-{_uuid}"))
+
+
+def test_hot_plug(tmp_path):
+    base_dir = str(tmp_path) + os.sep
+    handler = RecordingHandler()
+
+    connect(base_dir, "00000b0bd120")
+    connect(base_dir, "00000b0be1c7")
+    os.makedirs(os.path.join(base_dir, "w1_bus_master1"))
+
+    inventory = W1BusInventory(handler, refresh_interval=3600.0, base_dir=base_dir)
+
+    # The first scan defines the inventory without reporting events, and other devices are ignored
+    assert inventory.get_sensor_ids() == {"00000b0bd120", "00000b0be1c7"}
+    assert handler.take() == []
+
+    # The cached inventory is used until a refresh
+    connect(base_dir, "00000b0bf3f0")
+    assert "00000b0bf3f0" not in inventory
+
+    # A sensor appearing
+    assert inventory.refresh() == ({"00000b0bf3f0"}, set())
+    assert handler.take() == [(SensorConnectedEvent, "00000b0bf3f0")]
+
+    # A sensor disappearing
+    disconnect(base_dir, "00000b0bd120")
+    assert inventory.refresh() == (set(), {"00000b0bd120"})
+    assert handler.take() == [(SensorDisconnectedEvent, "00000b0bd120")]
+    assert "00000b0bd120" not in inventory
+
+    # A sensor reappearing
+    connect(base_dir, "00000b0bd120")
+    inventory.refresh()
+    assert handler.take() == [(SensorConnectedEvent, "00000b0bd120")]
+
+    # Nothing is reported without changes
+    assert inventory.refresh() == (set(), set())
+    assert handler.take() == []
+
+
+def test_refresh_if_stale(tmp_path):
+    base_dir = str(tmp_path) + os.sep
+    handler = RecordingHandler()
+    inventory = W1BusInventory(handler, refresh_interval=0.0, base_dir=base_dir)
+
+    assert inventory.get_sensor_ids() == frozenset()
+
+    # An inventory older than the refresh interval is scanned again when it is read
+    connect(base_dir, "00000b0bd9e2")
+    assert "00000b0bd9e2" in inventory
+    assert handler.take() == [(SensorConnectedEvent, "00000b0bd9e2")]
@@ -0,0 +1,50 @@
+from system.command_grammar import CommandGrammar, InvalidCommand
+
+import pytest
+
+
+def create_grammar():
+    grammar = CommandGrammar()
+    grammar.add_command("system start", lambda: "start", "Start the system")
+    grammar.add_command("room <room:int> set angle <angle:float>", lambda room, angle: ("angle", room, angle))
+    grammar.add_command("room <room:int> set temp <temp:float>", lambda room, temp: ("temp", room, temp))
+    grammar.add_command("room <room:int> set open", lambda room: ("open", room))
+    return grammar
+
+
+def test_dispatch():
+    grammar = create_grammar()
+
+    assert grammar.dispatch("system start") == "start"
+    assert grammar.dispatch("room 2 set angle 45.5") == ("angle", 2, 45.5)
+    assert grammar.dispatch("room 1 set temp 21") == ("temp", 1, 21.0)
+    assert grammar.dispatch("  room 3   set open ") == ("open", 3)
+
+
+@pytest.mark.parametrize("inp", [
+    "",
+    "system",
+    "system restart",
+    "room one set open",
+    "room 1 set angle wide",
+    "room 1 set open now",
+])
+def test_invalid_commands(inp):
+    with pytest.raises(InvalidCommand):
+        create_grammar().dispatch(inp)
+
+
+def test_grammar_conflicts():
+    grammar = create_grammar()
+
+    with pytest.raises(ValueError):
+        grammar.add_command("system start", lambda: None)
+
+    with pytest.raises(ValueError):
+        grammar.add_command("room <name:str> get status", lambda name: None)
+
+
+def test_help():
+    lines = create_grammar().format_help().splitlines()
+    assert len(lines) == 4
+    assert lines[0].startswith("system start") and lines[0].endswith("Start the system")
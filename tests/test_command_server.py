@@ -0,0 +1,133 @@
+from bluetooth_connection import command_server, framing
+
+import json
+import socket
+import time
+
+
+def echo_handler(frame, client):
+    # Respond to every frame with the frame received
+    return {"echo": frame.decode()}
+
+
+def read_frames(client, count):
+    decoder = framing.LineDecoder()
+    frames = []
+    while len(frames) < count:
+        data = client.recv(4096)
+        assert data, "The server closed the connection"
+        frames += decoder.feed(data)
+    return [json.loads(frame) for frame in frames]
+
+
+def wait_for_clients(server, count):
+    deadline = time.monotonic() + 5
+    while len(server.clients) != count:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_multiple_clients():
+    listener = command_server.create_tcp_listener()
+    server = command_server.CommandServer(listener, echo_handler)
+    server.start()
+
+    try:
+        phone = socket.create_connection(listener.getsockname(), timeout=5)
+        tablet = socket.create_connection(listener.getsockname(), timeout=5)
+        wait_for_clients(server, 2)
+
+        # Each client receives only the responses to its own frames, even when split across sends
+        phone.sendall(b"room 1 get ")
+        tablet.sendall(b"help\nfan get status\n")
+        phone.sendall(b"status\n")
+
+        assert read_frames(phone, 1) == [{"echo": "room 1 get status"}]
+        assert read_frames(tablet, 2) == [{"echo": "help"}, {"echo": "fan get status"}]
+
+        # Broadcasts from another thread reach every client
+        server.broadcast("Fans on")
+        assert read_frames(phone, 1) == [{"message": "Fans on"}]
+        assert read_frames(tablet, 1) == [{"message": "Fans on"}]
+
+        # A client disconnecting leaves the other connected
+        phone.close()
+        wait_for_clients(server, 1)
+        tablet.sendall(b"help\n")
+        assert read_frames(tablet, 1) == [{"echo": "help"}]
+        tablet.close()
+
+    finally:
+        server.stop()
+        listener.close()
+
+
+def test_unix_socket_and_client_limit(tmp_path):
+    listener = command_server.create_unix_listener(str(tmp_path / "command.sock"))
+    server = command_server.CommandServer(listener, echo_handler, max_clients=1)
+    server.start()
+
+    try:
+        first = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        first.settimeout(5)
+        first.connect(str(tmp_path / "command.sock"))
+        wait_for_clients(server, 1)
+
+        # Connections beyond the limit are closed immediately
+        second = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        second.settimeout(5)
+        second.connect(str(tmp_path / "command.sock"))
+        assert second.recv(1024) == b""
+        second.close()
+
+        first.sendall(b"help\n")
+        assert read_frames(first, 1) == [{"echo": "help"}]
+        first.close()
+
+    finally:
+        server.stop()
+        listener.close()
+
+
+def test_slow_client_disconnected():
+    listener = command_server.create_tcp_listener()
+    server = command_server.CommandServer(listener, echo_handler, send_buffer_limit=1024)
+    server.start()
+
+    try:
+        slow = socket.create_connection(listener.getsockname(), timeout=5)
+        wait_for_clients(server, 1)
+
+        # A client that has fallen too far behind is disconnected rather than buffered without limit
+        server.broadcast("x" * 8 * 1024)
+        wait_for_clients(server, 0)
+        slow.close()
+
+    finally:
+        server.stop()
+        listener.close()
+
+
+def test_failing_frame_dropped():
+    def failing_handler(frame, client):
+        if frame == b"fail":
+            raise RuntimeError("Unexpected failure")
+        return echo_handler(frame, client)
+
+    listener = command_server.create_tcp_listener()
+    server = command_server.CommandServer(listener, failing_handler)
+    server.start()
+
+    try:
+        client = socket.create_connection(listener.getsockname(), timeout=5)
+        wait_for_clients(server, 1)
+
+        # Only the failing frame is dropped, the frames after it in the same read are still handled
+        client.sendall(b"help\nfail\nfan get status\n")
+        assert read_frames(client, 2) == [{"echo": "help"}, {"echo": "fan get status"}]
+        assert len(server.clients) == 1
+        client.close()
+
+    finally:
+        server.stop()
+        listener.close()
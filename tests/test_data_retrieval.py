@@ -1,6 +1,10 @@
 import data_handling.data_retrieval as dr
+import numpy as np
+
+import datetime
 import os.path
 
+
 def test_log_dirs():
     # Confirm that the base path for the logs is a directory
     assert os.path.isdir(dr.base_log_directory)
@@ -12,3 +16,130 @@ def test_log_dirs():
         # Confirm csv files in directory are files
         for f in dr.iget_files_in_directory(dir,"csv"):
             assert os.path.isfile(f)
+
+
+def test_load_file_readings(tmp_path):
+    log_path = tmp_path / "sensor.csv"
+    log_path.write_text(
+        "2019-03-01 12:00:00, INFO, sensor, 21.5\n"
+        "2019-03-01 12:00:01, WARNING, sensor, -3\n"
+        "not a reading\n"
+        "2019-03-01 12:00:02, INFO, Dummy data\n"
+    )
+
+    columns = dr.load_file_readings(str(log_path))
+    assert len(columns) == 3
+    assert str(columns.timestamps[1]) == "2019-03-01T12:00:01"
+    assert list(columns.level_mask("INFO")) == [True, False, True]
+    assert not columns.level_mask("ERROR").any()
+    assert columns.readings[:2].tolist() == [21.5, -3.0]
+    assert np.isnan(columns.readings[2])
+
+    # Only the lines within a byte range are loaded
+    first_line_length = len(log_path.read_bytes().splitlines(keepends=True)[0])
+    columns = dr.load_file_readings(str(log_path), start_offset=first_line_length)
+    assert columns.readings[0] == -3.0
+
+    # The generator yields the fields as they were logged
+    time, level, reading = next(dr.iget_file_readings(str(log_path)))
+    assert (time, level, reading) == ("2019-03-01 12:00:00", " INFO", " 21.5")
+
+
+def test_time_filter():
+    start = datetime.datetime(2019, 3, 1, 12, 0, 0)
+    yielded = []
+
+    @dr.time_filter(start + datetime.timedelta(seconds=2), start + datetime.timedelta(seconds=4))
+    def get_data():
+        for i in range(10):
+            yielded.append(i)
+            yield (start + datetime.timedelta(seconds=i), "INFO", float(i))
+
+    assert [reading for time, level, reading in get_data()] == [2.0, 3.0, 4.0]
+
+    # Iteration should stop at the first reading past the end time
+    assert yielded == [0, 1, 2, 3, 4, 5]
+
+
+def test_log_query(tmp_path, monkeypatch):
+    monkeypatch.setitem(dr.log_directories, "measurements", str(tmp_path))
+    start = datetime.datetime(2019, 3, 1, 12, 0, 0)
+
+    for device_id, offset in (("room_1", 0.0), ("room_2", 10.0)):
+        with open(tmp_path / f"{device_id}.csv", "w") as f:
+            for i in range(60):
+                timestamp = (start + datetime.timedelta(seconds=i)).strftime(dr.csv_formatter.datefmt)
+                level = "WARNING" if i % 10 == 0 else "INFO"
+                f.write(f"{timestamp}, {level}, {device_id}, {offset + i}\n")
+
+    query = dr.LogQuery().where_time(start + datetime.timedelta(seconds=20), start + datetime.timedelta(seconds=39))
+
+    # Each filter creates a new query
+    assert query.sensors(["room_2"]).device_ids == ["room_2"]
+    assert query.device_ids is None
+
+    results = query.load()
+    assert set(results) == {"room_1", "room_2"}
+    assert results["room_2"].readings.tolist() == [10.0 + i for i in range(20, 40)]
+
+    warnings = query.sensors(["room_1", "missing"]).where_level("WARNING").load()
+    assert list(warnings) == ["room_1"]
+    assert warnings["room_1"].readings.tolist() == [20.0, 30.0]
+
+    resampled = query.sensors(["room_1"]).resample(datetime.timedelta(seconds=10))
+    assert [(device_id, reading) for device_id, time, reading in resampled] == [("room_1", 24.5), ("room_1", 34.5)]
+
+
+def test_query_devices(tmp_path, monkeypatch):
+    monkeypatch.setitem(dr.log_directories, "measurements", str(tmp_path))
+    start = datetime.datetime(2019, 3, 1, 12, 0, 0)
+
+    # Write readings of each room at different times
+    for device_id, seconds in (("room_1", (0, 2, 4)), ("room_2", (1, 2, 3)), ("element", (10,))):
+        with open(tmp_path / f"{device_id}.csv", "w") as f:
+            for second in seconds:
+                timestamp = (start + datetime.timedelta(seconds=second)).strftime(dr.csv_formatter.datefmt)
+                f.write(f"{timestamp}, INFO, {device_id}, {second}\n")
+
+    frame = dr.query_devices(["room_1", "room_2", "element"], start, start + datetime.timedelta(seconds=5),
+                             max_workers=2)
+
+    assert frame.device_ids == ["room_1", "room_2", "element"]
+    assert len(frame) == 5
+    assert np.array_equal(frame.get_device_readings("room_1"), [0, np.nan, 2, np.nan, 4], equal_nan=True)
+    assert np.array_equal(frame.get_device_readings("room_2"), [np.nan, 1, 2, 3, np.nan], equal_nan=True)
+    assert np.isnan(frame.get_device_readings("element")).all()
+
+    # Query workers only read index files, leaving them to be written by the IndexMaintainer
+    assert not list(tmp_path.glob("*.index"))
+
+
+def test_load_parallel(tmp_path, monkeypatch):
+    monkeypatch.setitem(dr.log_directories, "measurements", str(tmp_path))
+    start = datetime.datetime(2019, 3, 1, 12, 0, 0)
+
+    for device_id in ("room_1", "room_2", "room_3"):
+        with open(tmp_path / f"{device_id}.csv", "w") as f:
+            for second in range(10):
+                timestamp = (start + datetime.timedelta(seconds=second)).strftime(dr.csv_formatter.datefmt)
+                f.write(f"{timestamp}, INFO, {device_id}, {second}\n")
+
+    query = dr.LogQuery().where_time(start, start + datetime.timedelta(seconds=4))
+
+    try:
+        # Files are loaded by the shared pool, which is kept between queries
+        readings = query.load_parallel(max_workers=2, min_parallel_bytes=0)
+        executor = dr.get_query_executor(2)
+        assert query.load_parallel(max_workers=2, min_parallel_bytes=0).keys() == readings.keys()
+        assert dr.get_query_executor(2) is executor
+
+    finally:
+        dr.shutdown_query_executor()
+
+    assert sorted(readings) == ["room_1", "room_2", "room_3"]
+    assert all(columns.readings.tolist() == [0.0, 1.0, 2.0, 3.0, 4.0] for columns in readings.values())
+
+    # Small queries are loaded serially with the same results
+    serial = query.load_parallel(max_workers=2)
+    assert {k: v.readings.tolist() for k, v in serial.items()} == {k: v.readings.tolist() for k, v in readings.items()}
+    assert not list(tmp_path.glob("*.index"))
@@ -0,0 +1,157 @@
+import event_system.event_handler as eh
+import event_system.events as events
+import system.system_events as se
+
+import threading
+
+
+class RecordEvent(events.Event):
+    def __init__(self, record, value):
+        super().__init__()
+        self.record = record
+        self.value = value
+
+    def action(self):
+        self.record.append(self.value)
+
+
+class FailingEvent(events.Event):
+    def action(self):
+        raise ValueError("failed")
+
+
+def test_events_in_order():
+    handler = eh.EventHandler()
+    record = []
+
+    threads_before = threading.active_count()
+    for i in range(100):
+        handler.add_event(RecordEvent(record, i))
+
+    # Adding events should not create threads
+    assert threading.active_count() == threads_before
+
+    handler.join()
+    assert record == list(range(100))
+    handler.stop()
+
+
+def test_failing_event():
+    handler = eh.EventHandler()
+    record = []
+
+    handler.add_event(FailingEvent())
+    handler.add_event(RecordEvent(record, 1))
+    handler.join()
+
+    # The worker should continue after an event fails
+    assert record == [1]
+    handler.stop()
+
+
+def test_stop():
+    handler = eh.EventHandler(workers=3)
+    record = []
+
+    for i in range(10):
+        handler.add_event(RecordEvent(record, i))
+
+    # Events added before stopping are still handled
+    handler.stop()
+    assert sorted(record) == list(range(10))
+    assert not any(worker.is_alive() for worker in handler._workers)
+
+    handler.add_event(RecordEvent(record, 10))
+    assert handler.event_queue.empty()
+
+
+class TargetEvent(RecordEvent):
+    def __init__(self, record, target, value, priority=events.PRIORITY_NORMAL):
+        super().__init__(record, value)
+        self.target = target
+        self.priority = priority
+
+    @property
+    def coalesce_key(self):
+        return "target", self.target
+
+
+def test_priority_and_coalescing():
+    handler = eh.EventHandler()
+    record = []
+
+    # Hold the worker so that the following events wait in the queue
+    release = threading.Event()
+    blocking = RecordEvent(record, "blocking")
+    blocking.action = lambda: release.wait()
+    handler.add_event(blocking)
+
+    for angle in range(10):
+        handler.add_event(TargetEvent(record, "register_1", ("register_1", angle)))
+    handler.add_event(TargetEvent(record, "register_2", ("register_2", 0)))
+    handler.add_event(RecordEvent(record, "status"))
+    handler.add_event(TargetEvent(record, "stop", "stop", priority=events.PRIORITY_SAFETY))
+
+    release.set()
+    handler.join()
+
+    # The stop runs first and only the latest rotation of each register runs
+    assert record == ["stop", ("register_1", 9), ("register_2", 0), "status"]
+    assert handler.event_queue.coalesced == 9
+    handler.stop()
+
+
+class FakeElement(object):
+    def __init__(self):
+        self.enabled = False
+        self.applied = []
+
+    def apply_state(self):
+        self.applied.append(self.enabled)
+
+
+def test_stop_supersedes_waiting_start():
+    handler = eh.EventHandler()
+    element = FakeElement()
+
+    # Hold the worker so that the start waits in the queue
+    release = threading.Event()
+    blocking = events.Event()
+    blocking.action = lambda: release.wait()
+    handler.add_event(blocking)
+
+    handler.add_event(se.SystemStartEvent(element))
+    handler.add_event(se.SystemStopEvent(element))
+
+    release.set()
+    handler.join()
+
+    # The later stop replaces the waiting start, so the element is never switched back on
+    assert element.enabled is False
+    assert element.applied == [False]
+    handler.stop()
+
+
+class FakeServer(object):
+    def __init__(self):
+        self.sent = []
+
+    def send_string(self, message):
+        self.sent.append((None, message))
+
+    def send_to_client(self, client, message):
+        self.sent.append((client, message))
+
+
+def test_response_event_answers_requesting_client():
+    server = FakeServer()
+
+    # An event requested by a client only answers that client
+    _event = se.ResponseEvent(server)
+    _event.client = "tablet"
+    _event.respond({"history": []})
+
+    # An event not requested by a client, such as from the console, is sent to every client
+    se.ResponseEvent(server).respond("status")
+
+    assert server.sent == [("tablet", {"history": []}), (None, "status")]
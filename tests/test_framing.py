@@ -0,0 +1,84 @@
+from bluetooth_connection import framing
+
+import json
+import pytest
+
+
+def test_line_decoder():
+    decoder = framing.LineDecoder()
+
+    # A frame split across reads is only returned once complete
+    assert decoder.feed(b"room 1 set ") == []
+    assert decoder.feed(b"angle 45\r\nsystem st") == [b"room 1 set angle 45"]
+
+    # Several frames in one read
+    assert decoder.feed(b"art\n\nhelp\nfan") == [b"system start", b"help"]
+    assert decoder.feed(b" set on\n") == [b"fan set on"]
+
+
+def test_frame_too_long():
+    decoder = framing.LineDecoder(max_frame_length=10)
+
+    with pytest.raises(framing.FrameTooLong):
+        decoder.feed(b"x" * 20)
+
+    # The rest of the long frame is discarded and decoding continues with the next frame
+    assert decoder.feed(b"xxx\nhelp\n") == [b"help"]
+
+    # Frames received in the same chunk as a long frame are kept
+    with pytest.raises(framing.FrameTooLong) as e:
+        decoder.feed(b"help\n" + b"x" * 20)
+    assert e.value.frames == [b"help"]
+    assert decoder.feed(b"\nfan set on\n") == [b"fan set on"]
+
+    # A long frame received whole is dropped without the frames around it
+    with pytest.raises(framing.FrameTooLong) as e:
+        decoder.feed(b"help\n" + b"x" * 20 + b"\nsystem\n")
+    assert e.value.frames == [b"help", b"system"]
+    assert decoder.feed(b"help\n") == [b"help"]
+
+
+def test_batch_request():
+    frame = json.dumps({"id": 7, "commands": ["room 1 set temp 21", "bad command", "room 2 set temp 22"]}).encode()
+    request = framing.parse_request(frame)
+    assert request.is_batch and request.request_id == 7
+
+    executed = []
+
+    def execute(command):
+        if command == "bad command":
+            raise ValueError("Unexpected word: bad")
+        executed.append(command)
+
+    response = framing.process_request(request, execute)
+    assert executed == ["room 1 set temp 21", "room 2 set temp 22"]
+    assert response == {"id": 7, "results": [
+        {"ok": True}, {"ok": False, "error": "Unexpected word: bad"}, {"ok": True}]}
+
+    # Commands responding with a message add it to their result
+    request = framing.parse_request(json.dumps({"id": 8, "commands": ["help", "system start"]}).encode())
+    response = framing.process_request(request, lambda command: "commands" if command == "help" else None)
+    assert response == {"id": 8, "results": [{"ok": True, "message": "commands"}, {"ok": True}]}
+
+    # Query results are returned as structured messages correlated by the request id
+    request = framing.parse_request(json.dumps({"id": 9, "commands": ["fan get status"]}).encode())
+    response = framing.process_request(request, lambda command: {"fan": True})
+    assert json.loads(framing.encode_frame(response)) == {"id": 9, "results": [{"ok": True, "message": {"fan": True}}]}
+
+    encoded = framing.encode_frame(response)
+    assert encoded.endswith(b"\n") and encoded.count(b"\n") == 1
+    assert json.loads(encoded) == response
+
+
+def test_plain_and_invalid_requests():
+    request = framing.parse_request(b"system start")
+    assert not request.is_batch and request.commands == ["system start"]
+    assert framing.process_request(request, lambda command: None) is None
+
+    for frame in (b"{not json", b'{"id": 1}', b'{"commands": "help"}', b"\xff"):
+        with pytest.raises(framing.InvalidRequest):
+            framing.parse_request(frame)
+
+    # Multi-line messages are kept within one frame
+    assert json.loads(framing.encode_frame("line 1\nline 2")) == {"message": "line 1\nline 2"}
+    assert json.loads(framing.encode_frame('{"history": {}}')) == {"history": {}}
@@ -0,0 +1,123 @@
+import data_handling.data_retrieval as dr
+import data_handling.indexing as di
+import system.system_constants as sc
+
+import datetime
+import os.path
+
+
+def write_log(path, start, count):
+    with open(path, "w") as f:
+        for i in range(count):
+            timestamp = (start + datetime.timedelta(seconds=i)).strftime(sc.csv_formatter.datefmt)
+            f.write(f"{timestamp}, INFO, sensor, {i}\n")
+
+
+def test_index_log_file(tmp_path):
+    log_path = str(tmp_path / "sensor.csv")
+    start = datetime.datetime(2019, 3, 1, 12, 0, 0)
+    write_log(log_path, start, 100)
+
+    # Append a partially written line that should not be indexed yet
+    with open(log_path, "a") as f:
+        f.write(start.strftime(sc.csv_formatter.datefmt))
+
+    di.index_log_file(log_path)
+    index = di.load_index(log_path)
+    entries = index.entries
+
+    assert len(index) == 100
+    assert index.indexed_size < os.path.getsize(log_path)
+
+    # Every entry should point at the start of the line with its timestamp
+    with open(log_path, "rb") as f:
+        for n in range(100):
+            f.seek(entries[2 * n + 1])
+            assert di.parse_line_timestamp(f.readline()) == entries[2 * n]
+
+
+def test_time_range_search(tmp_path):
+    log_path = str(tmp_path / "sensor.csv")
+    start = datetime.datetime(2019, 3, 1, 12, 0, 0)
+    write_log(log_path, start, 100)
+
+    # The index should be created on the first search
+    assert di.search_file_for_timestamp_boundry(log_path, start) == 0
+    assert os.path.isfile(di.get_index_path(log_path))
+
+    data = list(dr.iget_time_filtered_data(
+        log_path, start + datetime.timedelta(seconds=10), start + datetime.timedelta(seconds=19)))
+    assert [int(reading) for time, level, reading in data] == list(range(10, 20))
+
+    # Times outside of the logged range
+    assert not list(dr.iget_time_filtered_data(
+        log_path, start - datetime.timedelta(hours=1), start - datetime.timedelta(minutes=1)))
+    assert not list(dr.iget_time_filtered_data(
+        log_path, start + datetime.timedelta(hours=1), start + datetime.timedelta(hours=2)))
+    assert len(list(dr.iget_time_filtered_data(log_path, None, None))) == 100
+
+
+def test_index_refreshed_on_append(tmp_path):
+    log_path = str(tmp_path / "sensor.csv")
+    start = datetime.datetime(2019, 3, 1, 12, 0, 0)
+    write_log(log_path, start, 10)
+    di.index_log_file(log_path)
+
+    # Lines appended after indexing should still be found
+    with open(log_path, "a") as f:
+        timestamp = (start + datetime.timedelta(minutes=5)).strftime(sc.csv_formatter.datefmt)
+        f.write(f"{timestamp}, INFO, sensor, 50\n")
+
+    data = list(dr.iget_time_filtered_data(log_path, start + datetime.timedelta(minutes=1), None))
+    assert [reading for time, level, reading in data] == [" 50"]
+
+
+def test_incremental_update(tmp_path):
+    log_path = str(tmp_path / "sensor.csv")
+    start = datetime.datetime(2019, 3, 1, 12, 0, 0)
+    write_log(log_path, start, 10)
+    di.index_log_file(log_path)
+
+    with open(log_path, "a") as f:
+        for i in range(10, 15):
+            timestamp = (start + datetime.timedelta(seconds=i)).strftime(sc.csv_formatter.datefmt)
+            f.write(f"{timestamp}, INFO, sensor, {i}\n")
+
+    # Only the appended lines should be indexed
+    index = di.update_index(log_path)
+    assert len(index) == 15
+    assert index.indexed_size == os.path.getsize(log_path)
+    assert di.load_index(log_path).entries == index.entries
+
+    # A replaced log file should be indexed from the start
+    os.remove(log_path)
+    write_log(log_path, start, 3)
+    index = di.update_index(log_path)
+    assert len(index) == 3
+    assert index.indexed_size == os.path.getsize(log_path)
+
+
+def test_read_index(tmp_path):
+    log_path = str(tmp_path / "sensor.csv")
+    start = datetime.datetime(2019, 3, 1, 12, 0, 0)
+    write_log(log_path, start, 10)
+
+    # A log without an index is indexed in memory without creating an index file
+    assert len(di.read_index(log_path)) == 10
+    assert not os.path.exists(di.get_index_path(log_path))
+
+    # The part appended since the index file was written is indexed in memory only
+    di.index_log_file(log_path)
+    index_bytes = open(di.get_index_path(log_path), "rb").read()
+    with open(log_path, "a") as f:
+        for i in range(5):
+            timestamp = (start + datetime.timedelta(minutes=1, seconds=i)).strftime(sc.csv_formatter.datefmt)
+            f.write(f"{timestamp}, INFO, sensor, {i}\n")
+
+    index = di.read_index(log_path)
+    assert len(index) == 15
+    assert index.indexed_size == os.path.getsize(log_path)
+    assert open(di.get_index_path(log_path), "rb").read() == index_bytes
+
+    offsets = di.get_time_range_offsets(log_path, start + datetime.timedelta(minutes=1), None, read_only=True)
+    assert offsets[1] == os.path.getsize(log_path)
@@ -4,6 +4,7 @@ import system.system_constants as sc
 
 from types import GeneratorType as Generator
 import logging
+import logging.handlers
 import os.path
 import datetime
 
@@ -22,6 +23,9 @@ def test_logger():
         ml.info("Dummy data 3")
         ml.info("Dummy data 4")
 
+        # Wait for the queued records to be written to the file
+        dl.flush_logs()
+
     create_dummy_data()
 
 
@@ -64,6 +68,39 @@ def test_retrieval():
     get_recent_dummy_data()
 
 
+def test_batched_logging(tmp_path, monkeypatch):
+    monkeypatch.setitem(sc.log_directories, "outputs", str(tmp_path))
+    log_path = tmp_path / "batch_test.csv"
+
+    ol = dl.create_output_logger("batch_test")
+    assert isinstance(ol.handlers[0], logging.handlers.QueueHandler)
+
+    # Keep the listener from flushing the partial batch on its interval while the test runs.
+    # Flushing restarts the interval, so that a flush already scheduled does not happen either
+    flush_interval = dl._log_listener.flush_interval
+    dl._log_listener.flush_interval = 3600.0
+    dl.flush_logs()
+
+    try:
+        for angle in range(sc.log_batch_size + 1):
+            ol.info(f"{angle}")
+
+        # Wait for the listener to handle all records. Only a full batch has been written to the file
+        dl._log_queue.join()
+        assert len(log_path.read_text().splitlines()) == sc.log_batch_size
+
+        # Flushing writes the remaining records
+        dl.flush_logs()
+        lines = log_path.read_text().splitlines()
+        assert len(lines) == sc.log_batch_size + 1
+        assert lines[-1].endswith(f"INFO, {sc.log_batch_size}")
+
+    finally:
+        # Restore the interval for the rest of the session
+        dl._log_listener.flush_interval = flush_interval
+        dl.flush_logs()
+
+
 def run_all():
     test_logger()
 
@@ -0,0 +1,51 @@
+from system.profiling import CycleProfiler
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 0.0
+
+    def clock(self):
+        return self.now
+
+
+def test_disabled_profiler():
+    profiler = CycleProfiler(enabled=False)
+
+    # Measuring while disabled returns the same shared context manager and records nothing
+    assert profiler.measure("cycle") is profiler.measure(("sensor", 0))
+    with profiler.measure("cycle"):
+        pass
+    profiler.record("cycle", 1.0)
+    profiler.record_all({"sensor_read": 1.0}, prefix="phase")
+
+    assert profiler.snapshot() == {}
+    assert profiler.format_snapshot() == "Cycle profiling is disabled"
+
+
+def test_profiler_snapshot():
+    fake = FakeClock()
+    profiler = CycleProfiler(enabled=True, buffer_size=3, clock=fake.clock)
+
+    for latency in (0.002, 0.02, 0.2, 2.0):
+        with profiler.measure(("sensor", 0)):
+            fake.now += latency
+
+    profiler.record_all({"sensor_read": 0.5, "actuation": 0.0005}, prefix="phase")
+
+    stats = profiler.snapshot()
+    assert set(stats) == {"sensor.0", "phase.sensor_read", "phase.actuation"}
+
+    # Only the most recent samples are kept in the ring buffer
+    sensor_stats = stats["sensor.0"]
+    assert sensor_stats["count"] == 3
+    assert round(sensor_stats["min"], 6) == 0.02
+    assert round(sensor_stats["max"], 6) == 2.0
+    assert round(sensor_stats["p50"], 6) == 0.2
+    assert sensor_stats["histogram"] == [0, 0, 0, 1, 0, 1, 0, 1, 0]
+
+    assert stats["phase.actuation"]["histogram"][0] == 1
+    assert "sensor.0" in profiler.format_snapshot()
+
+    profiler.reset()
+    assert profiler.snapshot() == {}
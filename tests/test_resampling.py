@@ -0,0 +1,60 @@
+import data_handling.resampling as rs
+import numpy as np
+
+import datetime
+import json
+
+from bluetooth_connection import json_format
+
+
+def test_bucket_readings():
+    timestamps = np.array(["2019-03-01T12:00:01", "2019-03-01T12:00:05", "2019-03-01T12:00:03",
+                           "2019-03-01T12:00:25", "2019-03-01T12:00:27"], dtype="datetime64[s]")
+    readings = np.array([1.0, 4.0, 2.0, np.nan, 7.0])
+
+    buckets = rs.bucket_readings(timestamps, readings, datetime.timedelta(seconds=10))
+
+    assert len(buckets) == 3
+    assert str(buckets.timestamps[0]) == "2019-03-01T12:00:00"
+    assert buckets.count.tolist() == [3, 0, 1]
+    assert buckets.min[0] == 1.0 and buckets.max[0] == 4.0
+    assert buckets.mean[0] == 7.0 / 3
+    assert buckets.last[0] == 4.0
+    assert np.isnan(buckets.mean[1])
+    assert buckets.last[2] == 7.0
+
+    assert len(buckets.non_empty()) == 2
+
+    # Buckets can be placed on a fixed grid
+    grid = rs.bucket_readings(timestamps, readings, datetime.timedelta(seconds=10),
+                              start_time=np.datetime64("2019-03-01T11:59:50"),
+                              end_time=np.datetime64("2019-03-01T12:00:05"))
+    assert grid.count.tolist() == [0, 3]
+
+
+def test_lttb():
+    timestamps = np.arange(1000).astype("datetime64[s]")
+    readings = np.zeros(1000)
+    readings[500] = 10.0
+
+    kept_timestamps, kept_readings = rs.lttb(timestamps, readings, 20)
+
+    assert len(kept_readings) == 20
+    assert kept_timestamps[0] == timestamps[0] and kept_timestamps[-1] == timestamps[-1]
+    assert np.all(np.diff(kept_timestamps.astype(np.int64)) > 0)
+
+    # The peak should be kept
+    assert 10.0 in kept_readings
+
+    # Short series are not downsampled
+    assert len(rs.lttb(timestamps[:10], readings[:10], 20)[1]) == 10
+
+
+def test_history_transmission():
+    timestamps = np.arange(500).astype("datetime64[s]")
+    readings = np.linspace(20.0, 22.0, 500)
+
+    history = json.loads(json_format.history_transmission("room_1", timestamps, readings, 50))["history"]
+    assert history["id"] == "room_1"
+    assert len(history["times"]) == len(history["readings"]) == 50
+    assert history["readings"][-1] == 22.0
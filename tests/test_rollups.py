@@ -0,0 +1,98 @@
+import data_handling.rollups as ru
+
+import datetime
+import numpy as np
+
+
+def test_rollup_writer(tmp_path):
+    writer = ru.RollupWriter("room_1", directory=str(tmp_path), flush_interval=3600.0)
+    start = 1551441600
+
+    # Two full minutes of readings followed by one reading in the third minute
+    for second in range(0, 120, 10):
+        writer.add(float(second), timestamp=start + second)
+    writer.add(500.0, timestamp=start + 125)
+
+    # Only the completed minutes are written until the writer is closed
+    minutes = ru.read_rollup("room_1", "1m", directory=str(tmp_path))
+    assert minutes.count.tolist() == [6, 6]
+    assert minutes.min.tolist() == [0.0, 60.0]
+    assert minutes.max.tolist() == [50.0, 110.0]
+    assert minutes.mean.tolist() == [25.0, 85.0]
+    assert minutes.last.tolist() == [50.0, 110.0]
+    assert minutes.timestamps[0].astype(int) == start
+    assert not len(ru.read_rollup("room_1", "1h", directory=str(tmp_path)))
+
+    writer.close()
+    hours = ru.read_rollup("room_1", "1h", directory=str(tmp_path))
+    assert hours.count.tolist() == [13]
+    assert hours.max.tolist() == [500.0]
+
+    # Buckets written early are merged with the rest of the bucket
+    writer = ru.RollupWriter("room_1", directory=str(tmp_path), flush_interval=3600.0)
+    writer.add(-10.0, timestamp=start + 130)
+    writer.close()
+    hours = ru.read_rollup("room_1", "1h", directory=str(tmp_path))
+    assert hours.count.tolist() == [14]
+    assert hours.min.tolist() == [-10.0]
+    assert hours.last.tolist() == [-10.0]
+
+
+def test_choose_resolution():
+    end = datetime.datetime(2019, 3, 1)
+
+    assert ru.choose_resolution(end - datetime.timedelta(days=365), end, 300) == "1d"
+    assert ru.choose_resolution(end - datetime.timedelta(days=7), end, 100) == "1h"
+    assert ru.choose_resolution(end - datetime.timedelta(hours=6), end, 200) == "1m"
+    assert ru.choose_resolution(end - datetime.timedelta(minutes=10), end, 100) is None
+
+
+def test_rollup_flush(tmp_path):
+    writer = ru.RollupWriter("room_2", directory=str(tmp_path), flush_interval=0.0)
+    start = 1551441600
+
+    # The open bucket is written every flush and rewritten in place rather than appended
+    writer.add(1.0, timestamp=start)
+    writer.add(3.0, timestamp=start + 10)
+    minutes = ru.read_rollup("room_2", "1m", directory=str(tmp_path))
+    assert minutes.count.tolist() == [2]
+    assert minutes.mean.tolist() == [2.0]
+
+    writer.add(5.0, timestamp=start + 60)
+    minutes = ru.read_rollup("room_2", "1m", directory=str(tmp_path))
+    assert minutes.count.tolist() == [2, 1]
+    assert ru.read_rollup("room_2", "1h", directory=str(tmp_path)).count.tolist() == [3]
+
+    # Without closing, as after an unexpected stop, every measurement is already written
+    assert (tmp_path / "room_2.1m.bin").stat().st_size == 2 * ru.RECORD_STRUCT.size
+    writer.close()
+
+
+def test_to_local_times():
+    utc = np.array(["2019-03-01T12:00:00"], dtype="datetime64[s]")
+    expected = datetime.datetime.fromtimestamp(
+        datetime.datetime(2019, 3, 1, 12, tzinfo=datetime.timezone.utc).timestamp())
+    assert ru.to_local_times(utc)[0] == np.datetime64(expected, "s")
+
+
+def test_query_history_without_rollups(tmp_path, monkeypatch):
+    monkeypatch.setitem(ru.log_directories, "measurements", str(tmp_path / "measurements"))
+    monkeypatch.setitem(ru.log_directories, "rollups", str(tmp_path / "rollups"))
+    (tmp_path / "measurements").mkdir()
+    start = datetime.datetime(2019, 3, 1, 12, 0, 0)
+
+    # Measurements logged before rollups were kept, one per minute for a day
+    with open(tmp_path / "measurements" / "room_3.csv", "w") as f:
+        for minute in range(24 * 60):
+            timestamp = (start + datetime.timedelta(minutes=minute)).strftime("%Y-%m-%d %H:%M:%S")
+            f.write(f"{timestamp}, INFO, room_3, {minute % 60}\n")
+
+    # The hourly rollup would be read, but as none exists the raw measurements are aggregated
+    end = start + datetime.timedelta(days=1)
+    assert ru.choose_resolution(start, end, 24) == "1h"
+    history = ru.query_history("room_3", start, end, 24)
+    assert len(history) == 24
+    assert history.mean.tolist() == [29.5] * 24
+
+    # The raw measurements are read without writing an index, leaving that to the IndexMaintainer
+    assert not list((tmp_path / "measurements").glob("*.index"))
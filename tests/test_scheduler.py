@@ -0,0 +1,88 @@
+from system.scheduler import CycleScheduler, PhaseTimer
+
+import pytest
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 100.0
+        self.sleeps = []
+
+    def clock(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(round(seconds, 6))
+        self.now += seconds
+
+
+def run_cycles(policy, cycle_times):
+    fake = FakeClock()
+    scheduler = CycleScheduler(period=1.0, overrun_policy=policy, clock=fake.clock, sleep=fake.sleep)
+
+    start_times = []
+    for cycle_time in cycle_times:
+        scheduler.wait_for_next_cycle()
+        start_times.append(round(fake.now - 100.0, 6))
+        fake.now += cycle_time
+
+    return scheduler, start_times
+
+
+def test_fixed_rate():
+    # Cycles of varying length still start on the grid without drifting
+    scheduler, start_times = run_cycles("skip", [0.3, 0.9, 0.1, 0.5])
+    assert start_times == [0.0, 1.0, 2.0, 3.0]
+    assert scheduler.overruns == 0
+
+
+def test_cycle_ending_on_next_start():
+    # A cycle taking exactly the period starts the next cycle on time rather than skipping one
+    scheduler, start_times = run_cycles("skip", [1.0, 1.0, 0.5])
+    assert start_times == [0.0, 1.0, 2.0]
+    assert scheduler.overruns == 0 and scheduler.skipped_cycles == 0
+
+
+def test_skip_policy():
+    scheduler, start_times = run_cycles("skip", [0.5, 2.5, 0.5, 0.5])
+    assert start_times == [0.0, 1.0, 4.0, 5.0]
+    assert scheduler.overruns == 1
+    assert scheduler.skipped_cycles == 2
+
+
+def test_catch_up_policy():
+    scheduler, start_times = run_cycles("catch_up", [0.5, 2.5, 0.1, 0.1, 0.1])
+    assert start_times == [0.0, 1.0, 3.5, 3.6, 4.0]
+    assert scheduler.overruns == 2
+
+
+def test_stretch_policy():
+    scheduler, start_times = run_cycles("stretch", [0.5, 2.5, 0.5, 0.5])
+    assert start_times == [0.0, 1.0, 3.5, 4.5]
+    assert scheduler.overruns == 1
+
+
+def test_invalid_scheduler():
+    with pytest.raises(ValueError):
+        CycleScheduler(period=0.0)
+
+    with pytest.raises(ValueError):
+        CycleScheduler(period=1.0, overrun_policy="sprint")
+
+
+def test_phase_timer():
+    fake = FakeClock()
+    timer = PhaseTimer(clock=fake.clock)
+
+    with timer.phase("sensor_read"):
+        fake.now += 0.5
+    with timer.phase("actuation"):
+        fake.now += 0.25
+    with timer.phase("actuation"):
+        fake.now += 0.25
+
+    assert timer.timings == {"sensor_read": 0.5, "actuation": 0.5}
+    assert timer.format_timings() == "sensor_read: 500.0ms, actuation: 500.0ms"
+
+    timer.reset()
+    assert timer.timings == {}
@@ -0,0 +1,97 @@
+import data_handling.custom_logger as dl
+import data_handling.data_retrieval as dr
+import data_handling.segments as sg
+import system.system_constants as sc
+
+import datetime
+import logging
+import os.path
+
+
+def write_lines(path, start, seconds):
+    with open(path, "a") as f:
+        for second in seconds:
+            timestamp = (start + datetime.timedelta(seconds=second)).strftime(sc.csv_formatter.datefmt)
+            f.write(f"{timestamp}, INFO, room_1, {second}\n")
+
+
+def test_archive_log_file(tmp_path):
+    log_path = str(tmp_path / "room_1.csv")
+    start = datetime.datetime(2019, 3, 1, 12, 0, 0)
+
+    # Archive two segments and leave a live one
+    write_lines(log_path, start, range(0, 10))
+    entry = sg.archive_log_file(log_path)
+    write_lines(log_path, start, range(10, 20))
+    sg.archive_log_file(log_path)
+    write_lines(log_path, start, range(20, 30))
+
+    assert entry["start"] == "2019-03-01 12:00:00"
+    assert entry["end"] == "2019-03-01 12:00:09"
+    assert len(sg.load_manifest(log_path)) == 2
+    assert os.path.isfile(os.path.join(sg.get_archive_directory(log_path), entry["file"]))
+
+    # Segments outside of the time range are skipped
+    assert len(list(sg.iget_segments(log_path, start + datetime.timedelta(seconds=12)))) == 1
+
+    # Readings are read across archived and live segments
+    readings = dr.load_time_filtered_readings(
+        log_path, start + datetime.timedelta(seconds=5), start + datetime.timedelta(seconds=24))
+    assert readings.readings.tolist() == [float(i) for i in range(5, 25)]
+    assert readings.level_mask("INFO").all()
+
+    data = list(dr.iget_time_filtered_data(log_path, None, None))
+    assert len(data) == 30
+
+    data = list(dr.iget_time_filtered_data(
+        log_path, start + datetime.timedelta(seconds=5), start + datetime.timedelta(seconds=24)))
+    assert [reading for time, level, reading in data] == [f" {i}" for i in range(5, 25)]
+
+    # Nothing is archived for an empty log
+    os.remove(log_path)
+    assert sg.archive_log_file(log_path) is None
+
+
+def test_archived_log_outside_window(tmp_path, monkeypatch):
+    monkeypatch.setitem(dr.log_directories, "measurements", str(tmp_path))
+    log_path = str(tmp_path / "room.csv")
+    start = datetime.datetime(2019, 3, 1, 12, 0, 0)
+
+    # Archiving removes the live file, leaving only the segment
+    write_lines(log_path, start, range(0, 10))
+    sg.archive_log_file(log_path)
+    assert not os.path.exists(log_path)
+
+    # A window no segment overlaps holds no readings rather than failing on the missing live file
+    window_start = datetime.datetime(2020, 1, 1)
+    window_end = window_start + datetime.timedelta(days=1)
+
+    readings = dr.LogQuery().sensors(["room"]).where_time(window_start, window_end).load()
+    assert len(readings["room"]) == 0
+    assert not list(dr.iget_time_filtered_data(log_path, window_start, window_end))
+
+    # The archived readings are still found within their window
+    assert len(dr.load_time_filtered_readings(log_path, start, start + datetime.timedelta(seconds=9))) == 10
+
+
+def test_rotating_handler(tmp_path, monkeypatch):
+    monkeypatch.setitem(sc.log_directories, "measurements", str(tmp_path))
+    log_path = str(tmp_path / "rotating.csv")
+
+    handler = dl.BatchedFileHandler(log_path, batch_size=1, max_bytes=200)
+    handler.setFormatter(sc.csv_formatter)
+
+    logger = logging.getLogger("test-rotating")
+    logger.propagate = False
+    logger.addHandler(handler)
+
+    for i in range(20):
+        logger.warning(f"rotating, {i}")
+    handler.close()
+
+    # Every record should be found once across the segments
+    manifest = sg.load_manifest(log_path)
+    assert len(manifest) > 1
+
+    readings = dr.LogQuery().sensors(["rotating"]).load()["rotating"]
+    assert readings.readings.tolist() == [float(i) for i in range(20)]
@@ -0,0 +1,184 @@
+from system.sensor_reader import SensorReaderPool, BackgroundSensorSampler, BulkConversionReader, LatestValueCache
+from data_handling.data_classes import Temperature
+
+import threading
+import time
+
+
+class DummySensor(object):
+    def __init__(self, _id, reading, release=None):
+        self.get_id = _id
+        self.reading = reading
+        self.release = release
+        self.reads = 0
+
+    def get_temperature_c(self):
+        self.reads += 1
+        if self.release is not None:
+            self.release.wait()
+        if self.reading is None:
+            raise IOError("sensor missing")
+        return Temperature(self.reading)
+
+
+def test_read_all():
+    pool = SensorReaderPool(max_workers=4, read_deadline=0.5)
+    sensors = [DummySensor(0, 20.0), DummySensor(1, 21.5)]
+
+    readings, stale = pool.read_all(sensors)
+
+    assert not stale
+    assert {s.get_id: r.celsius for s, r in readings} == {0: 20.0, 1: 21.5}
+
+    pool.shutdown()
+
+
+def test_stale_sensors():
+    release = threading.Event()
+    pool = SensorReaderPool(max_workers=4, read_deadline=0.1)
+
+    stuck = DummySensor("stuck", 20.0, release)
+    missing = DummySensor("missing", None)
+    working = DummySensor("working", 22.0)
+
+    def check_cycle():
+        readings, stale = pool.read_all([stuck, missing, working])
+        assert [s.get_id for s, r in readings] == ["working"]
+        assert set(s.get_id for s in stale) == {"stuck", "missing"}
+
+    # The stuck sensor should miss the deadline and the missing sensor should fail
+    check_cycle()
+
+    # The stuck sensor should not be submitted again while its read is outstanding
+    check_cycle()
+    assert stuck.reads == 1
+
+    # Once the stuck read completes the sensor is read again
+    release.set()
+    pool._pending_reads[stuck].result(timeout=1.0)
+    readings, stale = pool.read_all([stuck])
+    assert not stale
+    assert stuck.reads == 2
+
+    pool.shutdown()
+
+
+def test_latest_value_cache():
+    cache = LatestValueCache()
+    assert cache.get("room") is None
+
+    cache.update("room", 20.0)
+    cache.update("room", 21.0)
+
+    value, timestamp = cache.get("room")
+    assert value == 21.0
+    assert timestamp <= time.monotonic()
+
+
+def test_background_sampler():
+    working = DummySensor("working", 22.0)
+    missing = DummySensor("missing", None)
+
+    sampler = BackgroundSensorSampler([working, missing], sample_interval=0.01, max_age=1.0)
+    sampler.start()
+
+    # Wait for the first samples to be taken
+    deadline = time.monotonic() + 2.0
+    while sampler.cache.get(working) is None and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    readings, stale = sampler.read_all([working, missing])
+    assert [(s.get_id, r.celsius) for s, r in readings] == [("working", 22.0)]
+    assert stale == [missing]
+
+    # Readings older than the maximum age are reported as stale
+    sampler.shutdown()
+    sampler.max_age = 0.0
+    time.sleep(0.02)
+    readings, stale = sampler.read_all([working])
+    assert not readings
+    assert stale == [working]
+
+
+def test_background_sampler_backs_off_failing_sensor():
+    missing = DummySensor("missing", None)
+
+    # Even without a sample interval a failing sensor waits between attempts
+    sampler = BackgroundSensorSampler([missing], sample_interval=0.0, max_age=1.0,
+                                      failure_delay=0.05, failure_max_delay=0.1)
+    sampler.start()
+    time.sleep(0.3)
+    sampler.shutdown()
+
+    # Waits of 0.05, 0.1, 0.1, ... allow at most a handful of attempts
+    assert 1 <= missing.reads <= 5
+
+
+class DummyBus(object):
+    def __init__(self, supports_bulk_read, release=None):
+        self._supports_bulk_read = supports_bulk_read
+        self.release = release
+        self.bulk_reads = 0
+
+    def supports_bulk_read(self):
+        return self._supports_bulk_read
+
+    def bulk_read(self, sensors):
+        self.bulk_reads += 1
+        if self.release is not None:
+            self.release.wait()
+        return [(sensor, Temperature(sensor.reading)) for sensor in sensors], []
+
+
+def test_bulk_reader_fallback():
+    release = threading.Event()
+    working = DummySensor("working", 21.0)
+    stuck = DummySensor("stuck", 20.0, release)
+
+    # Without bulk read support the sensors are read in parallel with a deadline
+    reader = BulkConversionReader(DummyBus(False), fallback_reader=SensorReaderPool(max_workers=2, read_deadline=0.1),
+                                  read_deadline=0.1)
+
+    start = time.monotonic()
+    readings, stale = reader.read_all([working, stuck])
+    assert time.monotonic() - start < 1.0
+    assert [(s.get_id, r.celsius) for s, r in readings] == [("working", 21.0)]
+    assert stale == [stuck]
+
+    release.set()
+    reader.shutdown()
+
+    # With bulk read support the bus is read with a single conversion
+    bus = DummyBus(True)
+    reader = BulkConversionReader(bus, fallback_reader=SensorReaderPool(max_workers=2, read_deadline=0.1),
+                                  read_deadline=0.1)
+    readings, stale = reader.read_all([working])
+    assert bus.bulk_reads == 1 and not stale
+    reader.shutdown()
+
+
+def test_bulk_read_deadline():
+    release = threading.Event()
+    working = DummySensor("working", 21.0)
+    bus = DummyBus(True, release)
+    reader = BulkConversionReader(bus, fallback_reader=SensorReaderPool(max_workers=2, read_deadline=0.1),
+                                  read_deadline=0.1)
+
+    # A hung round does not block the cycle past the deadline, and its sensors are reported as stale
+    start = time.monotonic()
+    readings, stale = reader.read_all([working])
+    assert time.monotonic() - start < 1.0
+    assert not readings and stale == [working]
+
+    # No new round is started while the hung round holds the bus
+    readings, stale = reader.read_all([working])
+    assert stale == [working] and bus.bulk_reads == 1
+
+    # Once the round completes the bus is read again
+    release.set()
+    reader._pending_round.result(timeout=5)
+    readings, stale = reader.read_all([working])
+    assert [(s.get_id, r.celsius) for s, r in readings] == [("working", 21.0)] and not stale
+    assert bus.bulk_reads == 2
+
+    reader.shutdown()
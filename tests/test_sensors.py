@@ -0,0 +1,145 @@
+import system.sensors as sensors
+import system.system_constants as sc
+
+import os
+import pytest
+import time
+
+VALID_READING = (
+    "72 01 4b 46 7f ff 0e 10 57 : crc=57 YES\n"
+    "72 01 4b 46 7f ff 0e 10 57 t=23125\n"
+)
+
+INVALID_READING = (
+    "72 01 4b 46 7f ff 0e 10 57 : crc=00 NO\n"
+    "72 01 4b 46 7f ff 0e 10 57 t=85000\n"
+)
+
+
+@pytest.fixture
+def w1_devices(tmp_path, monkeypatch):
+    """
+    Creates a fake 1-Wire device tree and points the sensors at it
+    """
+    monkeypatch.setattr(sensors.W1Bus, "BASE_DIR", f"{tmp_path}/devices/")
+    monkeypatch.setitem(sc.log_directories, "measurements", str(tmp_path / "measurements"))
+    monkeypatch.setitem(sc.log_directories, "binary_measurements", str(tmp_path / "binary_measurements"))
+    monkeypatch.setitem(sc.log_directories, "rollups", str(tmp_path / "rollups"))
+
+    def write_device(uuid, w1_slave):
+        device_dir = tmp_path / "devices" / f"28-{uuid}"
+        device_dir.mkdir(parents=True, exist_ok=True)
+        (device_dir / "w1_slave").write_text(w1_slave)
+
+    return write_device
+
+
+def test_retry_policy():
+    policy = sensors.RetryPolicy(max_attempts=5, initial_delay=0.1, backoff=2.0, max_delay=0.5)
+    assert list(policy.delays()) == [0.1, 0.2, 0.4, 0.5, 0.5]
+
+    with pytest.raises(ValueError):
+        sensors.RetryPolicy(max_attempts=0, initial_delay=0.1, backoff=2.0, max_delay=0.5)
+
+
+def test_read_temperature(w1_devices):
+    w1_devices("000000000001", VALID_READING)
+    sensor = sensors.TemperatureSensor("test-valid", "000000000001")
+
+    assert sensor.get_temperature_c().celsius == 23.125
+    assert os.path.getsize(sensor.binary_writer.file_path) == 12
+    assert sensor.health.as_dict() == {"crc_failures": 0, "failed_reads": 0, "successful_reads": 1}
+
+
+def test_crc_failure(w1_devices):
+    w1_devices("000000000002", INVALID_READING)
+    policy = sensors.RetryPolicy(max_attempts=3, initial_delay=0.0, backoff=2.0, max_delay=0.0)
+    sensor = sensors.TemperatureSensor("test-invalid", "000000000002", retry_policy=policy)
+
+    with pytest.raises(sensors.CRCCheckFailed) as e:
+        sensor.get_temperature_c()
+
+    assert e.value.attempts == 3
+    assert isinstance(e.value, sensors.TemperatureNotFound)
+    assert sensor.health.as_dict() == {"crc_failures": 3, "failed_reads": 1, "successful_reads": 0}
+
+
+def test_retry_time_budget():
+    def slow_invalid_read():
+        time.sleep(0.05)
+        return False, 85000
+
+    # Attempts stop once another would not complete within the time budget
+    policy = sensors.RetryPolicy(max_attempts=10, initial_delay=0.0, backoff=1.0, max_delay=0.0, time_budget=0.12)
+    health = sensors.SensorHealth()
+
+    with pytest.raises(sensors.CRCCheckFailed) as e:
+        sensors.read_crc_verified("test-budget", slow_invalid_read, policy, health)
+
+    assert e.value.attempts == 2
+    assert health.as_dict() == {"crc_failures": 2, "failed_reads": 1, "successful_reads": 0}
+
+
+def test_bulk_read(w1_devices, tmp_path):
+    w1_devices("000000000003", VALID_READING)
+    w1_devices("000000000004", VALID_READING)
+    (tmp_path / "devices" / "28-000000000003" / "temperature").write_text("21500\n")
+    (tmp_path / "devices" / "28-000000000004" / "temperature").write_text("\n")
+
+    working = sensors.TemperatureSensor("test-bulk-working", "000000000003")
+    failing = sensors.TemperatureSensor("test-bulk-failing", "000000000004")
+
+    bus = sensors.W1Bus()
+    assert sorted(bus) == ["000000000003", "000000000004"]
+    assert not bus.supports_bulk_read()
+
+    # With a bulk read file the conversion is triggered once and each temperature file is read
+    master_dir = tmp_path / "devices" / "w1_bus_master1"
+    master_dir.mkdir()
+    (master_dir / "therm_bulk_read").write_text("0\n")
+    assert bus.supports_bulk_read()
+
+    readings, failed = bus.bulk_read([working, failing])
+    assert [(s.get_id, r.celsius) for s, r in readings] == [("test-bulk-working", 21.5)]
+    assert failed == [failing]
+    assert (master_dir / "therm_bulk_read").read_text() == "trigger\n"
+
+    # The outcome of each read is counted in the sensor's health
+    assert working.health.successful_reads == 1
+    assert failing.health.failed_reads == 1
+
+
+def test_parse_w1_slave():
+    def parse(text):
+        data = text.encode()
+        # Pad the buffer to check that only the valid length is parsed
+        return sensors.parse_w1_slave(data + b"t=99", len(data))
+
+    assert parse(VALID_READING) == (True, 23125)
+    assert parse(INVALID_READING) == (False, 85000)
+    assert parse("72 01 : crc=57 YES \r\n72 01 t=-1250\n") == (True, -1250)
+    assert parse("72 01 : crc=57 YES\n72 01 t=\n") == (True, None)
+    assert parse("72 01 : crc=57 YES\n") == (True, None)
+    assert parse("") == (False, None)
+
+
+def test_w1_slave_reader(tmp_path):
+    path = tmp_path / "w1_slave"
+    path.write_text(VALID_READING)
+
+    reader = sensors.W1SlaveReader(str(path))
+    assert reader.read() == (True, 23125)
+
+    # The same descriptor sees the new contents of the file
+    path.write_text(INVALID_READING)
+    assert reader.read() == (False, 85000)
+
+    # A removed device raises an error and the file is opened again on the next read
+    path.unlink()
+    reader.close()
+    with pytest.raises(OSError):
+        reader.read()
+
+    path.write_text(VALID_READING)
+    assert reader.read() == (True, 23125)
+    reader.close()
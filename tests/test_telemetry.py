@@ -0,0 +1,94 @@
+from bluetooth_connection import telemetry
+
+import pytest
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def create_publisher():
+    sent = []
+    clock = FakeClock()
+    publisher = telemetry.TelemetryPublisher(
+        send=lambda client, changes: sent.append((client, changes)),
+        default_interval=1.0,
+        clock=clock
+    )
+    return publisher, sent, clock
+
+
+def test_only_changes_are_pushed():
+    publisher, sent, clock = create_publisher()
+    publisher.publish("rooms", {"0": 21.5, "1": 22.0})
+    publisher.subscribe("phone", "rooms")
+
+    # A new subscriber is sent every value of the topic
+    publisher.flush()
+    assert sent == [("phone", {"rooms": {"0": 21.5, "1": 22.0}})]
+
+    # Nothing is sent while the values are unchanged
+    clock.now = 5.0
+    publisher.publish("rooms", {"0": 21.5, "1": 22.0})
+    publisher.flush()
+    assert len(sent) == 1
+
+    # Only the changed value is sent
+    publisher.publish("rooms", {"1": 22.1})
+    publisher.flush()
+    assert sent[-1] == ("phone", {"rooms": {"1": 22.1}})
+
+
+def test_rate_limit_per_subscriber():
+    publisher, sent, clock = create_publisher()
+    publisher.subscribe("phone", "element")
+    publisher.subscribe("tablet", "element", min_interval=10.0)
+
+    publisher.publish("element", {"enabled": True, "heating": True})
+    publisher.flush()
+    assert sorted(client for client, _ in sent) == ["phone", "tablet"]
+    sent.clear()
+
+    # Changes within the interval of a subscriber are held back and combined
+    clock.now = 2.0
+    publisher.publish("element", {"heating": False})
+    publisher.flush()
+    clock.now = 3.0
+    publisher.publish("element", {"enabled": False})
+    publisher.flush()
+    assert sent == [("phone", {"element": {"heating": False}}), ("phone", {"element": {"enabled": False}})]
+    sent.clear()
+
+    clock.now = 10.0
+    publisher.flush()
+    assert sent == [("tablet", {"element": {"enabled": False, "heating": False}})]
+
+
+def test_unsubscribe():
+    publisher, sent, clock = create_publisher()
+    publisher.subscribe("phone", "rooms")
+    publisher.subscribe("phone", "dampers", min_interval=0.0)
+    assert publisher.subscriptions("phone") == {"rooms": 1.0, "dampers": 0.0}
+
+    publisher.unsubscribe("phone", "rooms")
+    publisher.publish("rooms", {"0": 20.0})
+    publisher.publish("dampers", {"0": 90.0})
+    publisher.flush()
+    assert sent == [("phone", {"dampers": {"0": 90.0}})]
+
+    # Disconnected clients are sent nothing
+    publisher.remove_client("phone")
+    publisher.publish("dampers", {"0": 0.0})
+    publisher.flush()
+    assert len(sent) == 1
+    assert publisher.subscriptions("phone") == {}
+
+    with pytest.raises(KeyError):
+        publisher.subscribe("phone", "unknown")
+
+    with pytest.raises(ValueError):
+        publisher.subscribe("phone", "rooms", min_interval=-1.0)
@@ -0,0 +1,90 @@
+from bluetooth_connection import command_server, wire_codec
+
+import json
+import pytest
+import socket
+
+
+def test_varint():
+    for value in (0, 1, 127, 128, 300, 2 ** 40):
+        encoded = wire_codec.encode_varint(value)
+        assert wire_codec.decode_varint(encoded + b"\xff", 0) == (value, len(encoded))
+
+    # An incomplete varint is not decoded
+    assert wire_codec.decode_varint(b"\x80\x80", 0) == (None, 0)
+
+
+def test_telemetry_round_trip():
+    wire = wire_codec.BinaryWire()
+    decoder = wire_codec.BinaryFrameDecoder()
+
+    snapshot = wire_codec.create_snapshot()
+    snapshot["dampers"]["2"] = None
+    first = wire_codec.TelemetryUpdate(snapshot, 1500000000.25)
+    second = wire_codec.TelemetryUpdate({"rooms": {"1": -5.67}, "fan": {"on": False}}, 1500000001.5)
+
+    frames = wire.encode(first) + wire.encode(second)
+
+    # Frames split across reads are reassembled
+    assert decoder.feed(frames[:10]) == []
+    assert decoder.feed(frames[10:]) == [first, second]
+
+    # Later updates carry a relative timestamp and no key names:
+    # length, type, 2 byte time delta, field count, then an id and value for each field
+    other_wire = wire_codec.BinaryWire()
+    other_wire.encode(first)
+    assert len(other_wire.encode(second)) == 1 + 1 + 2 + 1 + (1 + 2) + (1 + 1)
+
+
+def test_json_messages_in_binary_frames():
+    wire = wire_codec.BinaryWire()
+    decoder = wire_codec.BinaryFrameDecoder()
+
+    frames = wire.encode({"id": 1, "results": [{"ok": True}]}) + wire.encode("line one\nline two")
+    assert decoder.feed(frames) == [{"id": 1, "results": [{"ok": True}]}, {"message": "line one\nline two"}]
+
+
+def test_json_wire():
+    update = wire_codec.TelemetryUpdate({"element": {"heating": True}}, 1500000000.0)
+    message = json.loads(wire_codec.JsonWire().encode(update))
+    assert message["state"] == {"element": {"heating": True}}
+
+    with pytest.raises(KeyError):
+        wire_codec.create_wire("xml")
+
+    # Fields outside of the schema cannot be encoded
+    with pytest.raises(KeyError):
+        wire_codec.BinaryWire().encode(wire_codec.TelemetryUpdate({"rooms": {"kitchen": 20.0}}, 0.0))
+
+
+def test_server_switches_encoding():
+    def handler(frame, client):
+        # Switch to the binary encoding before responding
+        server.set_wire(client, wire_codec.create_wire("binary"))
+        return {"id": 1, "results": [{"ok": True}]}
+
+    listener = command_server.create_tcp_listener()
+    server = command_server.CommandServer(listener, handler)
+    server.start()
+
+    try:
+        client = socket.create_connection(listener.getsockname(), timeout=5)
+        client.sendall(b"encoding binary\n")
+
+        decoder = wire_codec.BinaryFrameDecoder()
+        messages = []
+        while not messages:
+            messages = decoder.feed(client.recv(4096))
+        assert messages == [{"id": 1, "results": [{"ok": True}]}]
+
+        update = wire_codec.TelemetryUpdate({"rooms": {"0": 21.5}}, 1500000000.0)
+        server.send(server.clients[0], update)
+        messages = []
+        while not messages:
+            messages = decoder.feed(client.recv(4096))
+        assert messages == [update]
+        client.close()
+
+    finally:
+        server.stop()
+        listener.close()
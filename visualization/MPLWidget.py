@@ -9,7 +9,8 @@ import matplotlib.dates as mdates
 from collections import deque
 
 from data_handling.data_retrieval import get_rand_data
-from visualization.settings import colors
+from data_handling.resampling import lttb
+from visualization.settings import colors, max_plot_points
 
 
 class MPLWidget(QFrame):
@@ -53,6 +54,29 @@ class MPLWidget(QFrame):
     def multi_plot(self, data):
         self.canvas.multi_plot(data=data)
 
+    def plot_readings(self, timestamps, readings, color, max_points: int = max_plot_points):
+        """
+        Plots readings against time, downsampled so that long histories draw quickly
+
+        :param timestamps: The datetime64 times of the readings
+        :param readings: The readings to plot
+        :param color: The color of the line
+        :param max_points: The maximum number of points to plot
+        :return: None
+        """
+        self.canvas.plot_time_series(*lttb(timestamps, readings, max_points), color=color)
+
+    def plot_frame(self, frame, max_points: int = max_plot_points):
+        """
+        Plots the readings of every device in a frame of aligned readings
+
+        :param frame: The ReadingFrame to plot
+        :param max_points: The maximum number of points to plot for each device
+        :return: None
+        """
+        self.canvas.multi_plot_time_series(
+            [lttb(frame.timestamps, frame.get_device_readings(_id), max_points) for _id in frame.device_ids])
+
     def plot_multi_test(self):
         self.canvas.multi_plot(get_rand_data())
 
@@ -112,3 +136,26 @@ class MPLCanvas(Canvas):
             self.plot(d, color_deque[0])
             # Select next color
             color_deque.rotate(1)
+
+    def plot_time_series(self, timestamps, values, color):
+        self.ax.plot(timestamps, values, color=color)
+        self.ax.xaxis.set_major_formatter(mdates.DateFormatter('%H:%M:%S'))
+        self.draw()
+
+    def multi_plot_time_series(self, series):
+        # Clear previously plotted data
+        self.ax.clear()
+
+        # for custom color cycling
+        color_deque = deque(self.color_options)
+
+        # Set the axis title to the current time
+        self.ax.set_title(f"Data({datetime.datetime.now().strftime('%H:%M:%S')})")
+
+        # Plot each (timestamps, values) series in the next color
+        for timestamps, values in series:
+            self.ax.plot(timestamps, values, color=color_deque[0])
+            color_deque.rotate(1)
+
+        self.ax.xaxis.set_major_formatter(mdates.DateFormatter('%H:%M:%S'))
+        self.draw()
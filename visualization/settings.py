@@ -5,4 +5,7 @@ colors = {
     "prim": main_color,
     "light": QColor(main_color).lighter(125).name(),
     "dark": QColor(main_color).darker(125).name()
-}
\ No newline at end of file
+}
+
+# Define the maximum number of points plotted for each line of a graph
+max_plot_points = 1000